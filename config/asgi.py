@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Amb SEMANTIC_SEARCH_PRELOAD=1 el model es carrega aquí, abans que el servidor
+# (p.ex. gunicorn --preload) faci fork dels workers
+from semantic_search.services.warmup import preload_if_enabled  # noqa: E402
+
+preload_if_enabled()
@@ -62,6 +62,27 @@ DATABASES = {
     }  # MOD
 }
 
+# Cache compartida per tots els processos (workers, ordres i cron): hi viuen els comptadors
+# de versió de la cache de rànquings i dels recomptes de facetes, que s'han de veure des de
+# qualsevol procés. Amb REDIS_URL es fa servir Redis (cal el paquet redis); si no, una
+# cache en fitxers, compartida pels processos de la mateixa màquina.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'var' / 'cache',
+            # Prou entrades perquè el cull de Django no s'endugui els comptadors de versió
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -80,6 +101,16 @@ STATIC_URL = '/static/'  # MOD: Afegit slash inicial per consistència
 
 MEDIA_URL = '/media/'  # MOD: Suport fitxers pujats
 MEDIA_ROOT = BASE_DIR / 'media'  # MOD: Directori media
+EVENTS_THUMBNAIL_WORKERS = 2  # Threads que generen les versions de les miniatures en segon pla
+EVENTS_TRIGRAM_THRESHOLD = 0.5  # Fracció mínima de trigrames de la query compartits per a la cerca tolerant
+EVENTS_TRIGRAM_MAX_RESULTS = 50  # Esdeveniments aproximats que es mostren quan no hi ha coincidències exactes
+EVENTS_TOTAL_CACHE_TTL = 60  # Segons que es reutilitza el total aproximat d'esdeveniments de la llista (o l'error en obtenir-lo)
+EVENTS_INDEX_SYNC_INTERVAL = 30  # Segons entre sincronitzacions dels índexs en memòria amb les escriptures d'altres processos (0 = mai)
+EVENTS_MONGO_TIMEOUT_MS = 2000  # Temps màxim de selecció de servidor del client de MongoDB de les peticions
+EVENTS_FACETS_CACHE_BACKEND = None  # Alias de CACHES per als recomptes de facetes i el seu comptador de versió (None = 'default'); ha de ser compartit entre processos (no LocMem)
+EVENTS_FACETS_CACHE_ALLOW_LOCAL = False  # Permet desar els recomptes en una cache local (només amb un sol procés)
+EVENTS_FACETS_CACHE_TTL = 300  # Segons que es reutilitzen els recomptes de categoria i estat
+EVENTS_FACETS_LOCAL_TTL = 30  # Segons que es reutilitzen a cada procés si no hi ha cache compartida
 
 AUTH_USER_MODEL = 'users.CustomUser'  # MOD: Model d'usuari personalitzat (definir abans primer migrate)
 
@@ -98,6 +129,37 @@ MESSAGE_TAGS = {  # MOD: Adaptació a classes Bootstrap
     messages.ERROR: 'danger',
 }
 
+# Cerca semàntica: model actiu i cache d'embeddings de queries
+SEMANTIC_SEARCH_MODEL = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'  # Model actiu fins al primer switch_embedding_model
+SEMANTIC_SEARCH_MODEL_CHECK_INTERVAL = 30  # Segons entre lectures del model actiu (el canvi arriba a tots els processos)
+SEMANTIC_SEARCH_QUERY_CACHE_SIZE = 2048  # Nombre màxim de queries en memòria (LRU)
+SEMANTIC_SEARCH_QUERY_CACHE_TTL = 3600  # Segons abans que caduqui una entrada
+SEMANTIC_SEARCH_QUERY_CACHE_BACKEND = None  # Alias de CACHES compartit entre processos (p.ex. 'default')
+SEMANTIC_SEARCH_REEMBED_ON_SAVE = True  # Regenera l'embedding en segon pla quan canvia el text
+SEMANTIC_SEARCH_REEMBED_EXIT_TIMEOUT = 60  # Segons que un procés espera en sortir que la cua de re-embedding es buidi
+SEMANTIC_SEARCH_SNAPSHOT_DIR = BASE_DIR / 'var' / 'embeddings'  # Snapshots exportats amb export_embedding_snapshot
+SEMANTIC_SEARCH_EMBEDDING_DTYPE = 'float32'  # 'float32' (llista JSON), 'float16' o 'int8' (blob binari)
+SEMANTIC_SEARCH_RESCORE_FACTOR = 4  # Candidats (k x factor) que es tornen a puntuar en float32 (0 = desactivat)
+SEMANTIC_SEARCH_ENGINE = 'exact'  # 'exact' (totes les files) o 'ivf' (aproximat, vegeu build_ann_index)
+SEMANTIC_SEARCH_ANN_NPROBE = 8  # Cel·les IVF visitades per cerca: més recall a canvi de més latència
+SEMANTIC_SEARCH_ANN_NLIST = None  # Cel·les IVF en construir l'índex (None = ~√n)
+SEMANTIC_SEARCH_HYBRID_FUSION = 'rrf'  # Fusió de la cerca híbrida: 'rrf' (per posicions) o 'weighted'
+SEMANTIC_SEARCH_HYBRID_ALPHA = 0.5  # Pes del cosinus a la fusió 'weighted' (1 - alpha per a BM25)
+SEMANTIC_SEARCH_PRELOAD = os.environ.get('SEMANTIC_SEARCH_PRELOAD') == '1'  # Carrega i escalfa el model a wsgi/asgi (abans del fork)
+SEMANTIC_SEARCH_PRELOAD_INDEXES = False  # En precarregar, construeix també els índexs vectorial i lèxic
+SEMANTIC_SEARCH_TORCH_THREADS = None  # Threads intra-op de PyTorch per worker (None = per defecte)
+SEMANTIC_SEARCH_TORCH_INTEROP_THREADS = None  # Threads inter-op de PyTorch per worker (None = per defecte)
+SEMANTIC_SEARCH_BATCH_WINDOW_MS = 5  # Finestra per agrupar queries concurrents en un sol encode (0 = sense micro-lots)
+SEMANTIC_SEARCH_BATCH_MAX_SIZE = 32  # Màxim de queries per lot
+SEMANTIC_SEARCH_RESULT_CACHE_SIZE = 1024  # Rànquings de cerca en memòria (LRU)
+SEMANTIC_SEARCH_RESULT_CACHE_TTL = 300  # Segons abans que caduqui un rànquing
+SEMANTIC_SEARCH_RESULT_CACHE_BACKEND = None  # Alias de CACHES per als rànquings i el comptador de versió (None = 'default'); ha de ser compartit entre processos (no LocMem)
+SEMANTIC_SEARCH_RESULT_CACHE_ALLOW_LOCAL = False  # Permet la cache de rànquings amb una cache local (només amb un sol procés)
+SEMANTIC_SEARCH_MAX_RESULTS = 200  # Resultats que es classifiquen per query (i es paginen des de la cache)
+SEMANTIC_SEARCH_PAGE_SIZE = 20  # Resultats per pàgina a /semantic/
+SEMANTIC_SEARCH_NEIGHBOURS = 6  # Esdeveniments similars precalculats per esdeveniment (build_event_neighbours)
+SEMANTIC_SEARCH_NEIGHBOURS_ON_REEMBED = True  # Actualitza els veïns afectats quan canvia un embedding (carrega l'índex al procés si cal; False = només build_event_neighbours)
+
 # (Opcional futur producció)
 # CSRF_COOKIE_SECURE = True  # MOD
 # SESSION_COOKIE_SECURE = True  # MOD
@@ -13,4 +13,10 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Amb SEMANTIC_SEARCH_PRELOAD=1 el model es carrega aquí, abans que el servidor
+# (p.ex. gunicorn --preload) faci fork dels workers
+from semantic_search.services.warmup import preload_if_enabled  # noqa: E402
+
+preload_if_enabled()
\ No newline at end of file
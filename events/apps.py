@@ -6,3 +6,9 @@ class EventsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     # Nom de l'aplicació
     name = 'events'
+
+    def ready(self):
+        # Registra els signals que mantenen l'índex de trigrames actualitzat
+        from . import signals  # noqa: F401
+        # Comprovacions de configuració (manage.py check i arrencada del servidor)
+        from . import checks  # noqa: F401
@@ -0,0 +1,17 @@
+from django.core.checks import Warning, register
+
+
+@register()
+def check_facets_cache_backend(app_configs, **kwargs):
+    """Avisa si els recomptes de facetes només es desen a la cache local de cada procés."""
+    from .facets import facets_cache_enabled
+
+    if facets_cache_enabled():
+        return []
+    return [Warning(
+        "Els recomptes de categoria i estat de la llista només es desen EVENTS_FACETS_LOCAL_TTL segons a "
+        "cada procés: sense una cache compartida, les escriptures d'un altre procés no els invaliden.",
+        hint="Configura CACHES amb una cache compartida (la de fitxers per defecte, Redis o Memcached) "
+             "o EVENTS_FACETS_CACHE_BACKEND, o EVENTS_FACETS_CACHE_ALLOW_LOCAL = True si només hi ha un procés.",
+        id="events.W001",
+    )]
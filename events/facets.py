@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+logger = logging.getLogger(__name__)
+
+# Facetes que es compten i camp de l'esdeveniment de cadascuna
+FACETS = ('category', 'status')
+# Clau del comptador de versió dels esdeveniments
+VERSION_KEY = "events:facets_version"
+# Màxim de recomptes a la cache local del procés
+LOCAL_SIZE = 256
+
+# Recomptes recents d'aquest procés quan no hi ha cache compartida: clau → (caducitat, recomptes)
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache():
+    """Cache de Django dels recomptes (per defecte, la compartida de CACHES['default'])."""
+    from django.core.cache import caches
+
+    return caches[getattr(settings, "EVENTS_FACETS_CACHE_BACKEND", None) or "default"]
+
+
+def facets_cache_enabled() -> bool:
+    """
+    Si els recomptes es poden desar en cache. Cal una cache compartida: amb
+    una de local, les escriptures d'un altre worker o d'update_event_status
+    no invalidarien els recomptes d'aquest procés. Amb un sol procés es pot
+    forçar amb EVENTS_FACETS_CACHE_ALLOW_LOCAL.
+    """
+    from semantic_search.services.result_cache import is_shared
+
+    return is_shared(_cache()) or getattr(settings, "EVENTS_FACETS_CACHE_ALLOW_LOCAL", False)
+
+
+def facets_version() -> int:
+    """Versió actual dels esdeveniments per als recomptes en cache."""
+    backend = _cache()
+    version = backend.get(VERSION_KEY)
+    if version is None:
+        # add() no sobreescriu el valor si un altre procés l'acaba de crear
+        backend.add(VERSION_KEY, 1, timeout=None)
+        version = backend.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_facets_version() -> int:
+    """
+    Incrementa la versió: tots els recomptes en cache queden invalidats de
+    cop (es criden des dels signals de events/signals.py). També buida la
+    cache local del procés.
+    """
+    with _local_lock:
+        _local.clear()
+    backend = _cache()
+    try:
+        return backend.incr(VERSION_KEY)
+    except ValueError:
+        # La clau encara no existia (o ha estat expulsada de la cache)
+        backend.add(VERSION_KEY, 2, timeout=None)
+        return backend.get(VERSION_KEY, 2)
+
+
+def _local_counts(key: str, compute) -> dict:
+    """
+    Recomptes de la cache local del procés, o calculats i desats durant
+    EVENTS_FACETS_LOCAL_TTL segons. Sense comptador de versió compartit, les
+    escriptures d'altres processos no els invaliden: el TTL curt acota quant
+    poden quedar endarrerits i evita un $facet a cada petició de la llista.
+    """
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is not None and entry[0] > now:
+            _local.move_to_end(key)
+            return entry[1]
+    counts = compute()
+    with _local_lock:
+        _local[key] = (now + getattr(settings, "EVENTS_FACETS_LOCAL_TTL", 30), counts)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_SIZE:
+            _local.popitem(last=False)
+    return counts
+
+
+def _branch(field: str, filters: dict) -> list[dict]:
+    """
+    Subpipeline d'una faceta. És disjuntiva: aplica els filtres de les altres
+    facetes però no el seu, de manera que el desplegable mostra quants
+    resultats hi hauria triant cada opció.
+    """
+    match = {name: value for name, value in filters.items() if name != field and value}
+    stages = [{'$match': match}] if match else []
+    return stages + [{'$group': {'_id': f'${field}', 'n': {'$sum': 1}}}]
+
+
+def _aggregate_mongo(ids, filters: dict, text: str | None = None) -> dict:
+    """Tots els recomptes en una sola passada amb $facet."""
+    from .mongo import events_collection, shared_client
+
+    pipeline = [{'$match': {'id': {'$in': list(ids)}}}] if ids is not None else []
+    if text:
+        pattern = {'$regex': re.escape(text), '$options': 'i'}
+        pipeline.append({'$match': {'$or': [{'title': pattern}, {'tags': pattern}]}})
+    pipeline.append({'$facet': {field: _branch(field, filters) for field in FACETS}})
+    result = next(iter(events_collection(shared_client()).aggregate(pipeline)), {})
+    return {field: {row['_id']: row['n'] for row in result.get(field, [])} for field in FACETS}
+
+
+def _aggregate_orm(ids, filters: dict, text: str | None = None) -> dict:
+    """Equivalent amb l'ORM (una consulta per faceta) per a bases de dades que no són MongoDB."""
+    from .models import Event
+
+    queryset = Event.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if text:
+        queryset = queryset.filter(Q(title__icontains=text) | Q(tags__icontains=text))
+    counts = {}
+    for field in FACETS:
+        others = {name: value for name, value in filters.items() if name != field and value}
+        rows = queryset.filter(**others).values_list(field).annotate(n=Count('pk')).order_by()
+        counts[field] = dict(rows)
+    return counts
+
+
+def _aggregate(ids, filters: dict, text: str | None = None) -> dict:
+    """Recomptes sense cache, amb $facet a MongoDB o amb l'ORM a la resta."""
+    if settings.DATABASES['default']['ENGINE'] == 'djongo':
+        return _aggregate_mongo(ids, filters, text)
+    return _aggregate_orm(ids, filters, text)
+
+
+def facet_counts(ids=None, search: str = "", text: str | None = None, **filters) -> dict:
+    """
+    Recomptes per categoria i estat dels esdeveniments de la cerca actual.
+    Es desen a la cache compartida amb el comptador de versió si n'hi ha
+    (facets_cache_enabled); si no, uns quants segons a la del procés.
+
+    Args:
+        ids: Ids que compleixen la cerca de text (None = tots els esdeveniments)
+        search: Text de la cerca del qual surten els ids (forma part de la clau de cache)
+        text: Text que han de contenir el títol o els tags, per a les cerques
+            massa curtes per a l'índex de trigrames (que no donen ids)
+        **filters: Valors seleccionats de cada faceta (category, status)
+
+    Returns:
+        {'category': {valor: n}, 'status': {valor: n}}
+    """
+    filters = {field: filters.get(field) or None for field in FACETS}
+    parts = [search, text] + [filters[field] for field in FACETS]
+    if not facets_cache_enabled():
+        return _local_counts("\x00".join(str(p) for p in parts), lambda: _aggregate(ids, filters, text))
+    parts.insert(0, facets_version())
+    key = "events:facets:" + hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    backend = _cache()
+    counts = backend.get(key)
+    if counts is not None:
+        return counts
+
+    counts = _aggregate(ids, filters, text)
+    backend.set(key, counts, getattr(settings, "EVENTS_FACETS_CACHE_TTL", 300))
+    return counts
@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.models import EMBEDDING_FIELDS, Event
+
+
+class Command(BaseCommand):
+    help = ("Compara el temps de les consultes habituals d'esdeveniments i els bytes llegits de Mongo "
+            "amb els camps d'embedding inclosos (abans) i diferits (ara).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Repeticions per consulta (es mostra la mediana)")
+        parser.add_argument("--page-size", type=int, default=9, help="Esdeveniments per pàgina del llistat")
+
+    def handle(self, *args, **options):
+        page = options["page_size"]
+        # Consultes equivalents a la llista, la portada i update_event_status
+        scenarios = {
+            f"llistat ({page})": lambda qs: list(qs.order_by("scheduled_date")[:page]),
+            "portada (4)": lambda qs: list(qs[:4]),
+            "tots": lambda qs: list(qs),
+        }
+        self.stdout.write(f"{'consulta':<16}{'abans (ms)':>12}{'ara (ms)':>12}")
+        for label, query in scenarios.items():
+            before = self.measure(lambda: query(Event.objects.with_embeddings()), options["repeat"])
+            after = self.measure(lambda: query(Event.objects.all()), options["repeat"])
+            self.stdout.write(f"{label:<16}{before:>12.2f}{after:>12.2f}")
+
+        self.bytes_read(page)
+
+    @staticmethod
+    def measure(run, repeat: int) -> float:
+        samples = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def bytes_read(self, page: int):
+        """Mida BSON dels documents retornats per Mongo amb i sense els camps d'embedding."""
+        try:
+            import bson
+            from events.mongo import events_collection, mongo_client
+
+            client = mongo_client()
+        except Exception as exc:
+            self.stdout.write(self.style.WARNING(f"⚠ No es poden mesurar els bytes de Mongo: {exc}"))
+            return
+
+        try:
+            collection = events_collection(client)
+            excluded = {field: 0 for field in EMBEDDING_FIELDS}
+            self.stdout.write(f"\n{'documents':<16}{'abans (KB)':>12}{'ara (KB)':>12}{'bytes/doc':>12}")
+            for label, limit in ((f"llistat ({page})", page), ("tots", 0)):
+                full = [len(bson.encode(doc)) for doc in collection.find({}).sort("scheduled_date", 1).limit(limit)]
+                light = [len(bson.encode(doc))
+                         for doc in collection.find({}, excluded).sort("scheduled_date", 1).limit(limit)]
+                per_doc = f"{sum(full) // max(len(full), 1)} → {sum(light) // max(len(light), 1)}"
+                self.stdout.write(f"{label:<16}{sum(full) / 1024:>12.1f}{sum(light) / 1024:>12.1f}{per_doc:>12}")
+        finally:
+            client.close()
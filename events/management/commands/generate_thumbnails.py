@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+from events.thumbnails import process_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Genera les versions (mides i formats) de les miniatures que encara no en tenen o que han canviat."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Comprova totes les miniatures, no només les que no tenen versions")
+
+    def handle(self, *args, **options):
+        events = Event.objects.exclude(thumbnail='').exclude(thumbnail=None)
+        if not options["all"]:
+            events = events.filter(thumbnail_hash=None)
+        ids = list(events.values_list('id', flat=True))
+        self.stdout.write(f"Processant {len(ids)} miniatures...")
+        generated = 0
+        for event_id in ids:
+            try:
+                generated += process_thumbnail(event_id)
+            except Exception as exc:
+                self.stdout.write(self.style.ERROR(f"❌ Esdeveniment {event_id}: {exc}"))
+        self.stdout.write(self.style.SUCCESS(f"✅ {generated} miniatures processades"))
@@ -1,29 +1,56 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from django.utils import timezone
-from events.models import Event
 
-class Command(BaseCommand):
-    help = 'Actualitza automàticament els estats dels esdeveniments segons la data i la durada'
+from events.scheduler import apply_transitions, pop_due, upcoming_transitions
 
-    def handle(self, *args, **kwargs):
-        now = timezone.now()
-        events = Event.objects.all()
 
-        for event in events:
+class Command(BaseCommand):
+    help = 'Actualitza automàticament els estats dels esdeveniments segons la data i la durada'
 
-            # Si està programat i ja ha començat → en directe  
-            if event.status == 'scheduled' and event.scheduled_date <= now:
-                event.status = 'live'
-                event.save()
-                continue
+    def add_arguments(self, parser):
+        parser.add_argument('--daemon', action='store_true',
+                            help="Es queda en marxa i dorm fins a la propera transició d'estat")
+        parser.add_argument('--refresh', type=int, default=60,
+                            help='Segons màxims entre relectures de les transicions (mode --daemon)')
 
-            # Si està en directe → comprovem la durada
-            if event.status == 'live':
-                duration = event.get_duration()
-                finish_time = event.scheduled_date + duration
+    def handle(self, *args, **options):
+        if options['daemon']:
+            self.run_daemon(options['refresh'])
+            return
+        changed = apply_transitions()
+        self.report(changed)
+        self.stdout.write(self.style.SUCCESS('Estats actualitzats correctament'))
 
-                if finish_time <= now:
-                    event.status = 'finished'
-                    event.save()
+    def report(self, changed):
+        if changed['live'] or changed['finished']:
+            self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M:%S} → {len(changed['live'])} en directe, "
+                              f"{len(changed['finished'])} finalitzats")
 
-        self.stdout.write(self.style.SUCCESS('Estats actualitzats correctament'))
+    def run_daemon(self, refresh: int):
+        """
+        Aplica les transicions pendents i dorm fins a la següent del min-heap.
+        El heap es torna a llegir cada refresh segons, per incloure els
+        esdeveniments creats o reprogramats mentrestant.
+        """
+        self.stdout.write("Planificador d'estats en marxa (Ctrl+C per aturar)")
+        heap, loaded_at = [], None
+        try:
+            while True:
+                now = timezone.now()
+                due = pop_due(heap, now)
+                if loaded_at is None or (now - loaded_at).total_seconds() >= refresh:
+                    self.report(apply_transitions(now))
+                    heap, loaded_at = upcoming_transitions(now), now
+                elif due:
+                    # Les actualitzacions són per conjunts: també recullen les que el heap no coneixia
+                    self.report(apply_transitions(now))
+                wait = refresh - (timezone.now() - loaded_at).total_seconds()
+                if heap:
+                    wait = min(wait, (heap[0][0] - timezone.now()).total_seconds())
+                close_old_connections()
+                time.sleep(max(0.5, wait))
+        except KeyboardInterrupt:
+            self.stdout.write("Planificador aturat")
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_embedding_event_embedding_model_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='embedding_text_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_embedding_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='embedding_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
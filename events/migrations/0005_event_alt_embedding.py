@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_event_embedding_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='alt_embedding_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='alt_embedding_model',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='alt_embedding_text_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='alt_embedding_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.13 on 2026-10-18 21:40
+
+from django.db import migrations, models
+import events.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_status_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='thumbnail_renditions',
+            field=events.models.ListField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1.13 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_thumbnail_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['scheduled_date', 'id'], name='event_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['creator', 'created_at', 'id'], name='event_creator_created_idx'),
+        ),
+    ]
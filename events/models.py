@@ -1,11 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from PIL import Image
 import re
-import os
 
 # Opcions de categories dels esdeveniments
 CATEGORY_CHOICES = [
@@ -29,6 +27,26 @@ STATUS_CHOICES = [
 ]
 
 
+# Durada estimada de cada categoria (minuts)
+CATEGORY_DURATIONS = {
+    'gaming': 180,
+    'music': 90,
+    'talk': 60,
+    'education': 120,
+    'sports': 150,
+    'entertainment': 120,
+    'technology': 90,
+    'art': 120,
+    'other': 90,
+}
+# Durada de les categories desconegudes (minuts)
+DEFAULT_DURATION = 90
+
+# Camps amb els vectors d'embedding: ocupen la major part de cada document i
+# només els llegeix el codi de cerca (vegeu EventQuerySet.with_embeddings)
+EMBEDDING_FIELDS = ('embedding', 'embedding_blob', 'alt_embedding_blob')
+
+
 # Campo personalizado para manejar embeddings como lista en MongoDB
 class ListField(models.JSONField):
     """Campo personalizado para listas en MongoDB con Djongo"""
@@ -51,6 +69,24 @@ class ListField(models.JSONField):
         return value
 
 
+class EventQuerySet(models.QuerySet):
+    def with_embeddings(self):
+        """Inclou els camps d'embedding, que per defecte no es llegeixen."""
+        return self.defer(None)
+
+
+class EventManager(models.Manager.from_queryset(EventQuerySet)):
+    """
+    Manager per defecte dels esdeveniments: difereix els camps d'embedding,
+    de manera que les llistes, el detall, el xat i les ordres no transfereixen
+    ni deserialitzen els vectors. Si es desa un esdeveniment llegit així,
+    només s'escriuen els camps carregats (els vectors no es sobreescriuen).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*EMBEDDING_FIELDS)
+
+
 class Event(models.Model):
     # Camps bàsics
     title = models.CharField(max_length=200)
@@ -60,6 +96,9 @@ class Event(models.Model):
     scheduled_date = models.DateTimeField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     thumbnail = models.ImageField(upload_to='events/thumbnails/', blank=True, null=True)
+    # Hash del contingut de la miniatura i versions generades a partir d'ella (vegeu events/thumbnails.py)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, null=True)
+    thumbnail_renditions = ListField(blank=True, null=True)
     max_viewers = models.PositiveIntegerField(default=100)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -68,8 +107,20 @@ class Event(models.Model):
     stream_url = models.URLField(max_length=500, blank=True, null=True)
     
     embedding = ListField(blank=True, null=True)
+    # Embedding quantitzat (float16/int8) en format binari compacte
+    embedding_blob = models.BinaryField(blank=True, null=True)
     embedding_model = models.CharField(max_length=200, blank=True, null=True)
     embedding_updated_at = models.DateTimeField(blank=True, null=True)
+    # Hash del text a partir del qual s'ha generat l'embedding
+    embedding_text_hash = models.CharField(max_length=64, blank=True, null=True)
+    # Segon slot d'embedding, per generar els vectors d'un altre model mentre
+    # el primer continua servint les cerques (vegeu switch_embedding_model)
+    alt_embedding_blob = models.BinaryField(blank=True, null=True)
+    alt_embedding_model = models.CharField(max_length=200, blank=True, null=True)
+    alt_embedding_updated_at = models.DateTimeField(blank=True, null=True)
+    alt_embedding_text_hash = models.CharField(max_length=64, blank=True, null=True)
+
+    objects = EventManager()
 
     def __str__(self):
         return self.title
@@ -89,18 +140,7 @@ class Event(models.Model):
 
     # Durada estimada segons la categoria
     def get_duration(self):
-        category_durations = {
-            'gaming': 180,
-            'music': 90,
-            'talk': 60,
-            'education': 120,
-            'sports': 150,
-            'entertainment': 120,
-            'technology': 90,
-            'art': 120,
-            'other': 90,
-        }
-        return timedelta(minutes=category_durations.get(self.category, 90))
+        return timedelta(minutes=CATEGORY_DURATIONS.get(self.category, DEFAULT_DURATION))
 
     # Llista de tags separats per comes
     @property
@@ -154,29 +194,63 @@ class Event(models.Model):
 
         return None
 
-    # Sobreescriu el save per redimensionar imatges
+    # Versió de la miniatura d'una mida i un format, si ja s'ha generat
+    def get_thumbnail_rendition(self, size, extension):
+        for rendition in self.thumbnail_renditions or []:
+            if rendition['size'] == size and rendition['format'] == extension:
+                return rendition
+        return None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nom de la miniatura desada, per detectar si canvia sense tornar a llegir l'esdeveniment
+        if 'thumbnail' in field_names:
+            instance._loaded_thumbnail = values[field_names.index('thumbnail')]
+        return instance
+
+    # Sobreescriu el save per generar les versions de la miniatura quan canvia
     def save(self, *args, **kwargs):
-        try:
-            old_instance = Event.objects.get(pk=self.pk)
-        except Event.DoesNotExist:
-            old_instance = None
+        if 'thumbnail' in self.get_deferred_fields():
+            # La miniatura no s'ha llegit, així que tampoc no pot haver canviat
+            return super().save(*args, **kwargs)
+        loaded = getattr(self, '_loaded_thumbnail', None) or None
+        changed = (self.thumbnail.name if self.thumbnail else None) != loaded
+        if changed:
+            # Fins que el worker les generi, les plantilles mostren l'original
+            self.thumbnail_hash = None
+            self.thumbnail_renditions = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'thumbnail_hash', 'thumbnail_renditions'}
 
         super().save(*args, **kwargs)
+        # FileField.pre_save ha desat el fitxer: el nom definitiu (amb upload_to) és el de la base de dades
+        stored = self.thumbnail.name if self.thumbnail else None
+        self._loaded_thumbnail = stored
+        if not changed:
+            return
+
+        if stored:
+            from .thumbnails import enqueue_thumbnail
 
-        # Redimensiona la miniatura
-        if self.thumbnail:
-            img_path = self.thumbnail.path
-            img = Image.open(img_path)
-            max_size = (800, 450)
-            img.thumbnail(max_size)
-            img.save(img_path)
-        elif old_instance and old_instance.thumbnail and not self.thumbnail:
-            old_path = old_instance.thumbnail.path
-            if os.path.exists(old_path):
-                os.remove(old_path)
+            # Les versions es generen en segon pla: la petició no depèn de la mida de la imatge
+            transaction.on_commit(lambda: enqueue_thumbnail(self.pk))
+        if loaded and loaded != stored:
+            # Miniatura substituïda o eliminada: esborrem l'original anterior (les versions poden ser compartides)
+            storage = self.thumbnail.storage
+            transaction.on_commit(lambda: storage.delete(loaded))
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Consultes per rang de l'actualització d'estats (vegeu events/scheduler.py)
+            models.Index(fields=['status', 'scheduled_date'], name='event_status_date_idx'),
+            # Paginació per clau de la llista (vegeu events/pagination.py)
+            models.Index(fields=['scheduled_date', 'id'], name='event_date_id_idx'),
+            # Esdeveniments de l'usuari (MyEventsView: filtre per creador, ordre per creació)
+            models.Index(fields=['creator', 'created_at', 'id'], name='event_creator_created_idx'),
+        ]
         verbose_name = 'Esdeveniment'
         verbose_name_plural = 'Esdeveniments'
         
\ No newline at end of file
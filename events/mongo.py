@@ -0,0 +1,45 @@
+import threading
+
+from django.conf import settings
+import pymongo
+
+# Lock per crear el client compartit una sola vegada
+_lock = threading.Lock()
+# Client compartit pels threads del procés (consultes des de les vistes)
+_client = None
+
+
+def mongo_client(**options) -> pymongo.MongoClient:
+    """
+    Crea un client de MongoDB amb la configuració de la base de dades per defecte.
+    Les dates es retornen amb zona horària (UTC), igual que amb l'ORM.
+    """
+    db_settings = settings.DATABASES['default']
+    return pymongo.MongoClient(db_settings['CLIENT']['host'], tz_aware=True, **options)
+
+
+def shared_client() -> pymongo.MongoClient:
+    """
+    Client del procés per a les consultes fetes des de les peticions. Té el
+    seu propi pool de connexions i no s'ha de tancar (les ordres de manage.py
+    fan servir mongo_client() i el tanquen en acabar).
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                # Una petició no pot esperar els 30 s per defecte si MongoDB no respon
+                _client = mongo_client(
+                    serverSelectionTimeoutMS=getattr(settings, "EVENTS_MONGO_TIMEOUT_MS", 2000),
+                )
+    return _client
+
+
+def get_database(client: pymongo.MongoClient):
+    """Retorna la base de dades del projecte a partir d'un client."""
+    return client[settings.DATABASES['default']['NAME']]
+
+
+def events_collection(client: pymongo.MongoClient):
+    """Retorna la col·lecció on Djongo guarda els esdeveniments."""
+    return get_database(client)['events_event']
@@ -0,0 +1,199 @@
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+from semantic_search.services.cursor import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Salt de la signatura dels tokens de pàgina
+SALT = "events.pagination"
+# Clau de cache del total aproximat d'esdeveniments
+TOTAL_KEY = "events:estimated_total"
+# Valor desat quan no s'ha pogut obtenir el total
+UNKNOWN_TOTAL = -1
+
+
+class KeysetPage:
+    """
+    Pàgina d'una paginació per clau. No coneix el seu número ni el total de
+    pàgines: només si n'hi ha una abans i una després, i els tokens per anar-hi.
+    """
+
+    def __init__(self, object_list, next_token=None, prev_token=None):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.prev_token = prev_token
+        # Total aproximat d'esdeveniments, si la vista el pot donar sense comptar
+        self.total = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_token is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_token is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Paginació per clau (keyset) sobre una ordenació (camp, id).
+
+    En lloc de COUNT i OFFSET (que Djongo tradueix a un $skip que recorre tots
+    els documents anteriors), cada pàgina continua des de la clau de l'últim
+    element de l'anterior: camp > v OR (camp = v AND id > id_v). Amb un índex
+    sobre (camp, id) la pàgina 500 costa el mateix que la primera.
+
+    Els tokens són opacs i signats, i només valen per als mateixos filtres
+    (scope) amb què s'han generat.
+    """
+
+    def __init__(self, queryset, ordering: tuple[str, str], per_page: int, scope: str = ""):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.scope = fingerprint(scope)
+        self.descending = ordering[0].startswith("-")
+        self.fields = [name.lstrip("-") for name in ordering]
+
+    def _key(self, obj) -> list[str]:
+        return [
+            obj._meta.get_field(name).value_to_string(obj) for name in self.fields
+        ]
+
+    def encode(self, obj, forward: bool) -> str:
+        return signing.dumps({'k': self._key(obj), 'f': forward, 's': self.scope}, salt=SALT, compress=True)
+
+    def decode(self, token: str | None) -> tuple[list, bool] | None:
+        """Clau i direcció d'un token, o None si no n'hi ha o no és vàlid per a aquests filtres."""
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=SALT)
+        except signing.BadSignature:
+            return None
+        if not isinstance(data, dict) or data.get('s') != self.scope or len(data.get('k', ())) != 2:
+            return None
+        model = self.queryset.model
+        try:
+            key = [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, data['k'])]
+        except Exception:
+            return None
+        return key, bool(data.get('f', True))
+
+    def _seek(self, queryset, key, forward: bool):
+        # Cap endavant en ordre descendent (o enrere en ascendent) els valors decreixen
+        lookup = "lt" if forward == self.descending else "gt"
+        (field, tie), (value, tie_value) = self.fields, key
+        return queryset.filter(
+            Q(**{f"{field}__{lookup}": value}) | Q(**{field: value, f"{tie}__{lookup}": tie_value})
+        )
+
+    def page(self, token: str | None = None) -> KeysetPage:
+        cursor = self.decode(token)
+        queryset = self.queryset
+        forward = True
+        if cursor is not None:
+            key, forward = cursor
+            queryset = self._seek(queryset, key, forward)
+
+        ordering = self.ordering
+        if not forward:
+            # Per tornar enrere es llegeix en ordre invers i es gira la pàgina
+            ordering = [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+        # Un element de més indica si hi ha una altra pàgina en aquesta direcció
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if cursor is None:
+            has_next, has_previous = more, False
+        elif forward:
+            has_next, has_previous = more, True
+        else:
+            has_next, has_previous = True, more
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_token=self.encode(rows[-1], True) if has_next else None,
+            prev_token=self.encode(rows[0], False) if has_previous else None,
+        )
+
+
+def estimated_total() -> int | None:
+    """
+    Nombre aproximat d'esdeveniments, llegit de les metadades de la col·lecció
+    (estimated_document_count, sense recórrer documents) i desat en cache
+    EVENTS_TOTAL_CACHE_TTL segons. Retorna None si no es pot obtenir.
+    """
+    ttl = getattr(settings, "EVENTS_TOTAL_CACHE_TTL", 60)
+    total = cache.get(TOTAL_KEY)
+    if total is not None:
+        return total if total >= 0 else None
+    try:
+        from .mongo import events_collection, shared_client
+
+        total = events_collection(shared_client()).estimated_document_count()
+    except Exception as exc:
+        # També es desa l'error: durant el TTL les peticions no tornen a esperar MongoDB
+        logger.warning("No s'ha pogut estimar el nombre d'esdeveniments: %s", exc)
+        cache.set(TOTAL_KEY, UNKNOWN_TOTAL, ttl)
+        return None
+    cache.set(TOTAL_KEY, total, ttl)
+    return total
+
+
+class KeysetPaginationMixin:
+    """
+    Substitueix la paginació per números de pàgina d'una ListView per
+    paginació per clau. Les plantilles reben page_obj (KeysetPage), next_url
+    i prev_url, que conserven la resta de paràmetres GET.
+    """
+
+    keyset_ordering = ('scheduled_date', 'id')
+    cursor_kwarg = 'cursor'
+
+    def get_pagination_scope(self) -> str:
+        """Filtres als quals pertanyen els tokens (per defecte, els paràmetres GET)."""
+        query = self.request.GET.copy()
+        for name in (self.cursor_kwarg, self.page_kwarg):
+            query.pop(name, None)
+        return query.urlencode()
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size, scope=self.get_pagination_scope())
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages
+
+    def _page_url(self, token: str | None) -> str | None:
+        if token is None:
+            return None
+        query = self.request.GET.copy()
+        query.pop(self.page_kwarg, None)
+        query[self.cursor_kwarg] = token
+        return f"?{query.urlencode()}"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get("page_obj")
+        if page is not None:
+            context["next_url"] = self._page_url(page.next_token)
+            context["prev_url"] = self._page_url(page.prev_token)
+        return context
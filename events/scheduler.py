@@ -0,0 +1,93 @@
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import CATEGORY_DURATIONS, DEFAULT_DURATION, Event
+from .signals import events_bulk_updated
+
+
+def _duration(category) -> timedelta:
+    return timedelta(minutes=CATEGORY_DURATIONS.get(category, DEFAULT_DURATION))
+
+
+def _update(queryset, status: str, now) -> list[int]:
+    """Canvia l'estat d'un conjunt d'esdeveniments amb un sol update() i en retorna els ids."""
+    ids = list(queryset.values_list('id', flat=True))
+    if ids:
+        # Es manté la condició original per no trepitjar un canvi fet entremig
+        queryset.filter(pk__in=ids).update(status=status, updated_at=now)
+    return ids
+
+
+def apply_transitions(now=None) -> dict[str, list[int]]:
+    """
+    Aplica les transicions d'estat pendents amb consultes per rang sobre
+    l'índex (status, scheduled_date), sense recórrer tots els esdeveniments:
+
+    - scheduled → live: els programats que ja han començat
+    - live → finished: els en directe que ja han superat la durada de la
+      seva categoria (una consulta per durada)
+
+    Com update() no dispara post_save, s'envia events_bulk_updated amb els
+    ids modificats perquè els índexs de cerca d'aquest procés s'actualitzin
+    de seguida. Els dels workers web (l'ordre corre en un altre procés) ho
+    fan en la propera sincronització, perquè l'update() també avança updated_at.
+
+    Returns:
+        Diccionari amb els ids que han passat a 'live' i a 'finished'
+    """
+    now = now or timezone.now()
+    live = _update(Event.objects.filter(status='scheduled', scheduled_date__lte=now), 'live', now)
+
+    finished = []
+    by_duration = {}
+    for category, minutes in CATEGORY_DURATIONS.items():
+        by_duration.setdefault(minutes, []).append(category)
+    for minutes, categories in by_duration.items():
+        due = Event.objects.filter(
+            status='live', category__in=categories, scheduled_date__lte=now - timedelta(minutes=minutes)
+        )
+        finished += _update(due, 'finished', now)
+    unknown = Event.objects.filter(status='live', scheduled_date__lte=now - timedelta(minutes=DEFAULT_DURATION))
+    finished += _update(unknown.exclude(category__in=list(CATEGORY_DURATIONS)), 'finished', now)
+
+    changed = live + finished
+    if changed:
+        events_bulk_updated.send(sender=Event, event_ids=changed, fields=('status', 'updated_at'))
+    return {'live': live, 'finished': finished}
+
+
+def upcoming_transitions(now=None, limit: int = 1000) -> list[tuple]:
+    """
+    Min-heap de les properes transicions: (moment, event_id, estat nou,
+    categoria). Inclou l'inici dels primers esdeveniments programats i el
+    final de tots els que són en directe.
+    """
+    now = now or timezone.now()
+    heap = [
+        (scheduled_date, event_id, 'live', category)
+        for event_id, scheduled_date, category in Event.objects.filter(status='scheduled', scheduled_date__gt=now)
+        .order_by('scheduled_date').values_list('id', 'scheduled_date', 'category')[:limit]
+    ]
+    heap += [
+        (scheduled_date + _duration(category), event_id, 'finished', category)
+        for event_id, scheduled_date, category in Event.objects.filter(status='live')
+        .values_list('id', 'scheduled_date', 'category')
+    ]
+    heapq.heapify(heap)
+    return heap
+
+
+def pop_due(heap: list[tuple], now) -> list[tuple]:
+    """
+    Treu del heap les transicions ja vençudes. Quan un esdeveniment comença,
+    s'hi afegeix el moment en què acabarà segons la durada de la categoria.
+    """
+    due = []
+    while heap and heap[0][0] <= now:
+        when, event_id, status, category = heapq.heappop(heap)
+        due.append((when, event_id, status, category))
+        if status == 'live':
+            heapq.heappush(heap, (when + _duration(category), event_id, 'finished', category))
+    return due
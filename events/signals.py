@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .facets import bump_facets_version
+from .models import Event
+from .trigram import get_loaded_trigram_index
+
+# S'envia després d'actualitzar esdeveniments amb QuerySet.update(), que no
+# dispara post_save. Arguments: event_ids (llista d'ids) i fields (camps modificats).
+events_bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Event)
+def update_event_trigrams(sender, instance, **kwargs):
+    """Actualitza l'índex de trigrames quan es desa un esdeveniment."""
+    index = get_loaded_trigram_index()
+    # Si l'índex encara no s'ha carregat, ja llegirà les dades actualitzades
+    if index is None or {'title', 'tags'} & instance.get_deferred_fields():
+        return
+    index.upsert(instance.pk, instance.title, instance.tags)
+
+
+@receiver(post_delete, sender=Event)
+def remove_event_trigrams(sender, instance, **kwargs):
+    """Elimina l'esdeveniment de l'índex de trigrames quan s'esborra."""
+    index = get_loaded_trigram_index()
+    if index is None:
+        return
+    index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(events_bulk_updated, sender=Event)
+def invalidate_facet_counts(sender, **kwargs):
+    """Invalida els recomptes de categoria i estat en cache quan canvia qualsevol esdeveniment."""
+    bump_facets_version()
@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+# Les files modificades en aquest marge abans de l'última sincronització es
+# tornen a llegir, per si el rellotge d'un altre servidor va una mica endarrerit
+MARGIN = timedelta(seconds=5)
+
+
+class IndexSync:
+    """
+    Posa al dia un índex en memòria amb les escriptures que no passen pels
+    signals d'aquest procés: les d'altres workers, els update() massius
+    (update_event_status) i els bulk_write del backfill.
+
+    Fa de marca d'aigua (watermark) el moment de l'última sincronització:
+    cada EVENTS_INDEX_SYNC_INTERVAL segons llegeix els esdeveniments amb algun
+    dels camps de data posterior i compara els ids indexats amb els existents
+    per treure'n els esborrats.
+    """
+
+    def __init__(self, fields=('updated_at',), interval: float | None = None):
+        self.fields = fields
+        if interval is None:
+            interval = getattr(settings, "EVENTS_INDEX_SYNC_INTERVAL", 30)
+        self.interval = interval
+        # S'ha de crear abans de llegir les files de l'índex: el que s'escrigui mentre es construeix es torna a llegir
+        self.watermark = timezone.now()
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        """Si ja ha passat l'interval des de l'última sincronització (mai amb interval None o 0)."""
+        return bool(self.interval) and time.monotonic() - self._checked >= self.interval
+
+    def run(self, apply, indexed_ids, remove, force: bool = False) -> int:
+        """
+        Aplica a l'índex els canvis fets des de l'última sincronització. Si un
+        altre thread ja està sincronitzant, no espera: torna 0.
+
+        Args:
+            apply: Funció que rep el queryset dels esdeveniments modificats i
+                la data des de la qual es llegeixen, i els torna a indexar;
+                retorna quants n'ha aplicat
+            indexed_ids: Funció que retorna els ids indexats
+            remove: Funció que elimina un id de l'índex
+            force: Sincronitza encara que no hagi passat l'interval
+
+        Returns:
+            Nombre d'esdeveniments modificats o esborrats
+        """
+        from .models import Event
+
+        if not force and not self.due():
+            return 0
+        if not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            now = timezone.now()
+            since = self.watermark - MARGIN
+            changed = Event.objects.filter(reduce(or_, (Q(**{f"{field}__gt": since}) for field in self.fields)))
+            count = apply(changed, since)
+            existing = set(Event.objects.values_list('id', flat=True).iterator())
+            deleted = [event_id for event_id in indexed_ids() if event_id not in existing]
+            for event_id in deleted:
+                remove(event_id)
+            self.watermark = now
+            self._checked = time.monotonic()
+            return count + len(deleted)
+        finally:
+            self._lock.release()
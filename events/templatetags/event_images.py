@@ -0,0 +1,51 @@
+from django import template
+from django.templatetags.static import static
+
+from events.thumbnails import FORMATS
+
+register = template.Library()
+
+# Versions per a cada lloc on es mostra la miniatura: (1x, 2x)
+SLOTS = {
+    'card': ('card', 'detail'),
+    'detail': ('detail', 'retina'),
+}
+
+
+@register.inclusion_tag('events/includes/picture.html')
+def event_picture(event, slot='card', css_class='', style=''):
+    """
+    <picture> amb la miniatura de l'esdeveniment: WebP i JPEG de la mida del
+    lloc (1x) i de la següent (2x, pantalles retina). Mentre les versions no
+    s'han generat es mostra l'original, i sense miniatura la imatge per defecte.
+    """
+    from django.core.files.storage import default_storage
+
+    sources, fallback, width, height = [], None, None, None
+    for extension in FORMATS:
+        renditions = [event.get_thumbnail_rendition(size, extension) for size in SLOTS[slot]]
+        if renditions[0] is None:
+            continue
+        srcset = ", ".join(
+            f"{default_storage.url(rendition['name'])} {density}x"
+            for density, rendition in enumerate(renditions, start=1) if rendition
+        )
+        if extension == 'jpg':
+            fallback = default_storage.url(renditions[0]['name'])
+            width, height = renditions[0]['width'], renditions[0]['height']
+        sources.append({'type': f"image/{'jpeg' if extension == 'jpg' else extension}", 'srcset': srcset})
+
+    if fallback is None:
+        fallback = event.thumbnail.url if event.thumbnail else static('events/default_thumbnail.jpg')
+        sources = []
+    return {
+        'sources': sources,
+        'src': fallback,
+        'width': width,
+        'height': height,
+        'alt': event.title,
+        'css_class': css_class,
+        'style': style,
+        # Les targetes poden quedar fora de la pantalla; la imatge del detall no
+        'lazy': slot == 'card',
+    }
@@ -1,3 +1,54 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import trigram
+from .models import Event
+from .trigram import build_trigram_index, sync_trigram_index
+
+
+@override_settings(SEMANTIC_SEARCH_REEMBED_ON_SAVE=False)
+class EventSearchTests(TestCase):
+    """Cerca de text de la llista d'esdeveniments (índex de trigrames)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('creator', password='secret')
+
+    def setUp(self):
+        # Cada test té els seus esdeveniments: l'índex global es torna a construir
+        trigram._index = None
+
+    def _event(self, title: str, days: int = 1) -> Event:
+        return Event.objects.create(
+            title=title, description=title, creator=self.user, category='music',
+            scheduled_date=timezone.now() + timedelta(days=days),
+        )
+
+    def _titles(self, q: str) -> list[str]:
+        response = self.client.get(reverse('events:event_list'), {'q': q})
+        return [event.title for event in response.context['events']]
+
+    def test_fuzzy_results_keep_similarity_order(self):
+        self._event('Festival de jazz i blues', days=1)
+        self._event('Jazz', days=5)
+        # Sense coincidència exacta: l'ordre és per semblança, no per data
+        self.assertEqual(self._titles('jazzz'), ['Jazz', 'Festival de jazz i blues'])
+
+    def test_short_query_falls_back_to_database(self):
+        self._event('Xerrada IA')
+        self._event('Concert')
+        self.assertIsNone(build_trigram_index().contains('ia'))
+        self.assertEqual(self._titles('ia'), ['Xerrada IA'])
+
+    def test_trigram_index_syncs_writes_without_signal(self):
+        event = self._event('Curs de Python')
+        index = build_trigram_index()
+        Event.objects.filter(pk=event.pk).update(title='Curs de Django', updated_at=timezone.now())
+
+        sync_trigram_index(index, force=True)
+        self.assertEqual(index.contains('django'), {event.pk})
+        self.assertEqual(index.contains('python'), set())
@@ -0,0 +1,12 @@
+import unicodedata
+
+
+def fold(text: str) -> str:
+    """
+    Normalitza un text per comparar-lo: minúscules i sense accents ni
+    diacrítics. La ela geminada (l·l) es converteix en ll, de manera que
+    "col·lecció" i "colleccio" donen el mateix token.
+    """
+    text = (text or "").lower().replace("l·l", "ll").replace("ŀl", "ll")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Mides de les versions de cada miniatura (amplada, alçada màximes)
+RENDITIONS = {
+    'card': (400, 225),
+    'detail': (800, 450),
+    'retina': (1600, 900),
+}
+# Formats generats per a cada mida (extensió, format de PIL, opcions)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+# Directori de les versions (els noms depenen del contingut de l'original)
+RENDITIONS_DIR = 'events/thumbnails/renditions'
+
+# Lock per crear el pool global una sola vegada
+_lock = threading.Lock()
+# Pool global del procés
+_pool = None
+
+
+def file_hash(field_file) -> str:
+    """Hash SHA-256 del contingut d'un fitxer pujat (es llegeix per blocs)."""
+    digest = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def rendition_name(digest: str, size: str, extension: str) -> str:
+    return f"{RENDITIONS_DIR}/{digest[:2]}/{digest[:24]}-{size}.{extension}"
+
+
+def render_renditions(field_file, digest: str) -> list[dict]:
+    """
+    Genera totes les versions (mida x format) d'una imatge. Els noms depenen
+    del hash del contingut: si una versió ja existeix (la mateixa imatge
+    pujada abans) no es torna a generar. L'original no es modifica.
+
+    Returns:
+        Llista de {'size', 'format', 'width', 'height', 'name'}
+    """
+    field_file.open('rb')
+    try:
+        image = ImageOps.exif_transpose(Image.open(field_file))
+        image.load()
+    finally:
+        field_file.close()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    renditions = []
+    for size, box in RENDITIONS.items():
+        resized = image.copy()
+        # thumbnail() només redueix: una imatge petita es manté a la seva mida
+        resized.thumbnail(box, Image.LANCZOS)
+        for extension, (pil_format, options) in FORMATS.items():
+            name = rendition_name(digest, size, extension)
+            if not default_storage.exists(name):
+                frame = resized.convert('RGB') if pil_format == 'JPEG' else resized
+                buffer = BytesIO()
+                frame.save(buffer, pil_format, **options)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            renditions.append({
+                'size': size, 'format': extension, 'width': resized.width, 'height': resized.height, 'name': name,
+            })
+    return renditions
+
+
+def process_thumbnail(event_id: int) -> bool:
+    """
+    Genera les versions de la miniatura d'un esdeveniment si el contingut ha
+    canviat respecte de l'últim processament. Retorna True si s'han desat.
+    """
+    from .models import Event
+
+    event = Event.objects.filter(pk=event_id).only('thumbnail', 'thumbnail_hash', 'thumbnail_renditions').first()
+    if event is None or not event.thumbnail:
+        return False
+    digest = file_hash(event.thumbnail)
+    if digest == event.thumbnail_hash and event.thumbnail_renditions:
+        return False
+    renditions = render_renditions(event.thumbnail, digest)
+    # Si mentrestant s'ha pujat una altra imatge, aquestes versions ja no serveixen
+    updated = Event.objects.filter(pk=event_id, thumbnail=event.thumbnail.name).update(
+        thumbnail_hash=digest, thumbnail_renditions=renditions,
+    )
+    return bool(updated)
+
+
+def _run(event_id: int):
+    try:
+        process_thumbnail(event_id)
+    except Exception:
+        logger.exception("Error generant les miniatures de l'esdeveniment %s", event_id)
+    finally:
+        close_old_connections()
+
+
+def get_thumbnail_pool() -> ThreadPoolExecutor:
+    """Retorna el pool global del procés (EVENTS_THUMBNAIL_WORKERS threads)."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "EVENTS_THUMBNAIL_WORKERS", 2),
+                    thread_name_prefix="event-thumbnails",
+                )
+    return _pool
+
+
+def enqueue_thumbnail(event_id: int):
+    """Encua la generació de les versions de la miniatura, fora de la petició."""
+    get_thumbnail_pool().submit(_run, event_id)
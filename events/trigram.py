@@ -0,0 +1,216 @@
+import heapq
+import re
+import threading
+
+from django.conf import settings
+
+from .text import fold
+
+# Lock per construir l'índex global una sola vegada
+_lock = threading.Lock()
+# Índex global del procés
+_index = None
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Text normalitzat amb fold i amb els separadors reduïts a un espai."""
+    return " ".join(_WORD_RE.findall(fold(text)))
+
+
+def word_trigrams(text: str) -> set[str]:
+    """
+    Trigrames de cada paraula, amb dos espais al davant i un al darrere com
+    pg_trgm ("jazz" → "  j", " ja", "jaz", "azz", "zz "). Els extrems fan que
+    les paraules curtes i els inicis de paraula també comptin.
+    """
+    grams = set()
+    for word in _WORD_RE.findall(fold(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def inner_trigrams(text: str) -> set[str]:
+    """
+    Trigrames interiors de les paraules de 3 o més lletres. Qualsevol text que
+    contingui la query com a subcadena els conté tots (a diferència dels
+    trigrames amb espais, que depenen d'on comença i acaba cada paraula).
+    """
+    grams = set()
+    for word in _WORD_RE.findall(fold(text)):
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Índex de trigrames en memòria sobre el títol i els tags dels esdeveniments.
+
+    Substitueix el title__icontains de la llista (que Djongo tradueix a una
+    regex sense ancorar i, per tant, a un recorregut de tota la col·lecció):
+
+    - contains(): intersecta les llistes de trigrames de la query i només
+      comprova la subcadena sobre els candidats.
+    - similar(): puntua per trigrames compartits, de manera que tolera errors
+      d'escriptura ("jaz festval" troba "Festival de Jazz").
+    """
+
+    def __init__(self):
+        self._postings = {}
+        # Text normalitzat i trigrames de cada esdeveniment indexat
+        self._texts = {}
+        self._grams = {}
+        # Sincronització amb les escriptures d'altres processos (la fixa build_trigram_index)
+        self.sync = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, event_id):
+        return event_id in self._texts
+
+    def ids(self) -> list[int]:
+        """Ids dels esdeveniments indexats."""
+        with self._lock:
+            return list(self._texts)
+
+    def upsert(self, event_id: int, title: str | None, tags: str | None = None):
+        """Afegeix o substitueix el títol i els tags d'un esdeveniment."""
+        # El salt de línia evita coincidències que comencin al títol i acabin als tags
+        text = "\n".join(normalize(part) for part in (title, tags) if part)
+        grams = word_trigrams(text)
+        with self._lock:
+            self.remove(event_id)
+            if not grams:
+                return
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(event_id)
+            self._texts[event_id] = text
+            self._grams[event_id] = grams
+
+    def remove(self, event_id: int) -> bool:
+        """Elimina un esdeveniment de l'índex."""
+        with self._lock:
+            grams = self._grams.pop(event_id, None)
+            if grams is None:
+                return False
+            for gram in grams:
+                posting = self._postings[gram]
+                posting.discard(event_id)
+                if not posting:
+                    del self._postings[gram]
+            del self._texts[event_id]
+            return True
+
+    def contains(self, query: str) -> set[int] | None:
+        """
+        Ids dels esdeveniments el títol o els tags dels quals contenen la query
+        (sense distingir majúscules ni accents).
+
+        Retorna None si la query només té paraules de menys de 3 lletres: no
+        té trigrames interiors per acotar els candidats i caldria recórrer tots
+        els textos (i filtrar després per una llista d'ids sense límit).
+        """
+        needle = normalize(query)
+        if not needle:
+            return set()
+        grams = inner_trigrams(needle)
+        if not grams:
+            return None
+        with self._lock:
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            # Començant per la llista més curta, el conjunt de candidats es redueix de seguida
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    break
+            return {event_id for event_id in candidates if needle in self._texts[event_id]}
+
+    def similar(self, query: str, k: int = 20, threshold: float | None = None) -> list[tuple[int, float]]:
+        """
+        Esdeveniments més semblants a la query per trigrames.
+
+        La puntuació és la fracció de trigrames de la query presents a
+        l'esdeveniment (com word_similarity de pg_trgm), de manera que un títol
+        llarg no penalitza una query curta.
+
+        Args:
+            query: Text de la cerca
+            k: Nombre màxim de resultats
+            threshold: Puntuació mínima (per defecte EVENTS_TRIGRAM_THRESHOLD)
+
+        Returns:
+            Llista de tuples (event_id, score) ordenada per score descendent
+        """
+        if threshold is None:
+            threshold = getattr(settings, "EVENTS_TRIGRAM_THRESHOLD", 0.5)
+        grams = word_trigrams(query)
+        if not grams:
+            return []
+        with self._lock:
+            shared = {}
+            for gram in grams:
+                for event_id in self._postings.get(gram, ()):
+                    shared[event_id] = shared.get(event_id, 0) + 1
+            scored = [
+                # A igual puntuació, primer els textos més curts (més propers a la query)
+                (count / len(grams), -len(self._grams[event_id]), event_id)
+                for event_id, count in shared.items() if count / len(grams) >= threshold
+            ]
+        return [(event_id, score) for score, _, event_id in heapq.nlargest(k, scored)]
+
+
+def build_trigram_index() -> TrigramIndex:
+    """Construeix l'índex de trigrames amb el títol i els tags de tots els esdeveniments."""
+    from .models import Event
+    from .sync import IndexSync
+
+    index = TrigramIndex()
+    # Abans de llegir res: el que s'escrigui mentre es construeix arriba amb la primera sincronització
+    sync = IndexSync()
+    _apply_rows(index, Event.objects.all())
+    index.sync = sync
+    return index
+
+
+def _apply_rows(index: TrigramIndex, rows) -> int:
+    """Indexa el títol i els tags de les files d'un queryset."""
+    count = 0
+    for event_id, title, tags in rows.values_list('id', 'title', 'tags'):
+        index.upsert(event_id, title, tags)
+        count += 1
+    return count
+
+
+def sync_trigram_index(index: TrigramIndex, force: bool = False) -> int:
+    """
+    Aplica a l'índex els títols i tags escrits per altres processos (vegeu
+    events.sync.IndexSync). Retorna el nombre d'esdeveniments modificats o esborrats.
+    """
+    if index.sync is None:
+        return 0
+    return index.sync.run(lambda rows, since: _apply_rows(index, rows), index.ids, index.remove, force=force)
+
+
+def get_trigram_index() -> TrigramIndex:
+    """
+    Retorna l'índex de trigrames global del procés, carregant-lo de forma lazy
+    i thread-safe, i el posa al dia cada EVENTS_INDEX_SYNC_INTERVAL segons.
+    """
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = build_trigram_index()
+    else:
+        sync_trigram_index(_index)
+    return _index
+
+
+def get_loaded_trigram_index() -> TrigramIndex | None:
+    """Retorna l'índex de trigrames global només si ja s'ha carregat (no força la càrrega)."""
+    return _index
@@ -6,6 +6,7 @@ from .views import (
     EventUpdateView,
     EventDeleteView,
     MyEventsView,
+    event_suggest,
 )
 
 app_name = "events"
@@ -14,6 +15,9 @@ urlpatterns = [
     # Llista d'esdeveniments públics
     path("", EventListView.as_view(), name="event_list"),
 
+    # Suggeriments de títols per semblança (JSON)
+    path("suggest/", event_suggest, name="event_suggest"),
+
     # Crear un nou esdeveniment
     path("create/", EventCreateView.as_view(), name="event_create"),
 
@@ -1,19 +1,34 @@
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.utils import timezone
 from .models import Event
 from .forms import EventCreationForm, EventUpdateForm, EventSearchForm
+from .facets import facet_counts
+from .pagination import KeysetPage, KeysetPaginationMixin, estimated_total
+from .trigram import get_trigram_index
 from chat.forms import ChatMessageForm
+from semantic_search.services.neighbours import similar_events
 
 
-# Llista general d'esdeveniments amb paginació i filtres
-class EventListView(ListView):
+# Llista general d'esdeveniments amb paginació per clau i filtres
+class EventListView(KeysetPaginationMixin, ListView):
     model = Event
     template_name = "events/event_list.html"
     context_object_name = "events"
     paginate_by = 9
+    keyset_ordering = ("scheduled_date", "id")
+    # Ids que compleixen la cerca de text (None sense cerca) i filtres aplicats
+    search_ids = None
+    filters = {}
+    # Text que filtra la base de dades quan la query és massa curta per a l'índex de trigrames
+    search_text = None
+    # Ids dels resultats aproximats, ordenats per semblança
+    fuzzy_ids = None
 
     def get_queryset(self):
         form = EventSearchForm(self.request.GET)
@@ -25,7 +40,22 @@ class EventListView(ListView):
             status = form.cleaned_data.get("status")
 
             if q:
-                queryset = queryset.filter(title__icontains=q)
+                # Índex de trigrames en lloc de title__icontains (regex sobre tota la col·lecció)
+                index = get_trigram_index()
+                ids = index.contains(q)
+                if ids is None:
+                    # Paraules de menys de 3 lletres: l'índex no pot acotar la cerca i la fa la base de dades
+                    queryset = queryset.filter(Q(title__icontains=q) | Q(tags__icontains=q))
+                    self.search_text = q
+                else:
+                    if not ids:
+                        # Sense coincidències exactes, es toleren errors d'escriptura
+                        limit = getattr(settings, "EVENTS_TRIGRAM_MAX_RESULTS", 50)
+                        ids = [event_id for event_id, _ in index.similar(q, k=limit)]
+                        self.fuzzy_ids = ids
+                    queryset = queryset.filter(pk__in=ids)
+                    self.search_ids = ids
+            self.filters = {"q": q or "", "category": category, "status": status}
             if category:
                 queryset = queryset.filter(category=category)
             if status:
@@ -33,12 +63,54 @@ class EventListView(ListView):
 
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        if not self.fuzzy_ids:
+            return super().paginate_queryset(queryset, page_size)
+        # Els resultats aproximats (com a molt EVENTS_TRIGRAM_MAX_RESULTS) es mostren
+        # en una sola pàgina i per semblança: ordenar-los per data amagaria els millors
+        events = {event.pk: event for event in queryset}
+        page = KeysetPage([events[event_id] for event_id in self.fuzzy_ids if event_id in events])
+        return None, page, page.object_list, False
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["search_form"] = EventSearchForm(self.request.GET)
+        context["fuzzy_search"] = bool(self.fuzzy_ids)
+        # Recomptes de cada opció dels desplegables (una agregació, en cache)
+        counts = facet_counts(
+            self.search_ids, search=self.filters.get("q", ""), text=self.search_text,
+            category=self.filters.get("category"), status=self.filters.get("status"),
+        )
+        for field in ("category", "status"):
+            context[f"{field}_options"] = [
+                (key, label, counts[field].get(key, 0))
+                for key, label in context["search_form"].fields[field].choices if key
+            ]
+        # Total a totes les pàgines, sense comptar mai el resultat: amb filtres surt dels
+        # recomptes (els d'estat apliquen tots els altres filtres); sense, de les metadades
+        status = self.filters.get("status")
+        if self.fuzzy_ids:
+            context["page_obj"].total = len(context["page_obj"])
+        elif any(self.filters.values()):
+            context["page_obj"].total = counts["status"].get(status, 0) if status else sum(counts["status"].values())
+        else:
+            context["page_obj"].total = estimated_total()
         return context
 
 
+# Suggeriments per al cercador de títols (ordenats per semblança, toleren errors)
+def event_suggest(request):
+    q = request.GET.get("q", "").strip()
+    ranked = get_trigram_index().similar(q, k=8) if q else []
+    titles = dict(Event.objects.filter(pk__in=[event_id for event_id, _ in ranked]).values_list("id", "title"))
+    results = [
+        {"id": event_id, "title": titles[event_id], "url": reverse("events:event_detail", args=[event_id]),
+         "score": round(score, 3)}
+        for event_id, score in ranked if event_id in titles
+    ]
+    return JsonResponse({"query": q, "results": results})
+
+
 # Detall d'un esdeveniment individual
 class EventDetailView(DetailView):
     model = Event
@@ -49,6 +121,8 @@ class EventDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         # Añadimos el formulario del chat
         context['chat_form'] = ChatMessageForm()
+        # Esdeveniments similars precalculats (vegeu build_event_neighbours)
+        context['similar_events'] = similar_events(self.object)
         return context
 
 
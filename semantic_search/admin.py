@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import EventNeighbours
+
+
+@admin.register(EventNeighbours)
+class EventNeighboursAdmin(admin.ModelAdmin):
+    list_display = ('event', 'embedding_model', 'updated_at')
+    raw_id_fields = ('event',)
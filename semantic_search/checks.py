@@ -0,0 +1,17 @@
+from django.core.checks import Warning, register
+
+
+@register()
+def check_result_cache_backend(app_configs, **kwargs):
+    """Avisa si la cache de rànquings queda desactivada per no tenir una cache compartida."""
+    from .services.result_cache import result_cache_enabled
+
+    if result_cache_enabled():
+        return []
+    return [Warning(
+        "La cache de rànquings de la cerca està desactivada: el comptador de versió és en una "
+        "cache local de cada procés i les escriptures d'un worker no invalidarien els altres.",
+        hint="Configura CACHES amb una cache compartida (la de fitxers per defecte, Redis o Memcached), "
+             "o SEMANTIC_SEARCH_RESULT_CACHE_ALLOW_LOCAL = True si només hi ha un procés.",
+        id="semantic_search.W001",
+    )]
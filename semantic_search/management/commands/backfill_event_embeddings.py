@@ -1,96 +1,266 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.conf import settings
-import pymongo
+import multiprocessing
+import os
+import queue as queue_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.mongo import events_collection, get_database, mongo_client
+from semantic_search.services.backfill import (
+    clear_shard_plan,
+    load_shard_plan,
+    plan_shards,
+    run_backfill,
+    save_shard_plan,
+    shard_worker,
+)
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.index import build_index
+from semantic_search.services.neighbours import build_neighbours
+from semantic_search.services.slots import missing_query
+
+# Nombre del punto de control según el modo de ejecución
+CHECKPOINT_NAME = "backfill_event_embeddings"
 
-from events.models import Event
-from semantic_search.services.embeddings import embed_text, model_name
 
 class Command(BaseCommand):
     help = "Genera y guarda embeddings para todos los eventos existentes."
 
     def add_arguments(self, parser):
         parser.add_argument(
-            "--force", 
-            action="store_true", 
+            "--force",
+            action="store_true",
             help="Recalcula embeddings incluso si ya existen"
         )
         parser.add_argument(
-            "--limit", 
-            type=int, 
-            default=0, 
+            "--changed-only",
+            action="store_true",
+            help="Recalcula solo los eventos cuyo texto ha cambiado desde el último embedding"
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
             help="Limita el número de eventos a procesar (0 = todos)"
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=64,
+            help="Número de eventos codificados en cada llamada al modelo"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continúa desde el último evento procesado (created_at/_id)"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Número de procesos en paralelo, cada uno con un rango de _id propio"
+        )
+        parser.add_argument(
+            "--model",
+            help="Modelo con el que se generan los embeddings (por defecto, el activo). Si no es el "
+                 "activo, se guardan en el segundo slot y la búsqueda sigue usando el modelo activo"
+        )
+        parser.add_argument(
+            "--skip-neighbours",
+            action="store_true",
+            help="No recalcula los eventos similares al terminar (habrá que ejecutar build_event_neighbours)"
+        )
 
     def handle(self, *args, **options):
         force = options["force"]
+        changed_only = options["changed_only"]
         limit = options["limit"]
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        if force and changed_only:
+            raise CommandError("--force y --changed-only son incompatibles")
 
-        db_settings = settings.DATABASES['default']
-        client = pymongo.MongoClient(db_settings['CLIENT']['host'])
-        db = client[db_settings['NAME']]
-        collection = db['events_event']  
+        model = options["model"] or model_name()
 
+        # --force y --changed-only recorren todos los documentos; por defecto, solo los que no tienen embedding
+        mode = "force" if force else "changed" if changed_only else "missing"
+        checkpoint_name = f"{CHECKPOINT_NAME}:{mode}"
+        if options["model"]:
+            checkpoint_name = f"{checkpoint_name}:{model}"
         query = {}
-        if not force:
-            query['embedding'] = {'$exists': False}
-        
-        cursor = collection.find(query).sort('created_at', 1)
-        
-        if limit and limit > 0:
-            cursor = cursor.limit(limit)
+        if mode == "missing":
+            # Sin embedding del modelo en ninguno de los dos slots (None también cubre campos ausentes)
+            query = missing_query(model)
+        self.stdout.write(f"Modelo: {model}")
 
-        total_count = collection.count_documents(query)
-        self.stdout.write(f"Procesando {total_count} eventos...")
-
-        processed = 0
-        skipped = 0
-        
-        for doc in cursor:
-            event_id = doc.get('_id')
-            
-            text = " | ".join([
-                (doc.get('title') or "").strip(),
-                (doc.get('description') or "").strip(),
-                (doc.get('category') or "").strip(),
-                (doc.get('tags') or "").strip(),
-            ]).strip()
-
-            if not text:
-                skipped += 1
-                self.stdout.write(
-                    self.style.WARNING(f"⚠ Skipped ID {event_id}: sin texto")
+        client = mongo_client()
+        try:
+            if workers > 1:
+                if limit:
+                    self.stdout.write(self.style.WARNING("⚠ --limit se ignora en modo --workers"))
+                totals = self.run_sharded(
+                    client, query, checkpoint_name, batch_size, workers, options["resume"], changed_only, model
                 )
-                continue
+            else:
+                totals = self.run_single(
+                    client, query, checkpoint_name, batch_size, limit, options["resume"], changed_only, model
+                )
+        finally:
+            client.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n🎉 Completado: {totals['processed']} embeddings generados, "
+                f"{totals['unchanged']} sin cambios, {totals['skipped']} omitidos, "
+                f"{totals['errors']} lotes con error"
+            )
+        )
+        if totals['errors']:
+            self.stdout.write(self.style.WARNING(
+                "⚠ Los lotes con error no se han guardado: vuelve a ejecutar con --resume para reintentarlos"
+            ))
+
+        # bulk_write no envía señales: los vecinos precalculados se recalculan aquí
+        if totals['processed'] and model == model_name() and not options["skip_neighbours"]:
+            self.rebuild_neighbours()
+
+    def rebuild_neighbours(self):
+        """Recalcula los eventos similares de todos los eventos con los vectores nuevos."""
+        self.stdout.write("Recalculando eventos similares...")
+        stored, removed = build_neighbours(build_index())
+        self.stdout.write(self.style.SUCCESS(f"✅ {stored} listas de vecinos guardadas ({removed} eliminadas)"))
 
-            # Generar embedding
+    def run_single(self, client, query, checkpoint_name, batch_size, limit, resume, changed_only, model):
+        """Procesa todos los eventos en este mismo proceso."""
+        collection = events_collection(client)
+
+        total_count = collection.count_documents(query)
+        if limit and limit > 0:
+            total_count = min(total_count, limit)
+        self.stdout.write(f"Procesando {total_count} eventos en lotes de {batch_size}...")
+
+        def report(event, data):
+            self.report(event, data, total_count)
+
+        return run_backfill(
+            collection,
+            get_database(client),
+            query,
+            checkpoint_name,
+            batch_size,
+            limit=limit,
+            resume=resume,
+            changed_only=changed_only,
+            report=report,
+            model=model,
+        )
+
+    def run_sharded(self, client, query, checkpoint_name, batch_size, workers, resume, changed_only, model):
+        """
+        Reparte la colección en rangos de _id disjuntos y lanza un proceso por rango.
+        Con --resume se reutiliza el reparto anterior y se saltan los rangos terminados.
+        """
+        db = get_database(client)
+        collection = events_collection(client)
+
+        plan = load_shard_plan(db, checkpoint_name) if resume else None
+        if plan:
+            shards = plan['shards']
+            self.stdout.write(f"↻ Reanudando reparto anterior de {len(shards)} rangos")
+        else:
+            shards = plan_shards(collection, query, workers)
+            save_shard_plan(db, checkpoint_name, shards)
+
+        pending = [shard for shard in shards if not shard['done']]
+        for shard in shards:
+            if shard['done']:
+                self.stdout.write(f"[rango {shard['index']}] ya completado, se omite")
+
+        totals = {'processed': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        if not pending:
+            clear_shard_plan(db, checkpoint_name)
+            return totals
+
+        self.stdout.write(
+            f"Procesando {sum(s['count'] for s in pending)} eventos con {len(pending)} procesos "
+            f"en lotes de {batch_size}..."
+        )
+
+        # 'spawn' evita heredar el estado de PyTorch y del cliente de Mongo del padre
+        ctx = multiprocessing.get_context("spawn")
+        progress = ctx.Queue()
+        threads = max(1, (os.cpu_count() or 1) // len(pending))
+        processes = {}
+        for shard in pending:
+            process = ctx.Process(
+                target=shard_worker,
+                args=(shard, query, checkpoint_name, batch_size, resume, changed_only, threads, progress, model),
+            )
+            process.start()
+            processes[shard['index']] = process
+
+        # Recogemos el progreso de los workers hasta que todos terminen
+        running = set(processes)
+        failed = False
+        while running:
             try:
-                vec = embed_text(text)
-                
-                collection.update_one(
-                    {'_id': event_id},
-                    {'$set': {
-                        'embedding': vec,
-                        'embedding_model': model_name(),
-                        'embedding_updated_at': timezone.now()
-                    }}
+                event, index, data = progress.get(timeout=1)
+            except queue_module.Empty:
+                for index in list(running):
+                    # Un worker que termina bien siempre envía 'done' o 'failed' antes de salir
+                    if not processes[index].is_alive() and processes[index].exitcode != 0:
+                        running.discard(index)
+                        failed = True
+                        totals['errors'] += 1
+                        self.stdout.write(self.style.ERROR(
+                            f"❌ [rango {index}] el proceso terminó inesperadamente "
+                            f"(código {processes[index].exitcode})"
+                        ))
+                continue
+
+            if event == 'done':
+                running.discard(index)
+                for key in totals:
+                    totals[key] += data[key]
+                failed = failed or bool(data['errors'])
+                self.stdout.write(f"[rango {index}] terminado: {data['processed']} embeddings generados")
+            elif event == 'failed':
+                running.discard(index)
+                failed = True
+                totals['errors'] += 1
+                self.stdout.write(self.style.ERROR(f"❌ [rango {index}] {data['error']}"))
+            else:
+                self.report(event, data, shards[index]['count'], prefix=f"[rango {index}] ")
+
+        for process in processes.values():
+            process.join()
+
+        # Si todos los rangos han terminado, la próxima ejecución empieza de cero
+        if not failed:
+            clear_shard_plan(db, checkpoint_name)
+        else:
+            self.stdout.write(self.style.WARNING("⚠ Hay rangos sin terminar: vuelve a ejecutar con --resume"))
+        return totals
+
+    def report(self, event, data, total_count, prefix=""):
+        """Muestra el progreso de un lote (de este proceso o de un worker)."""
+        if event == 'resume':
+            self.stdout.write(
+                f"{prefix}↻ Reanudando después de {data['created_at']} (ID {data['last_id']})"
+            )
+        elif event == 'error':
+            self.stdout.write(
+                self.style.ERROR(
+                    f"{prefix}❌ Error en el lote {data['batch']} (IDs {data['first_id']}…{data['last_id']}): "
+                    f"{data['error']}"
                 )
-                
-                processed += 1
-                    
-                if processed % 5 == 0:
-                    self.stdout.write(f"✓ Procesados: {processed}/{total_count}")
-                    
-            except Exception as ex:
+            )
+        elif event == 'batch':
+            for event_id in data['skipped_ids']:
                 self.stdout.write(
-                    self.style.ERROR(f"❌ Error en evento ID {event_id}: {type(ex).__name__}: {str(ex)}")
+                    self.style.WARNING(f"{prefix}⚠ Skipped ID {event_id}: sin texto")
                 )
-                skipped += 1
-
-        client.close()
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"\n🎉 Completado: {processed} embeddings generados, {skipped} omitidos"
+            rate = data['size'] / data['elapsed'] if data['elapsed'] > 0 else 0
+            self.stdout.write(
+                f"{prefix}✓ Lote {data['batch']}: {data['size']} eventos en {data['elapsed']:.2f}s "
+                f"({rate:.1f} eventos/s) — procesados: {data['processed']}/{total_count}"
             )
-        )
\ No newline at end of file
@@ -0,0 +1,196 @@
+import json
+import platform
+import time
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from events.models import CATEGORY_CHOICES, STATUS_CHOICES, Event
+from semantic_search.services.ann import IVFIndex
+from semantic_search.services.index import EventVectorIndex
+from semantic_search.services.synthetic import StubEmbedder, synthetic_embeddings
+from semantic_search.services.warmup import rss_mb
+
+# Etapes que es mesuren per a cada query, en l'ordre de la vista
+STAGES = ('embed', 'score', 'fetch', 'render')
+# Paraules per generar queries sintètiques
+WORDS = ("concert jazz torneig futbol xerrada tecnologia art teatre festival música "
+         "programació videojocs taller curs bàsquet cinema debat ciència").split()
+# Format del fitxer de resultats
+FORMAT_VERSION = 1
+
+
+def percentiles(samples_ms) -> dict:
+    """p50, p95, p99 i mitjana d'una llista de temps en ms."""
+    values = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'mean': float(values.mean())}
+
+
+class Command(BaseCommand):
+    help = ("Benchmark reproduïble de la cerca semàntica per etapes (embedding, puntuació, "
+            "lectura d'esdeveniments i render) sobre catàlegs sintètics de diverses mides.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000",
+                            help="Mides dels catàlegs sintètics, separades per comes (p.ex. ...,1000000)")
+        parser.add_argument("--queries", type=int, default=200, help="Queries mesurades per mida")
+        parser.add_argument("--warmup", type=int, default=10, help="Queries d'escalfament (no es compten)")
+        parser.add_argument("--k", type=int, default=20, help="Resultats per query")
+        parser.add_argument("--dtype", default="float32", choices=("float32", "float16", "int8"),
+                            help="Tipus d'emmagatzematge de l'índex")
+        parser.add_argument("--engine", default="exact", choices=("exact", "ivf"), help="Motor de cerca")
+        parser.add_argument("--real-model", action="store_true",
+                            help="Fa servir el model real en lloc de l'embedder determinista")
+        parser.add_argument("--seed", type=int, default=0, help="Llavor dels catàlegs i les queries")
+        parser.add_argument("--output", help="Fitxer JSON on es guarden els resultats")
+        parser.add_argument("--baseline", help="Fitxer JSON d'una execució anterior per comparar")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Increment relatiu de p95 a partir del qual es marca una regressió")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes ha de ser una llista d'enters separats per comes")
+
+        if options["real_model"]:
+            from semantic_search.services.embeddings import get_model
+            embedder = get_model()
+        else:
+            embedder = StubEmbedder()
+
+        rng = np.random.default_rng(options["seed"])
+        queries = [" ".join(rng.choice(WORDS, size=rng.integers(1, 4))) for _ in range(options["queries"])]
+        warmup = queries[:options["warmup"]]
+        request = RequestFactory().get("/semantic/", {"q": "benchmark"})
+        request.user = AnonymousUser()
+
+        results = {
+            'format': FORMAT_VERSION,
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'options': {key: options[key] for key in ("queries", "k", "dtype", "engine", "real_model", "seed")},
+            'sizes': {},
+        }
+        for size in sizes:
+            self.stdout.write(f"\n▶ {size} esdeveniments")
+            results['sizes'][str(size)] = self.run_size(size, embedder, queries, warmup, request, options)
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Resultats desats a {options['output']}"))
+        if options["baseline"]:
+            self.compare(results, json.loads(Path(options["baseline"]).read_text()), options["tolerance"])
+
+    def build_catalog(self, size: int, options) -> tuple[EventVectorIndex, dict]:
+        """Índex i columnes d'atributs d'un catàleg sintètic."""
+        rng = np.random.default_rng(options["seed"])
+        matrix = synthetic_embeddings(size, seed=options["seed"])
+        ids = np.arange(1, size + 1)
+        now = timezone.now().timestamp()
+        catalog = {
+            'dates': now + rng.uniform(-30, 60, size) * 86400,
+            'categories': np.array([key for key, _ in CATEGORY_CHOICES], dtype=object)[
+                rng.integers(0, len(CATEGORY_CHOICES), size)],
+            'statuses': np.array([key for key, _ in STATUS_CHOICES], dtype=object)[
+                rng.integers(0, len(STATUS_CHOICES), size)],
+        }
+        index = EventVectorIndex.from_arrays(
+            matrix, ids, catalog['dates'], dtype=options["dtype"], rescore_factor=4,
+            categories=catalog['categories'], statuses=catalog['statuses'],
+        )
+        if options["engine"] == "ivf":
+            index.attach_engine(IVFIndex.build(ids, matrix, seed=options["seed"]))
+        return index, catalog
+
+    def fetch(self, ranked, catalog) -> list:
+        """
+        Equivalent sintètic de Event.objects.in_bulk: construeix els objectes
+        Event dels guanyadors (sense base de dades) mantenint l'ordre.
+        """
+        events = {}
+        for event_id, _ in ranked:
+            row = event_id - 1
+            events[event_id] = Event(
+                pk=event_id,
+                title=f"Esdeveniment {event_id}",
+                description="",
+                category=catalog['categories'][row],
+                status=catalog['statuses'][row],
+                scheduled_date=timezone.datetime.fromtimestamp(catalog['dates'][row], tz=timezone.utc),
+            )
+        return [(events[event_id], score) for event_id, score in ranked]
+
+    def run_size(self, size: int, embedder, queries, warmup, request, options) -> dict:
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        index, catalog = self.build_catalog(size, options)
+        build_s = time.perf_counter() - start
+        rss_after = rss_mb()
+
+        samples = {stage: [] for stage in STAGES + ('total',)}
+        for number, query in enumerate(warmup + queries):
+            times = {}
+            start = time.perf_counter()
+            q_vec = embedder.encode([query], normalize_embeddings=True)[0]
+            times['embed'] = time.perf_counter()
+            ranked = index.search(q_vec, k=options["k"])
+            times['score'] = time.perf_counter()
+            results = self.fetch(ranked, catalog)
+            times['fetch'] = time.perf_counter()
+            render_to_string("semantic_search/search.html", {
+                "query": query, "results": results, "only_future": False, "mode": "semantic",
+                "embedding_model": "benchmark", "search_time": 0, "total_results": len(results),
+            }, request=request)
+            times['render'] = time.perf_counter()
+            if number < len(warmup):
+                continue
+            previous = start
+            for stage in STAGES:
+                samples[stage].append((times[stage] - previous) * 1000)
+                previous = times[stage]
+            samples['total'].append((previous - start) * 1000)
+
+        stats = {stage: percentiles(values) for stage, values in samples.items()}
+        report = {
+            'build_s': build_s,
+            'index_mb': index.nbytes() / 2**20,
+            'rss_delta_mb': rss_after - rss_before,
+            'rss_mb': rss_after,
+            'stages_ms': stats,
+        }
+        self.stdout.write(f"  índex: {report['index_mb']:.1f} MB, construït en {build_s:.2f}s, "
+                          f"RSS {rss_after:.0f} MB (+{report['rss_delta_mb']:.0f} MB)")
+        self.stdout.write(f"  {'etapa':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, values in stats.items():
+            self.stdout.write(f"  {stage:<10}{values['p50']:>10.2f}{values['p95']:>10.2f}{values['p99']:>10.2f}")
+        return report
+
+    def compare(self, results: dict, baseline: dict, tolerance: float):
+        """Compara els p95 amb una execució anterior i marca les regressions."""
+        self.stdout.write(f"\nComparació amb la línia base (tolerància {tolerance:.0%} a p95)")
+        regressions = 0
+        for size, report in results['sizes'].items():
+            base = baseline.get('sizes', {}).get(size)
+            if base is None:
+                continue
+            for stage, values in report['stages_ms'].items():
+                old = base['stages_ms'].get(stage, {}).get('p95')
+                if not old:
+                    continue
+                change = values['p95'] / old - 1
+                line = f"  {size:>8} {stage:<10}{old:>10.2f} → {values['p95']:>8.2f} ms ({change:+.0%})"
+                if change > tolerance:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(line + "  ⚠ regressió"))
+                else:
+                    self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} etapes per sobre de la tolerància")
@@ -0,0 +1,94 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Script que s'executa en un procés nou per a cada mesura. Arrenca Django com
+# ho faria manage.py i fa l'escenari demanat; amb "eager" importa abans
+# sentence_transformers per reproduir el comportament d'abans (import a nivell
+# de mòdul). Escriu el resultat en JSON a l'última línia.
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+scenario, mode = sys.argv[1], sys.argv[2]
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+if mode == 'eager':
+    import sentence_transformers  # noqa: F401
+import django
+django.setup()
+status = None
+if scenario == 'check':
+    from django.core.management import call_command
+    call_command('check', verbosity=0)
+else:
+    from django.test import Client
+    try:
+        status = Client(SERVER_NAME='localhost').get('/events/').status_code
+    except Exception as exc:
+        # Sense base de dades la vista falla, però les URLs ja s'han resolt
+        status = type(exc).__name__
+elapsed = time.perf_counter() - start
+
+from semantic_search.services.warmup import rss_mb
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': rss_mb(),
+    'modules': len(sys.modules),
+    'torch': 'torch' in sys.modules,
+    'numpy': 'numpy' in sys.modules,
+    'status': status,
+}))
+"""
+
+SCENARIOS = {'check': "manage.py check", 'events': "GET /events/"}
+
+
+class Command(BaseCommand):
+    help = ("Mesura el temps d'arrencada i la memòria d'un procés nou (manage.py check i una petició "
+            "a /events/) amb la pila d'embeddings importada de forma lazy o eager.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Processos per escenari (es mostra la mediana)")
+        parser.add_argument("--lazy-only", action="store_true",
+                            help="No mesura el mode eager (p.ex. si sentence_transformers no està instal·lat)")
+
+    def run_child(self, scenario: str, mode: str) -> dict | None:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, scenario, mode],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        lines = result.stdout.strip().splitlines()
+        if result.returncode != 0 or not lines:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {SCENARIOS[scenario]} ({mode}): {result.stderr.strip().splitlines()[-1:]}"
+            ))
+            return None
+        return json.loads(lines[-1])
+
+    def handle(self, *args, **options):
+        modes = ("lazy",) if options["lazy_only"] else ("lazy", "eager")
+        self.stdout.write(f"{'escenari':<22}{'mode':<8}{'temps (s)':>10}{'RSS (MB)':>10}"
+                          f"{'mòduls':>8}{'torch':>7}{'numpy':>7}")
+        for scenario, label in SCENARIOS.items():
+            medians = {}
+            for mode in modes:
+                runs = [self.run_child(scenario, mode) for _ in range(max(1, options["repeat"]))]
+                runs = [run for run in runs if run]
+                if not runs:
+                    continue
+                seconds = statistics.median(run['seconds'] for run in runs)
+                rss = statistics.median(run['rss_mb'] for run in runs)
+                medians[mode] = (seconds, rss)
+                last = runs[-1]
+                self.stdout.write(
+                    f"{label:<22}{mode:<8}{seconds:>10.2f}{rss:>10.0f}{last['modules']:>8}"
+                    f"{'sí' if last['torch'] else 'no':>7}{'sí' if last['numpy'] else 'no':>7}"
+                )
+            if len(medians) == 2:
+                (lazy_s, lazy_rss), (eager_s, eager_rss) = medians['lazy'], medians['eager']
+                self.stdout.write(self.style.SUCCESS(
+                    f"  → estalvi: {eager_s - lazy_s:.2f} s i {eager_rss - lazy_rss:.0f} MB per procés"
+                ))
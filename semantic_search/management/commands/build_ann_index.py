@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.ann import IVFIndex, ivf_path
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.index import EventVectorIndex, build_index
+from semantic_search.services.synthetic import recall, synthetic_embeddings, synthetic_queries
+
+
+class Command(BaseCommand):
+    help = "Construeix l'índex aproximat IVF dels embeddings i, opcionalment, en mesura el recall."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--nlist", type=int, default=0,
+                            help="Nombre de cel·les k-means (0 = ~√n)")
+        parser.add_argument("--nprobe", type=int, default=8,
+                            help="Cel·les visitades per cerca per defecte")
+        parser.add_argument("--iterations", type=int, default=10, help="Iteracions de k-means")
+        parser.add_argument("--verify", action="store_true",
+                            help="Compara el recall i la latència amb la cerca exacta")
+        parser.add_argument("--probes", default="1,2,4,8,16,32",
+                            help="Valors de nprobe a comparar amb --verify")
+        parser.add_argument("--queries", type=int, default=200, help="Nombre de queries de prova")
+        parser.add_argument("--k", type=int, default=20, help="Mida del top-k per calcular el recall")
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Fa servir N embeddings sintètics i no desa l'índex")
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            matrix = synthetic_embeddings(options["synthetic"])
+            n = len(matrix)
+            index = EventVectorIndex.from_arrays(matrix, np.arange(n), np.zeros(n))
+        else:
+            index = build_index(engine='exact')
+        if not len(index):
+            self.stdout.write(self.style.WARNING("No hi ha embeddings per indexar."))
+            return
+
+        ids, matrix = index.vectors()
+        self.stdout.write(f"Construint l'índex IVF de {len(ids)} embeddings...")
+        start = time.perf_counter()
+        engine = IVFIndex.build(ids, matrix, nlist=options["nlist"] or None, nprobe=options["nprobe"],
+                                model=model_name(), iterations=options["iterations"])
+        self.stdout.write(f"✓ {engine.nlist} cel·les en {time.perf_counter() - start:.1f}s")
+
+        if not options["synthetic"]:
+            path = engine.save(ivf_path())
+            self.stdout.write(self.style.SUCCESS(f"✅ Índex IVF desat a {path}"))
+
+        if options["verify"]:
+            self.verify(index, engine, matrix, options)
+
+    def verify(self, index, engine, matrix, options):
+        """Mesura recall@k i latència per a cada nprobe respecte de la cerca exacta."""
+        k = options["k"]
+        queries = list(synthetic_queries(matrix, options["queries"]))
+
+        start = time.perf_counter()
+        exact = [index.search(query, k, exact=True) for query in queries]
+        exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        index.attach_engine(engine)
+        self.stdout.write(f"\n{len(queries)} queries, recall@{k}\n")
+        self.stdout.write(f"{'nprobe':<10}{'recall':>10}{'ms/query':>12}")
+        self.stdout.write(f"{'exacte':<10}{1.0:>10.4f}{exact_ms:>12.2f}")
+        for nprobe in [int(p) for p in options["probes"].split(",") if p.strip()]:
+            start = time.perf_counter()
+            approx = [index.search(query, k, nprobe=nprobe) for query in queries]
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+            self.stdout.write(f"{nprobe:<10}{recall(approx, exact):>10.4f}{elapsed:>12.2f}")
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from semantic_search.services.index import build_index
+from semantic_search.services.neighbours import build_neighbours, neighbour_count, refresh_neighbours
+
+
+class Command(BaseCommand):
+    help = ("Precalcula els esdeveniments similars (en directe o programats) de cada esdeveniment "
+            "per a la pàgina de detall.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--n", type=int, default=0,
+                            help="Veïns per esdeveniment (0 = SEMANTIC_SEARCH_NEIGHBOURS)")
+        parser.add_argument("--events",
+                            help="Ids separats per comes: només actualitza aquests i els afectats")
+
+    def handle(self, *args, **options):
+        if options["events"]:
+            try:
+                event_ids = [int(event_id) for event_id in options["events"].split(",") if event_id.strip()]
+            except ValueError:
+                raise CommandError("--events ha de ser una llista d'enters separats per comes")
+            refreshed = refresh_neighbours(event_ids, index=build_index())
+            self.stdout.write(self.style.SUCCESS(f"✅ {refreshed} llistes de veïns actualitzades"))
+            return
+
+        n = options["n"] or neighbour_count()
+        index = build_index()
+        if not len(index):
+            self.stdout.write(self.style.WARNING("No hi ha embeddings indexats."))
+            return
+
+        self.stdout.write(f"Calculant {n} veïns per a {len(index)} esdeveniments...")
+        start = time.perf_counter()
+        stored, removed = build_neighbours(index, n, report=lambda done, total: self.stdout.write(f"  {done}/{total}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stored} llistes desades en {time.perf_counter() - start:.1f}s ({removed} eliminades)"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from events.mongo import events_collection, mongo_client
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.model_switch import model_coverage
+
+
+class Command(BaseCommand):
+    help = "Mostra el model d'embeddings actiu i la cobertura de cada model (esdeveniments amb vector)."
+
+    def handle(self, *args, **options):
+        client = mongo_client()
+        try:
+            coverage = model_coverage(events_collection(client))
+        finally:
+            client.close()
+
+        active = model_name()
+        total = coverage['total']
+        self.stdout.write(f"{total} esdeveniments\n")
+        self.stdout.write(f"{'model':<70}{'vectors':>10}{'cobertura':>12}")
+        models = coverage['models']
+        if active not in models:
+            models[active] = 0
+        for name, count in sorted(models.items(), key=lambda item: -item[1]):
+            line = f"{name:<70}{count:>10}{count / total if total else 0:>12.1%}"
+            if name == active:
+                self.stdout.write(self.style.SUCCESS(line + "  ← actiu"))
+            else:
+                self.stdout.write(line)
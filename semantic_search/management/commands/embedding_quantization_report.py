@@ -0,0 +1,69 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+from semantic_search.services.index import EventVectorIndex
+from semantic_search.services.quantization import pack, stored_vector
+from semantic_search.services.synthetic import recall, synthetic_embeddings, synthetic_queries
+
+
+def bson_list_size(dim: int) -> int:
+    """Mida en BSON d'un embedding guardat com a llista de doubles (camp 'embedding')."""
+    # Cada element: tipus (1) + clau ("0", "1", ... amb \0) + double (8)
+    elements = sum(1 + len(str(i)) + 1 + 8 for i in range(dim))
+    return 1 + len("embedding") + 1 + 4 + elements + 1
+
+
+def bson_blob_size(nbytes: int) -> int:
+    """Mida en BSON d'un blob binari (camp 'embedding_blob')."""
+    return 1 + len("embedding_blob") + 1 + 4 + 1 + nbytes
+
+
+class Command(BaseCommand):
+    help = "Mesura la reducció de memòria i la pèrdua de recall de guardar els embeddings en float16/int8."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Fa servir N embeddings sintètics en lloc dels de la base de dades")
+        parser.add_argument("--dim", type=int, default=384, help="Dimensió dels embeddings sintètics")
+        parser.add_argument("--queries", type=int, default=200, help="Nombre de queries de prova")
+        parser.add_argument("--k", type=int, default=20, help="Mida del top-k per calcular el recall")
+        parser.add_argument("--rescore-factor", type=int, default=4,
+                            help="Factor de candidats per a la nova puntuació en float32")
+
+    def handle(self, *args, **options):
+        k = options["k"]
+        if options["synthetic"]:
+            matrix = synthetic_embeddings(options["synthetic"], options["dim"])
+        else:
+            rows = Event.objects.with_embeddings().values_list('embedding', 'embedding_blob')
+            vectors = [v for v in (stored_vector(e, b) for e, b in rows) if v is not None]
+            if not vectors:
+                self.stdout.write(self.style.WARNING("No hi ha embeddings: prova amb --synthetic N"))
+                return
+            matrix = np.stack(vectors).astype(np.float32)
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        n, dim = matrix.shape
+        ids = np.arange(n)
+        dates = np.zeros(n)
+        queries = list(synthetic_queries(matrix, options["queries"]))
+        exact = EventVectorIndex.from_arrays(matrix, ids, dates).search_many(queries, k)
+        float_bytes = EventVectorIndex.from_arrays(matrix, ids, dates).nbytes()
+        list_doc = bson_list_size(dim)
+
+        self.stdout.write(f"{n} embeddings de {dim} dimensions, {len(queries)} queries, recall@{k}\n")
+        self.stdout.write(f"{'tipus':<10}{'índex (MB)':>12}{'reducció':>10}{'doc (B)':>10}"
+                          f"{'recall':>10}{'+rescore':>10}")
+        self.stdout.write(f"{'float32':<10}{float_bytes / 2**20:>12.1f}{'1.0x':>10}{list_doc:>10}"
+                          f"{1.0:>10.4f}{'-':>10}")
+        for dtype in ('float16', 'int8'):
+            index = EventVectorIndex.from_arrays(matrix, ids, dates, dtype=dtype)
+            approx = index.search_many(queries, k)
+            index.rescore_factor = options["rescore_factor"]
+            rescored = index.search_many(queries, k)
+            doc = bson_blob_size(len(pack(matrix[0], dtype)))
+            self.stdout.write(
+                f"{dtype:<10}{index.nbytes() / 2**20:>12.1f}{float_bytes / index.nbytes():>9.1f}x{doc:>10}"
+                f"{recall(approx, exact):>10.4f}{recall(rescored, exact):>10.4f}"
+            )
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from events.mongo import events_collection, mongo_client
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.slots import SLOT_FIELDS, model_query, vector_for
+from semantic_search.services.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Exporta els embeddings de tots els esdeveniments a un snapshot en disc (memmap)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=2,
+            help="Nombre de versions del snapshot a conservar (inclosa la nova)"
+        )
+
+    def handle(self, *args, **options):
+        # Tot el que es modifiqui a partir d'ara es llegirà com a delta
+        created_at = timezone.now()
+        name = model_name()
+
+        client = mongo_client()
+        collection = events_collection(client)
+        # Només exportem els embeddings generats amb el model actiu (a qualsevol dels dos slots)
+        query = model_query(name)
+        count = collection.count_documents(query)
+
+        first = next((
+            vec for vec in (vector_for(doc, name) for doc in collection.find(query, SLOT_FIELDS))
+            if vec is not None
+        ), None)
+        if first is None:
+            client.close()
+            self.stdout.write(self.style.WARNING("No hi ha cap embedding per exportar."))
+            return
+        dim = len(first)
+
+        self.stdout.write(f"Exportant {count} embeddings ({dim} dimensions, model {name})...")
+        projection = ('id', 'scheduled_date', 'category', 'status') + SLOT_FIELDS
+        cursor = collection.find(query, projection).batch_size(1000)
+        rows = (
+            (
+                doc['id'],
+                vector_for(doc, name),
+                doc.get('scheduled_date'),
+                doc.get('category'),
+                doc.get('status'),
+            )
+            for doc in cursor
+        )
+        target = write_snapshot(rows, count, dim, name, created_at, keep=options["keep"])
+        client.close()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Snapshot escrit a {target}"))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.mongo import events_collection, get_database, mongo_client
+from semantic_search.services.backfill import run_backfill
+from semantic_search.services.embeddings import model_name
+from semantic_search.services.model_switch import activate_model, uncovered_ids
+
+# Punt de control de les passades de posada al dia
+CHECKPOINT_NAME = "switch_embedding_model"
+
+
+class Command(BaseCommand):
+    help = ("Activa un altre model d'embeddings quan tots els esdeveniments ja en tenen vector "
+            "(vegeu backfill_event_embeddings --model).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="Nom del model a activar")
+        parser.add_argument("--batch-size", type=int, default=64,
+                            help="Esdeveniments per lot a les passades de posada al dia")
+        parser.add_argument("--no-catch-up", action="store_true",
+                            help="No genera els vectors pendents abans de comprovar la cobertura")
+
+    def handle(self, *args, **options):
+        name = options["model"]
+        previous = model_name()
+        if name == previous:
+            self.stdout.write(f"{name} ja és el model actiu.")
+            return
+
+        client = mongo_client()
+        try:
+            collection, db = events_collection(client), get_database(client)
+            if not options["no_catch_up"]:
+                # Vectors dels esdeveniments creats o modificats des del backfill
+                self.catch_up(collection, db, name, options["batch_size"])
+
+            missing = uncovered_ids(collection, name)
+            if missing:
+                raise CommandError(
+                    f"{len(missing)} esdeveniments encara no tenen vector de {name} "
+                    f"(p.ex. {', '.join(str(event_id) for event_id in missing[:5])}). "
+                    f"Executa backfill_event_embeddings --model \"{name}\"."
+                )
+
+            activate_model(name)
+            self.stdout.write(self.style.SUCCESS(f"✅ Model actiu: {name} (abans {previous})"))
+            # Els esdeveniments editats mentre es comprovava la cobertura
+            self.catch_up(collection, db, name, options["batch_size"])
+        finally:
+            client.close()
+
+        self.stdout.write(
+            "Recorda tornar a generar els artefactes del model nou: export_embedding_snapshot, "
+            "build_ann_index (si fas servir 'ivf') i build_event_neighbours. Per tornar enrere, "
+            f"switch_embedding_model \"{previous}\"."
+        )
+
+    def catch_up(self, collection, db, name: str, batch_size: int):
+        totals = run_backfill(
+            collection, db, {}, f"{CHECKPOINT_NAME}:{name}", max(1, batch_size),
+            changed_only=True, model=name,
+        )
+        self.stdout.write(f"Posada al dia de {name}: {totals['processed']} vectors generats, "
+                          f"{totals['unchanged']} sense canvis")
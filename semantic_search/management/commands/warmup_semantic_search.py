@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from semantic_search.services.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Carrega i escalfa el model de cerca semàntica i mostra el temps de càrrega i la memòria resident."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--indexes",
+            action="store_true",
+            help="Construeix també els índexs vectorial i lèxic"
+        )
+
+    def handle(self, *args, **options):
+        report = warm_up(load_indexes=options["indexes"])
+
+        self.stdout.write(f"RSS inicial:            {report['rss_before_mb']:.0f} MB")
+        self.stdout.write(f"Càrrega del model:      {report['model_load_s']:.2f} s "
+                          f"(RSS {report['rss_model_mb']:.0f} MB)")
+        self.stdout.write(f"Codificació d'escalfament: {report['warmup_encode_s'] * 1000:.0f} ms")
+        if options["indexes"]:
+            self.stdout.write(f"Índexs:                 {report['index_events']} vectors, "
+                              f"{report['lexical_events']} documents en {report['index_load_s']:.2f} s")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ RSS final: {report['rss_after_mb']:.0f} MB "
+            f"(+{report['rss_after_mb'] - report['rss_before_mb']:.0f} MB)"
+        ))
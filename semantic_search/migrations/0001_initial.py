@@ -0,0 +1,29 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('events', '0004_event_embedding_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventNeighbours',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbours', serialize=False, to='events.event')),
+                ('neighbour_ids', models.BinaryField()),
+                ('embedding_model', models.CharField(blank=True, max_length=200, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Veïns semàntics',
+                'verbose_name_plural': 'Veïns semàntics',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.13 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('semantic_search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmbeddingModelState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active', models.CharField(max_length=200)),
+                ('previous', models.CharField(blank=True, max_length=200, null=True)),
+                ('switched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Model d'embeddings actiu",
+                'verbose_name_plural': "Model d'embeddings actiu",
+            },
+        ),
+    ]
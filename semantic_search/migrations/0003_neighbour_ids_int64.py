@@ -0,0 +1,24 @@
+from array import array
+
+from django.db import migrations
+
+
+def _convert(source: str, target: str):
+    def convert(apps, schema_editor):
+        EventNeighbours = apps.get_model('semantic_search', 'EventNeighbours')
+        for row in EventNeighbours.objects.all().iterator():
+            row.neighbour_ids = array(target, array(source, bytes(row.neighbour_ids))).tobytes()
+            row.save(update_fields=['neighbour_ids'])
+    return convert
+
+
+class Migration(migrations.Migration):
+    """Les llistes de veïns passen d'int32 a int64: els ids (BigAutoField) poden no cabre en 32 bits."""
+
+    dependencies = [
+        ('semantic_search', '0002_embeddingmodelstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(_convert('i', 'q'), _convert('q', 'i')),
+    ]
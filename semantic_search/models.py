@@ -1,3 +1,53 @@
+from array import array
+
 from django.db import models
 
-# Create your models here.
+from events.models import Event
+
+
+class EventNeighbours(models.Model):
+    """
+    Esdeveniments més similars a un esdeveniment (per embedding), precalculats
+    per a la pàgina de detall. Només s'hi guarden esdeveniments programats o
+    en directe, com una llista compacta d'ids (int64, com els BigAutoField)
+    ordenada per similitud.
+    """
+
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='neighbours')
+    neighbour_ids = models.BinaryField()
+    embedding_model = models.CharField(max_length=200, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Veïns semàntics'
+        verbose_name_plural = 'Veïns semàntics'
+
+    def __str__(self):
+        return f"Veïns de {self.event_id}"
+
+    @property
+    def ids(self) -> list[int]:
+        return list(array('q', bytes(self.neighbour_ids)))
+
+    @ids.setter
+    def ids(self, event_ids):
+        self.neighbour_ids = array('q', event_ids).tobytes()
+
+
+class EmbeddingModelState(models.Model):
+    """
+    Model d'embeddings actiu (una sola fila). Les cerques només fan servir
+    vectors d'aquest model; switch_embedding_model el canvia de cop quan el
+    model nou ja té vectors per a tots els esdeveniments.
+    """
+
+    active = models.CharField(max_length=200)
+    previous = models.CharField(max_length=200, blank=True, null=True)
+    switched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Model d'embeddings actiu"
+        verbose_name_plural = "Model d'embeddings actiu"
+
+    def __str__(self):
+        return self.active
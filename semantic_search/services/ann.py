@@ -0,0 +1,253 @@
+import io
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .quantization import CHUNK_ROWS
+from .snapshot import snapshot_dir
+
+# Motors de cerca suportats per l'índex vectorial
+ENGINES = ('exact', 'ivf')
+# Nom del fitxer on es guarda l'índex IVF (al directori dels snapshots)
+IVF_FILE = "ivf.npz"
+
+
+def engine_name() -> str:
+    """Motor de cerca configurat als settings ('exact' o 'ivf')."""
+    engine = getattr(settings, "SEMANTIC_SEARCH_ENGINE", "exact")
+    if engine not in ENGINES:
+        raise ValueError(f"SEMANTIC_SEARCH_ENGINE no vàlid: {engine!r}")
+    return engine
+
+
+def ivf_path() -> Path:
+    """Fitxer on es guarda l'índex IVF construït amb build_ann_index."""
+    return snapshot_dir() / IVF_FILE
+
+
+def default_nlist(n: int) -> int:
+    """Nombre de cel·les per a n vectors (~√n, com a mínim 1)."""
+    nlist = getattr(settings, "SEMANTIC_SEARCH_ANN_NLIST", None)
+    return max(1, min(n, int(nlist or np.sqrt(n))))
+
+
+def _assign(matrix, centroids: np.ndarray) -> np.ndarray:
+    """Cel·la (centroide més proper per cosinus) de cada fila, per blocs."""
+    cells = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], CHUNK_ROWS):
+        block = np.asarray(matrix[start:start + CHUNK_ROWS], dtype=np.float32)
+        cells[start:start + CHUNK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return cells
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def kmeans(matrix, nlist: int, iterations: int = 10, sample: int = 64, seed: int = 0) -> np.ndarray:
+    """
+    K-means esfèric (per cosinus) sobre una mostra de les files.
+
+    Com a molt s'entrenen nlist · sample files, de manera que el cost no
+    depèn de la mida del catàleg. Les cel·les que es queden buides es tornen
+    a inicialitzar amb una fila aleatòria.
+
+    Returns:
+        Centroides normalitzats (nlist, d)
+    """
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    rows = np.sort(rng.choice(n, size=min(n, nlist * sample), replace=False))
+    train = np.asarray(matrix[rows], dtype=np.float32)
+    centroids = train[rng.choice(len(train), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        cells = _assign(train, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, cells, train)
+        counts = np.bincount(cells, minlength=nlist)
+        empty = counts == 0
+        sums[empty] = train[rng.choice(len(train), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Índex aproximat IVF (inverted file) sobre els embeddings dels esdeveniments.
+
+    Els vectors es reparteixen en nlist cel·les segons el centroide k-means
+    més proper. Una cerca només visita les nprobe cel·les més properes a la
+    query i retorna els ids que hi ha com a candidats; l'índex vectorial
+    els puntua després de manera exacta. Més nprobe vol dir més recall i
+    més latència (nprobe = nlist equival a la cerca exacta).
+
+    Les cel·les construïdes són arrays immutables; les altes posteriors van a
+    llistes per cel·la i les baixes només s'esborren del mapa id → cel·la.
+    Els ids que queden obsolets en una cel·la es filtren en puntuar, i quan
+    n'hi ha massa les cel·les es reconstrueixen.
+    """
+
+    def __init__(self, centroids: np.ndarray, nprobe: int = 8, model: str = ""):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.model = model
+        self._cells = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self._added = [[] for _ in range(self.nlist)]
+        # Cel·la actual de cada id indexat
+        self._cell_of = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def __contains__(self, event_id):
+        return event_id in self._cell_of
+
+    @classmethod
+    def build(cls, ids, matrix, nlist: int | None = None, nprobe: int = 8, model: str = "",
+              iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        """
+        Entrena els centroides amb k-means i reparteix totes les files (normalitzades).
+
+        Args:
+            ids: Ids dels esdeveniments, paral·lels a les files
+            matrix: Matriu (n, d) de vectors normalitzats (pot ser un memmap)
+            nlist: Nombre de cel·les (per defecte ~√n)
+            nprobe: Cel·les visitades per cerca per defecte
+            model: Model amb què s'han generat els embeddings
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        nlist = min(nlist or default_nlist(len(ids)), max(len(ids), 1))
+        if len(ids):
+            centroids = kmeans(matrix, nlist, iterations=iterations, seed=seed)
+        else:
+            centroids = np.zeros((1, matrix.shape[1]), dtype=np.float32)
+        index = cls(centroids, nprobe=nprobe, model=model)
+        index._fill(ids, _assign(matrix, centroids) if len(ids) else np.empty(0, dtype=np.int32))
+        return index
+
+    def _fill(self, ids: np.ndarray, cells: np.ndarray):
+        """Reconstrueix les cel·les a partir dels arrays paral·lels (id, cel·la)."""
+        order = np.argsort(cells, kind='stable')
+        bounds = np.searchsorted(cells[order], np.arange(self.nlist + 1))
+        self._cells = [ids[order[bounds[c]:bounds[c + 1]]] for c in range(self.nlist)]
+        self._added = [[] for _ in range(self.nlist)]
+        self._cell_of = dict(zip(ids.tolist(), cells.tolist()))
+        self._stale = 0
+
+    def add(self, event_id: int, vec: np.ndarray):
+        """Afegeix o mou un esdeveniment (vector normalitzat) a la seva cel·la."""
+        cell = int(np.argmax(self.centroids @ vec))
+        with self._lock:
+            previous = self._cell_of.get(event_id)
+            if previous == cell:
+                return
+            if previous is not None:
+                self._stale += 1
+            self._cell_of[event_id] = cell
+            self._added[cell].append(event_id)
+            self._maybe_compact()
+
+    def sync(self, ids, matrix):
+        """
+        Posa l'índex al dia amb les files d'un índex vectorial: afegeix els ids
+        que hi falten i elimina els que ja no hi són. Els vectors que ja hi
+        eren no es tornen a assignar.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        present = set(ids.tolist())
+        missing = np.array([i not in self._cell_of for i in ids.tolist()], dtype=bool)
+        cells = _assign(matrix[missing], self.centroids) if missing.any() else []
+        with self._lock:
+            for event_id, cell in zip(ids[missing].tolist(), np.asarray(cells).tolist()):
+                self._cell_of[event_id] = cell
+                self._added[cell].append(event_id)
+        for event_id in [i for i in self._cell_of if i not in present]:
+            self.remove(event_id)
+
+    def remove(self, event_id: int) -> bool:
+        """Elimina un esdeveniment (el seu id queda obsolet dins la cel·la)."""
+        with self._lock:
+            if self._cell_of.pop(event_id, None) is None:
+                return False
+            self._stale += 1
+            self._maybe_compact()
+            return True
+
+    def _maybe_compact(self):
+        # Reconstruïm les cel·les quan els ids obsolets superen una quarta part
+        if self._stale * 4 > max(len(self._cell_of), 1024):
+            ids = np.fromiter(self._cell_of.keys(), dtype=np.int64, count=len(self._cell_of))
+            cells = np.fromiter(self._cell_of.values(), dtype=np.int32, count=len(self._cell_of))
+            self._fill(ids, cells)
+
+    def probe(self, query: np.ndarray, nprobe: int | None = None) -> np.ndarray:
+        """
+        Ids candidats per a una query: els de les nprobe cel·les més properes.
+        Pot incloure ids eliminats o moguts, que l'índex vectorial descarta.
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        similarity = self.centroids @ query
+        if nprobe < self.nlist:
+            cells = np.argpartition(-similarity, nprobe - 1)[:nprobe]
+        else:
+            cells = np.arange(self.nlist)
+        with self._lock:
+            parts = [self._cells[c] for c in cells]
+            parts.extend(np.asarray(self._added[c], dtype=np.int64) for c in cells if self._added[c])
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def save(self, path: Path | None = None) -> Path:
+        """Desa l'índex en un fitxer .npz (escriptura atòmica)."""
+        path = Path(path or ivf_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            ids = np.fromiter(self._cell_of.keys(), dtype=np.int64, count=len(self._cell_of))
+            cells = np.fromiter(self._cell_of.values(), dtype=np.int32, count=len(self._cell_of))
+        buffer = io.BytesIO()
+        np.savez(buffer, centroids=self.centroids, ids=ids, cells=cells,
+                 nprobe=np.int64(self.nprobe), model=np.str_(self.model))
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(buffer.getvalue())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path | None = None) -> "IVFIndex | None":
+        """Carrega un índex desat amb save(). Retorna None si no n'hi ha cap."""
+        try:
+            with np.load(Path(path or ivf_path()), allow_pickle=False) as data:
+                index = cls(data['centroids'], nprobe=int(data['nprobe']), model=str(data['model']))
+                index._fill(data['ids'], data['cells'])
+        except (OSError, KeyError, ValueError):
+            return None
+        return index
+
+
+def load_engine(vector_index, model: str) -> IVFIndex:
+    """
+    Retorna l'índex IVF per a un índex vectorial: el desat a disc si és del
+    mateix model i dimensió (posat al dia amb sync), o un de nou si no.
+    """
+    nprobe = getattr(settings, "SEMANTIC_SEARCH_ANN_NPROBE", 8)
+    ids, matrix = vector_index.vectors()
+    engine = IVFIndex.load()
+    if engine is None or engine.model != model or engine.dim != matrix.shape[1]:
+        engine = IVFIndex.build(ids, matrix, nprobe=nprobe, model=model)
+    else:
+        engine.nprobe = nprobe
+        engine.sync(ids, matrix)
+    return engine
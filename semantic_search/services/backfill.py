@@ -0,0 +1,291 @@
+import os
+import time
+
+from django.utils import timezone
+from pymongo import UpdateOne
+
+from .embeddings import embed_texts, model_name
+from .slots import SLOTS, hash_for, slot_to_write, write_fields
+from .text import doc_text, text_hash
+
+# Col·lecció on es guarden els punts de control dels processos de backfill
+CHECKPOINT_COLLECTION = 'semantic_search_checkpoints'
+# Camps que cal llegir de cada document per generar-ne el text i triar-ne el slot
+TEXT_FIELDS = ('title', 'description', 'category', 'tags', 'created_at') + tuple(
+    fields[key] for fields in SLOTS.values() for key in ('model', 'hash')
+)
+
+
+def after_checkpoint(checkpoint: dict | None) -> dict:
+    """
+    Filtre de Mongo per continuar just després del darrer document processat,
+    seguint l'ordre (created_at, _id).
+    """
+    if not checkpoint:
+        return {}
+    return {'$or': [
+        {'created_at': {'$gt': checkpoint['created_at']}},
+        {'created_at': checkpoint['created_at'], '_id': {'$gt': checkpoint['last_id']}},
+    ]}
+
+
+def load_checkpoint(db, name: str) -> dict | None:
+    return db[CHECKPOINT_COLLECTION].find_one({'_id': name})
+
+
+def save_checkpoint(db, name: str, doc: dict):
+    db[CHECKPOINT_COLLECTION].update_one(
+        {'_id': name},
+        {'$set': {
+            'created_at': doc.get('created_at'),
+            'last_id': doc['_id'],
+            'updated_at': timezone.now(),
+        }},
+        upsert=True,
+    )
+
+
+def clear_checkpoint(db, name: str):
+    db[CHECKPOINT_COLLECTION].delete_one({'_id': name})
+
+
+def iter_batches(collection, query: dict, batch_size: int, limit: int = 0):
+    """
+    Recorre els documents en ordre (created_at, _id) i els retorna en lots.
+    Només es llegeixen els camps necessaris per generar el text.
+    """
+    projection = {field: 1 for field in TEXT_FIELDS}
+    cursor = (
+        collection.find(query, projection)
+        .sort([('created_at', 1), ('_id', 1)])
+        .batch_size(batch_size)
+    )
+    if limit and limit > 0:
+        cursor = cursor.limit(limit)
+
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def drifted(docs: list[dict], model: str) -> list[dict]:
+    """Documents el text actual dels quals no coincideix amb el hash del vector del model."""
+    return [doc for doc in docs if text_hash(doc_text(doc)) != hash_for(doc, model)]
+
+
+def embed_batch(collection, docs: list[dict], model: str | None = None) -> dict:
+    """
+    Genera els embeddings d'un lot de documents amb una sola crida al model
+    i els escriu amb un únic bulk_write. Els textos idèntics es codifiquen
+    una sola vegada.
+
+    Amb un model diferent de l'actiu, els vectors es desen al slot que no fa
+    servir el model actiu, de manera que les cerques no es veuen afectades.
+
+    Returns:
+        Diccionari amb els comptadors processed i skipped, els ids omesos
+        (sense text) i el temps emprat en segons (elapsed)
+    """
+    start = time.perf_counter()
+    # Agrupem els documents pel hash del seu text
+    groups, skipped_ids = {}, []
+    for doc in docs:
+        text = doc_text(doc)
+        if text:
+            group = groups.setdefault(text_hash(text), {'text': text, 'ids': []})
+            group['ids'].append(doc['_id'])
+        else:
+            skipped_ids.append(doc['_id'])
+
+    if groups:
+        active = model_name()
+        model = model or active
+        slots = {doc['_id']: slot_to_write(doc, model, active) for doc in docs}
+        digests = list(groups)
+        vectors = embed_texts([groups[d]['text'] for d in digests], batch_size=len(digests), model=model)
+        now = timezone.now()
+        operations = []
+        for digest, vec in zip(digests, vectors):
+            fields = {slot: write_fields(slot, vec, model, digest, now) for slot in set(SLOTS)}
+            for event_id in groups[digest]['ids']:
+                operations.append(UpdateOne({'_id': event_id}, {'$set': fields[slots[event_id]]}))
+        collection.bulk_write(operations, ordered=False)
+
+    return {
+        'processed': len(docs) - len(skipped_ids),
+        'skipped': len(skipped_ids),
+        'skipped_ids': skipped_ids,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def run_backfill(collection, db, query: dict, checkpoint_name: str, batch_size: int,
+                 limit: int = 0, resume: bool = False, changed_only: bool = False,
+                 report=None, model: str | None = None) -> dict:
+    """
+    Executa el backfill dels documents que compleixen la query, lot a lot.
+    Amb changed_only=True només es tornen a generar els documents el text dels
+    quals ha canviat des de l'últim embedding (la resta es compten com a unchanged).
+
+    Després de cada lot confirmat es guarda un punt de control, de manera que
+    amb resume=True es continua just després del darrer document processat.
+    Si un lot falla, el punt de control ja no avança (els lots següents es
+    processen igualment) i no s'esborra en acabar: amb resume=True es torna a
+    començar pel lot fallit.
+    La funció report(event, data) rep els esdeveniments 'resume', 'batch' i 'error'.
+    model indica el model amb què es generen els vectors (per defecte, l'actiu).
+
+    Returns:
+        Diccionari amb els totals processed, unchanged, skipped i errors
+    """
+    report = report or (lambda event, data: None)
+    model = model or model_name()
+    if resume:
+        checkpoint = load_checkpoint(db, checkpoint_name)
+        if checkpoint:
+            report('resume', {'created_at': checkpoint['created_at'], 'last_id': checkpoint['last_id']})
+            query = {'$and': [query, after_checkpoint(checkpoint)]}
+    else:
+        clear_checkpoint(db, checkpoint_name)
+
+    totals = {'processed': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0}
+    for batch_number, docs in enumerate(iter_batches(collection, query, batch_size, limit), start=1):
+        pending = drifted(docs, model) if changed_only else docs
+        totals['unchanged'] += len(docs) - len(pending)
+        try:
+            stats = embed_batch(collection, pending, model)
+        except Exception as ex:
+            totals['errors'] += 1
+            totals['skipped'] += len(pending)
+            report('error', {
+                'batch': batch_number,
+                'first_id': docs[0]['_id'],
+                'last_id': docs[-1]['_id'],
+                'error': f"{type(ex).__name__}: {str(ex)}",
+            })
+            continue
+
+        totals['processed'] += stats['processed']
+        totals['skipped'] += stats['skipped']
+        # Guardem el punt de control després de confirmar l'escriptura del lot,
+        # però mai per sobre d'un lot fallit (--resume l'ha de tornar a intentar)
+        if not totals['errors']:
+            save_checkpoint(db, checkpoint_name, docs[-1])
+        report('batch', {
+            'batch': batch_number,
+            'size': len(docs),
+            'elapsed': stats['elapsed'],
+            'skipped_ids': stats['skipped_ids'],
+            **totals,
+        })
+
+    # El recorregut ha acabat: sense errors, la propera execució comença de zero
+    if not totals['errors']:
+        clear_checkpoint(db, checkpoint_name)
+    if totals['processed'] and model == model_name():
+        # Els embeddings nous invaliden els rànquings en cache (cal un backend compartit entre processos)
+        from .result_cache import bump_index_version
+        bump_index_version()
+    return totals
+
+
+def plan_shards(collection, query: dict, workers: int) -> list[dict]:
+    """
+    Divideix els documents en rangs d'_id disjunts i d'una mida semblant
+    amb una sola agregació $bucketAuto.
+    """
+    buckets = list(collection.aggregate([
+        {'$match': query},
+        {'$bucketAuto': {'groupBy': '$_id', 'buckets': workers}},
+    ]))
+    shards = []
+    for number, bucket in enumerate(buckets):
+        shards.append({
+            'index': number,
+            'lo': bucket['_id']['min'],
+            'hi': bucket['_id']['max'],
+            # A $bucketAuto el màxim és exclusiu excepte a l'últim bucket
+            'last': number == len(buckets) - 1,
+            'count': bucket['count'],
+            'done': False,
+        })
+    return shards
+
+
+def shard_query(query: dict, shard: dict) -> dict:
+    """Restringeix una query al rang d'_id d'un shard."""
+    upper = '$lte' if shard['last'] else '$lt'
+    return {'$and': [query, {'_id': {'$gte': shard['lo'], upper: shard['hi']}}]}
+
+
+def load_shard_plan(db, name: str) -> dict | None:
+    return db[CHECKPOINT_COLLECTION].find_one({'_id': f"{name}:shards"})
+
+
+def save_shard_plan(db, name: str, shards: list[dict]):
+    db[CHECKPOINT_COLLECTION].replace_one(
+        {'_id': f"{name}:shards"},
+        {'shards': shards, 'created_at': timezone.now()},
+        upsert=True,
+    )
+
+
+def mark_shard_done(db, name: str, index: int):
+    db[CHECKPOINT_COLLECTION].update_one(
+        {'_id': f"{name}:shards", 'shards.index': index},
+        {'$set': {'shards.$.done': True}},
+    )
+
+
+def clear_shard_plan(db, name: str):
+    db[CHECKPOINT_COLLECTION].delete_one({'_id': f"{name}:shards"})
+
+
+def shard_worker(shard: dict, query: dict, checkpoint_name: str, batch_size: int,
+                 resume: bool, changed_only: bool, threads: int, queue, model: str | None = None):
+    """
+    Punt d'entrada d'un procés worker del backfill.
+
+    Cada worker té la seva pròpia instància del model i el seu propi client de
+    Mongo, processa només el rang d'_id del seu shard i envia el progrés al
+    procés pare a través de la cua.
+    """
+    # Els processos creats amb 'spawn' no hereten la configuració de Django
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+    import torch
+    from events.mongo import events_collection, get_database, mongo_client
+
+    # Repartim els nuclis entre els workers per no saturar la CPU
+    torch.set_num_threads(threads)
+
+    index = shard['index']
+    client = mongo_client()
+    try:
+        db = get_database(client)
+        totals = run_backfill(
+            events_collection(client),
+            db,
+            shard_query(query, shard),
+            f"{checkpoint_name}:shard:{index}",
+            batch_size,
+            resume=resume,
+            changed_only=changed_only,
+            report=lambda event, data: queue.put((event, index, data)),
+            model=model,
+        )
+        # Un rang amb lots fallits no es dona per acabat: --resume el reprèn pel seu punt de control
+        if not totals['errors']:
+            mark_shard_done(db, checkpoint_name, index)
+        queue.put(('done', index, totals))
+    except Exception as ex:
+        queue.put(('failed', index, {'error': f"{type(ex).__name__}: {str(ex)}"}))
+    finally:
+        client.close()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Lock per crear el batcher global una sola vegada
+_lock = threading.Lock()
+# Batcher global del procés
+_batcher = None
+
+
+class MicroBatcher:
+    """
+    Agrupa les queries que arriben alhora en una sola crida a model.encode.
+
+    Cada petició afegeix el seu text a la cua i rep un Future. Un únic thread
+    espera el primer text, recull els que arriben durant window_ms (o fins a
+    max_batch) i els codifica junts; cada Future rep el seu vector. Així les
+    cerques concurrents no es disputen els nuclis amb passades separades del
+    model. Els textos repetits dins d'un lot es codifiquen una sola vegada.
+    """
+
+    def __init__(self, encode, window_ms: float = 5, max_batch: int = 32):
+        self.encode = encode
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        # Mètriques
+        self.batches = 0
+        self.items = 0
+        self.max_depth = 0
+        self._sizes = Counter()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, text: str) -> Future:
+        """Encua un text i retorna un Future amb el seu vector."""
+        future = Future()
+        with self._cond:
+            self._pending.append((text, future))
+            self.max_depth = max(self.max_depth, len(self._pending))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def embed(self, text: str, timeout: float | None = None):
+        """Vector d'un text (bloqueja fins que el lot on ha entrat s'ha codificat)."""
+        return self.submit(text).result(timeout)
+
+    async def aembed(self, text: str):
+        """Versió asíncrona de embed() per a vistes i consumidors async."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _take(self) -> list[tuple[str, Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Esperem la finestra des del primer text, o fins a omplir el lot
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = self.encode(texts)
+            except Exception as exc:
+                logger.exception("Error codificant un lot de %d queries", len(texts))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            by_text = dict(zip(texts, vectors))
+            for text, future in batch:
+                future.set_result(by_text[text])
+            with self._cond:
+                self.batches += 1
+                self.items += len(batch)
+                self._sizes[len(batch)] += 1
+
+    def stats(self) -> dict:
+        """Mida de la cua i distribució de la mida dels lots."""
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self.max_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self._sizes.items())),
+            }
+
+
+def get_batcher() -> MicroBatcher:
+    """Retorna el batcher global del procés, configurat des dels settings."""
+    global _batcher
+    if _batcher is None:
+        with _lock:
+            if _batcher is None:
+                from .embeddings import embed_texts
+
+                _batcher = MicroBatcher(
+                    embed_texts,
+                    window_ms=getattr(settings, "SEMANTIC_SEARCH_BATCH_WINDOW_MS", 5),
+                    max_batch=getattr(settings, "SEMANTIC_SEARCH_BATCH_MAX_SIZE", 32),
+                )
+    return _batcher
@@ -0,0 +1,47 @@
+import hashlib
+from datetime import datetime
+
+from django.core import signing
+
+# Salt de la signatura dels cursors (separa'ls d'altres valors signats del projecte)
+SALT = "semantic_search.cursor"
+
+
+def fingerprint(*parts) -> str:
+    """Empremta curta de la cerca (query i filtres) a la qual pertany un cursor."""
+    return hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, version: int, after: datetime | None, search: str) -> str:
+    """
+    Cursor opac i signat d'una pàgina de resultats.
+
+    Guarda la posició dins del rànquing, la versió de l'índex i el filtre de
+    data amb què s'ha calculat, de manera que les pàgines següents es llegeixen
+    del mateix rànquing en cache sense tornar a puntuar.
+    """
+    return signing.dumps(
+        {'o': offset, 'v': version, 'a': after.isoformat() if after else None, 's': search},
+        salt=SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(token: str | None, search: str) -> dict | None:
+    """
+    Valida un cursor i retorna {'offset', 'version', 'after'}. Retorna None si
+    no n'hi ha, si la signatura no és vàlida o si pertany a una altra cerca.
+    """
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get('s') != search:
+        return None
+    return {
+        'offset': max(0, int(data.get('o', 0))),
+        'version': data.get('v'),
+        'after': datetime.fromisoformat(data['a']) if data.get('a') else None,
+    }
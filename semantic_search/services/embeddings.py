@@ -1,36 +1,54 @@
 import threading
-from sentence_transformers import SentenceTransformer
+import time
 
-# Nom del model multilingüe que s'utilitzarà per generar els embeddings
+from django.conf import settings
+from django.db import DatabaseError
+
+from .warmup import configure_threads
+
+# Nom del model multilingüe per defecte (si no s'ha activat cap altre model)
 _MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
 # Lock per garantir que només un thread carregui el model a la vegada
 _lock = threading.Lock()
-# Variable global per emmagatzemar el model carregat
-_model = None
+# Models carregats, pel seu nom
+_models = {}
+# Model actiu llegit de la base de dades i moment a partir del qual cal tornar-lo a llegir
+_active = None
 
-def get_model():
+def get_model(name: str | None = None):
     """
-    Carrega el model de forma lazy i thread-safe.
-    Només es carrega una vegada en memòria.
+    Carrega el model (per defecte, l'actiu) de forma lazy i thread-safe.
+    Cada model només es carrega una vegada en memòria.
+
+    sentence_transformers (i amb ell torch i transformers) només s'importa
+    aquí, de manera que els processos que no generen embeddings (ordres de
+    manage.py, l'admin, el xat...) no el carreguen mai.
     """
-    global _model
+    name = name or model_name()
+    model = _models.get(name)
     # Si el model no està carregat
-    if _model is None:
-        # Bloquejem per evitar que múltiples threads elcarreguin simultàniament
+    if model is None:
+        # Bloquejem per evitar que múltiples threads el carreguin simultàniament
         with _lock:
             # Double-check: si un altre thread ja l'ha carregat, no ho fem de nou
-            if _model is None:
-                print(f"Carregant model: {_MODEL_NAME}...")
-                _model = SentenceTransformer(_MODEL_NAME)
+            model = _models.get(name)
+            if model is None:
+                # Threads de PyTorch configurats als settings (abans de la primera codificació)
+                configure_threads()
+                from sentence_transformers import SentenceTransformer
+
+                print(f"Carregant model: {name}...")
+                model = _models[name] = SentenceTransformer(name)
                 print("Model carregat correctament.")
-    return _model
+    return model
 
-def embed_text(text: str) -> list[float]:
+def embed_text(text: str, model: str | None = None) -> list[float]:
     """
     Converteix un text en un vector d'embedding normalitzat.
     
     Args:
         text: Text a convertir
+        model: Nom del model (per defecte, l'actiu)
         
     Returns:
         Llista de floats que representen l'embedding
@@ -42,12 +60,71 @@ def embed_text(text: str) -> list[float]:
         return []
     
     # Obtenim el model
-    model = get_model()
+    encoder = get_model(model)
     # Generem l'embedding normalitzat (vector de 384 dimensions)
-    vec = model.encode([text], normalize_embeddings=True)[0]
+    vec = encoder.encode([text], normalize_embeddings=True)[0]
     # Convertim el numpy array a llista de Python
     return vec.tolist()
 
+def embed_texts(texts: list[str], batch_size: int = 32, model: str | None = None):
+    """
+    Converteix una llista de textos en embeddings normalitzats amb una sola
+    crida a model.encode (el model agrupa internament en lots de batch_size).
+
+    Args:
+        texts: Textos a convertir (no buits)
+        batch_size: Mida dels lots interns del model
+        model: Nom del model (per defecte, l'actiu)
+
+    Returns:
+        Matriu numpy float32 (n, 384) amb un embedding per text
+    """
+    return get_model(model).encode(list(texts), batch_size=batch_size, normalize_embeddings=True)
+
+def _read_active_model() -> str:
+    """Model actiu desat a la base de dades, o SEMANTIC_SEARCH_MODEL si no n'hi ha cap."""
+    from ..models import EmbeddingModelState
+
+    default = getattr(settings, "SEMANTIC_SEARCH_MODEL", _MODEL_NAME)
+    try:
+        active = EmbeddingModelState.objects.values_list('active', flat=True).first()
+    except DatabaseError:
+        # Taula encara no creada (p.ex. abans de migrate)
+        return default
+    return active or default
+
 def model_name() -> str:
-    """Retorna el nom del model utilitzat."""
-    return _MODEL_NAME
\ No newline at end of file
+    """
+    Retorna el nom del model actiu. Es torna a llegir de la base de dades
+    cada SEMANTIC_SEARCH_MODEL_CHECK_INTERVAL segons, de manera que tots els
+    processos passen al model nou poc després de switch_embedding_model.
+    """
+    global _active
+    now = time.monotonic()
+    if _active is None or _active[1] <= now:
+        _active = (_read_active_model(), now + getattr(settings, "SEMANTIC_SEARCH_MODEL_CHECK_INTERVAL", 30))
+    return _active[0]
+
+def cached_model_name() -> str | None:
+    """
+    Model actiu llegit per model_name() si encara és vigent, sense tocar la
+    base de dades (None si s'ha de tornar a llegir). Per a codi asíncron, on
+    l'ORM no es pot cridar des del bucle d'esdeveniments.
+    """
+    active = _active
+    if active is None or active[1] <= time.monotonic():
+        return None
+    return active[0]
+
+async def amodel_name() -> str:
+    """Versió asíncrona de model_name(): només surt del bucle quan l'ha de tornar a llegir."""
+    name = cached_model_name()
+    if name is None:
+        from asgiref.sync import sync_to_async
+        name = await sync_to_async(model_name, thread_sensitive=True)()
+    return name
+
+def reset_model_name():
+    """Oblida el model actiu llegit, perquè la propera crida el torni a llegir."""
+    global _active
+    _active = None
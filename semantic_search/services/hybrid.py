@@ -0,0 +1,120 @@
+from django.conf import settings
+
+from .embeddings import model_name
+from .index import get_index
+from .lexical import get_lexical_index
+from .query_cache import embed_query, normalize_query
+from .ranker import MIN_SCORE
+from .result_cache import get_result_cache, index_version, result_cache_enabled
+
+# Mètodes de fusió suportats
+FUSIONS = ('rrf', 'weighted')
+# Constant de la reciprocal rank fusion (valor habitual a la literatura)
+RRF_K = 60
+# Resultats de cada rànquing que entren a la fusió
+HYBRID_DEPTH = 50
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K, weights=None) -> list[tuple[int, float]]:
+    """
+    Fusiona diversos rànquings amb reciprocal rank fusion: cada esdeveniment
+    suma weight / (k + posició) per cada llista on apareix. Només depèn de
+    les posicions, de manera que no cal que els scores siguin comparables.
+
+    Returns:
+        Llista de tuples (event_id, score) ordenada per score descendent
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for position, (event_id, _) in enumerate(ranking, start=1):
+            fused[event_id] = fused.get(event_id, 0.0) + weight / (k + position)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def _min_max(ranking) -> dict[int, float]:
+    """Scores d'un rànquing normalitzats a [0, 1]."""
+    if not ranking:
+        return {}
+    scores = [score for _, score in ranking]
+    low, high = min(scores), max(scores)
+    span = high - low
+    return {event_id: (score - low) / span if span else 1.0 for event_id, score in ranking}
+
+
+def weighted_fusion(dense, lexical, alpha: float = 0.5) -> list[tuple[int, float]]:
+    """
+    Suma ponderada dels scores normalitzats (min-max) de cada rànquing:
+    alpha · cosinus + (1 - alpha) · BM25. Un esdeveniment absent d'una
+    llista hi aporta 0.
+
+    Returns:
+        Llista de tuples (event_id, score) ordenada per score descendent
+    """
+    dense, lexical = _min_max(dense), _min_max(lexical)
+    fused = {
+        event_id: alpha * dense.get(event_id, 0.0) + (1 - alpha) * lexical.get(event_id, 0.0)
+        for event_id in dense.keys() | lexical.keys()
+    }
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def fuse(dense, lexical, k: int = 20, fusion: str | None = None) -> list[tuple[int, float]]:
+    """
+    Combina el rànquing vectorial i el lèxic amb el mètode configurat
+    (SEMANTIC_SEARCH_HYBRID_FUSION) i retorna els k millors.
+    """
+    fusion = fusion or getattr(settings, "SEMANTIC_SEARCH_HYBRID_FUSION", "rrf")
+    if fusion not in FUSIONS:
+        raise ValueError(f"SEMANTIC_SEARCH_HYBRID_FUSION no vàlid: {fusion!r}")
+    if fusion == 'weighted':
+        alpha = getattr(settings, "SEMANTIC_SEARCH_HYBRID_ALPHA", 0.5)
+        return weighted_fusion(dense, lexical, alpha)[:k]
+    return reciprocal_rank_fusion([dense, lexical])[:k]
+
+
+def search_events(query: str, mode: str = 'semantic', k: int = 20, after=None, category=None,
+                  status=None, use_cache: bool = True, version: int | None = None) -> list[tuple[int, float]]:
+    """
+    Cerca esdeveniments en el mode indicat amb els mateixos filtres per a
+    tots dos índexs. El mode lèxic no calcula cap embedding.
+
+    Els rànquings es guarden a la cache de resultats amb la versió actual de
+    l'índex a la clau: una cerca repetida no executa el model ni puntua res
+    mentre no canviï cap esdeveniment (només si el comptador de versió és en
+    una cache compartida, vegeu result_cache_enabled). Les escriptures d'altres
+    processos arriben a l'índex amb la sincronització periòdica de get_index,
+    que també incrementa la versió i descarta els rànquings calculats abans
+    amb l'índex endarrerit. Amb version es llegeix
+    el rànquing d'una versió concreta (p.ex. la de la primera pàgina d'una
+    paginació): aquests es desen sempre, encara que la cache no sigui
+    compartida, perquè totes les pàgines d'un cursor surtin del mateix rànquing.
+
+    Returns:
+        Llista de tuples (event_id, score) ordenada per score descendent
+    """
+    if not use_cache or (version is None and not result_cache_enabled()):
+        return _search(query, mode, k, after, category, status)
+    cache = get_result_cache()
+    key = cache.make_key(
+        normalize_query(query), mode, k, after.isoformat() if after else "", category or "", status or "",
+        model_name(), version or index_version(),
+    )
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = cache.set(key, _search(query, mode, k, after, category, status))
+    return ranked
+
+
+def _search(query: str, mode: str, k: int, after, category, status) -> list[tuple[int, float]]:
+    filters = {'after': after, 'category': category, 'status': status}
+    if mode == 'lexical':
+        return get_lexical_index().search(query, k=k, **filters)
+
+    q_vec = embed_query(query)
+    if mode != 'hybrid':
+        return get_index().search(q_vec, k=k, threshold=MIN_SCORE, **filters)
+    depth = max(k, HYBRID_DEPTH)
+    dense = get_index().search(q_vec, k=depth, threshold=MIN_SCORE, **filters)
+    lexical = get_lexical_index().search(query, k=depth, **filters)
+    return fuse(dense, lexical, k)
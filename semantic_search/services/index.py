@@ -0,0 +1,622 @@
+import heapq
+import threading
+
+import numpy as np
+
+from . import quantization
+from .quantization import quantize
+from .ranker import select_top_k
+
+# Lock per garantir que només un thread construeixi l'índex a la vegada
+_lock = threading.Lock()
+# Índex global del procés (es carrega una sola vegada)
+_index = None
+# Atributs filtrables dels esdeveniments i array del segment on es guarden
+ATTRIBUTES = {'category': 'categories', 'status': 'statuses'}
+# Codi dels atributs desconeguts (None)
+NO_VALUE = -1
+# Per sota d'aquesta fracció de files elegibles, només es puntuen les elegibles
+SUBSET_FRACTION = 0.5
+# Camps de data que canvien quan canvien el text, els atributs o algun vector
+SYNC_FIELDS = ('updated_at', 'embedding_updated_at', 'alt_embedding_updated_at')
+
+
+def _valid_vector(embedding, dim=None) -> np.ndarray | None:
+    """
+    Converteix un embedding a vector float32 normalitzat.
+    Retorna None si l'embedding és buit, té una dimensió incorrecta o norma 0.
+    """
+    if embedding is None or len(embedding) == 0:
+        return None
+    v = np.asarray(embedding, dtype=np.float32)
+    if v.ndim != 1 or (dim is not None and v.shape[0] != dim):
+        return None
+    norm = np.linalg.norm(v)
+    if norm == 0:
+        return None
+    return v / norm
+
+
+class _Segment:
+    """
+    Bloc de files de l'índex: una matriu contigua (possiblement quantitzada)
+    amb els arrays paral·lels d'escales, ids, dates, codis de categoria i
+    d'estat i files vives.
+
+    Les files eliminades només es marquen com a mortes, de manera que una
+    matriu de només lectura (p.ex. un memmap compartit) es pot fer servir
+    com a segment sense copiar-la. Si el segment està quantitzat, pot tenir
+    també la matriu float32 original (exact) per tornar a puntuar candidats.
+    """
+
+    def __init__(self, codes, scales, ids, dates, categories=None, statuses=None,
+                 exact=None, growable: bool = False):
+        self.codes = codes
+        self.scales = scales
+        self.ids = ids
+        self.dates = dates
+        self.size = len(ids)
+        unknown = np.full(self.size, NO_VALUE, dtype=np.int16)
+        self.categories = unknown if categories is None else categories
+        self.statuses = unknown.copy() if statuses is None else statuses
+        self.alive = np.ones(self.size, dtype=bool)
+        self.dead = 0
+        self.growable = growable
+        self._exact = exact
+
+    @classmethod
+    def empty(cls, dim: int, dtype: str = 'float32', capacity: int = 1024) -> "_Segment":
+        codes, scales = quantize(np.zeros((capacity, dim), dtype=np.float32), dtype)
+        segment = cls(
+            codes,
+            scales,
+            np.empty(capacity, dtype=np.int64),
+            np.empty(capacity, dtype=np.float64),
+            np.full(capacity, NO_VALUE, dtype=np.int16),
+            np.full(capacity, NO_VALUE, dtype=np.int16),
+            growable=True,
+        )
+        segment.size = 0
+        segment.alive = np.zeros(capacity, dtype=bool)
+        return segment
+
+    @property
+    def dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def exact(self):
+        """Matriu float32 exacta, si n'hi ha (None per a segments quantitzats sense original)."""
+        return self.codes if self.codes.dtype == np.float32 else self._exact
+
+    def nbytes(self) -> int:
+        """Memòria ocupada per les files del segment (sense l'original en memmap)."""
+        n = self.size
+        return sum(getattr(self, name)[:n].nbytes for name in self._COLUMNS)
+
+    # Arrays paral·lels d'una fila per esdeveniment
+    _COLUMNS = ('codes', 'scales', 'ids', 'dates', 'categories', 'statuses')
+
+    def _grow(self, needed: int):
+        """Amplia la capacitat dels arrays (duplicant-la) si cal."""
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name in self._COLUMNS + ('alive',):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def put(self, row: int, vec: np.ndarray, date: float, category: int, status: int):
+        self.codes[row], self.scales[row] = quantize(vec, self.dtype)
+        self.set_attributes(row, date, category, status)
+
+    def set_attributes(self, row: int, date: float, category: int, status: int):
+        self.dates[row] = date
+        self.categories[row] = category
+        self.statuses[row] = status
+
+    def append(self, event_id: int, vec: np.ndarray, date: float, category: int, status: int) -> int:
+        self._grow(self.size + 1)
+        row = self.size
+        self.put(row, vec, date, category, status)
+        self.ids[row] = event_id
+        self.alive[row] = True
+        self.size += 1
+        return row
+
+    def kill(self, row: int):
+        self.alive[row] = False
+        self.dead += 1
+
+    def compacted(self) -> "_Segment":
+        """Retorna una còpia del segment sense les files mortes."""
+        keep = np.flatnonzero(self.alive[:self.size])
+        segment = _Segment.empty(self.codes.shape[1], self.dtype, max(len(keep), 1024))
+        for name in self._COLUMNS:
+            getattr(segment, name)[:len(keep)] = getattr(self, name)[keep]
+        segment.alive[:len(keep)] = True
+        segment.size = len(keep)
+        return segment
+
+
+class EventVectorIndex:
+    """
+    Índex vectorial resident en memòria amb tots els embeddings dels esdeveniments.
+
+    Els vectors es guarden en matrius contigües (una fila per esdeveniment)
+    amb arrays paral·lels d'ids i de dates programades, de manera que una
+    cerca és un producte matriu-vector per segment. L'índex té un segment
+    base (que pot ser un snapshot en disc obert amb memmap) i un segment
+    delta en memòria on van a parar les altes i modificacions.
+
+    Amb dtype 'float16' o 'int8' les files es guarden quantitzades i es
+    puntuen directament en aquesta forma; si hi ha la matriu float32
+    original (snapshot), els millors candidats es tornen a puntuar amb ella.
+
+    Si té un motor aproximat (engine, p.ex. un IVFIndex), cada cerca només
+    puntua els candidats que aquest proposa; amb exact=True es fa sempre
+    la cerca exhaustiva, per exemple per verificar el recall.
+    """
+
+    def __init__(self, dim: int | None = None, capacity: int = 1024, dtype: str = 'float32',
+                 rescore_factor: int = 0):
+        self.dim = dim
+        self.dtype = dtype
+        self.rescore_factor = rescore_factor
+        self._capacity = capacity
+        self._base = None
+        self._delta = None
+        # Segment i fila de cada id
+        self._pos = {}
+        # Codi numèric de cada valor dels atributs filtrables
+        self._vocab = {attribute: {} for attribute in ATTRIBUTES}
+        # Motor aproximat opcional que proposa els candidats de cada cerca
+        self.engine = None
+        # Model amb què s'han generat els vectors (el fixa build_index)
+        self.model = None
+        # Sincronització amb les escriptures d'altres processos (la fixa build_index)
+        self.sync = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_arrays(cls, matrix, ids, dates, dtype: str = 'float32', rescore_factor: int = 0,
+                    categories=None, statuses=None) -> "EventVectorIndex":
+        """
+        Crea un índex amb un segment base a partir d'arrays ja construïts
+        (les files de la matriu han d'estar normalitzades). En float32 la
+        matriu no es copia, de manera que pot ser un numpy.memmap compartit
+        entre processos; si es quantitza, la matriu original es conserva
+        només per tornar a puntuar els candidats.
+
+        categories i statuses són arrays paral·lels de valors (p.ex. 'music',
+        'live'); si no s'indiquen, els atributs queden desconeguts.
+        """
+        index = cls(dim=matrix.shape[1], dtype=dtype, rescore_factor=rescore_factor)
+        codes, scales = quantize(matrix, dtype)
+        index._base = _Segment(
+            codes,
+            scales,
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(dates, dtype=np.float64),
+            index._encode_column('category', categories),
+            index._encode_column('status', statuses),
+            exact=matrix if dtype != 'float32' else None,
+        )
+        index._pos = {int(event_id): (index._base, row) for row, event_id in enumerate(index._base.ids)}
+        return index
+
+    def _encode_column(self, attribute: str, values) -> np.ndarray | None:
+        """Codis d'un array de valors d'atribut (None si no n'hi ha)."""
+        if values is None:
+            return None
+        values = np.asarray(values, dtype=object)
+        known = np.array([value is not None for value in values], dtype=bool)
+        codes = np.full(len(values), NO_VALUE, dtype=np.int16)
+        if known.any():
+            uniques, inverse = np.unique(values[known].astype(str), return_inverse=True)
+            lookup = np.array([self._code(attribute, value) for value in uniques], dtype=np.int16)
+            codes[known] = lookup[inverse]
+        return codes
+
+    def _code(self, attribute: str, value) -> int:
+        """Codi numèric d'un valor d'atribut (se n'assigna un de nou si cal)."""
+        if value is None:
+            return NO_VALUE
+        vocab = self._vocab[attribute]
+        return vocab.setdefault(value, len(vocab))
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, event_id):
+        return event_id in self._pos
+
+    def ids(self) -> list[int]:
+        """Ids dels esdeveniments indexats."""
+        with self._lock:
+            return list(self._pos)
+
+    def nbytes(self) -> int:
+        """Memòria ocupada pels vectors i metadades de l'índex."""
+        return sum(segment.nbytes() for segment in self._segments())
+
+    def _segments(self):
+        return [s for s in (self._base, self._delta) if s is not None and s.size]
+
+    def vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ids i vectors float32 de tots els esdeveniments indexats (p.ex. per
+        construir un motor aproximat). Si només hi ha un segment float32 sense
+        files mortes, la matriu es retorna sense copiar-la.
+        """
+        with self._lock:
+            segments = self._segments()
+            if len(segments) == 1 and segments[0].exact is not None and not segments[0].dead:
+                segment = segments[0]
+                return segment.ids[:segment.size], segment.exact[:segment.size]
+            ids, matrices = [np.empty(0, dtype=np.int64)], [np.empty((0, self.dim or 0), dtype=np.float32)]
+            for segment in segments:
+                rows = np.flatnonzero(segment.alive[:segment.size])
+                ids.append(segment.ids[rows])
+                if segment.exact is not None:
+                    matrices.append(np.asarray(segment.exact[rows], dtype=np.float32))
+                else:
+                    matrices.append(quantization.dequantize(segment.codes[rows], segment.scales[rows]))
+            return np.concatenate(ids), np.concatenate(matrices)
+
+    def vectors_for(self, event_ids) -> tuple[list[int], np.ndarray]:
+        """Ids i vectors float32 dels esdeveniments indicats que són a l'índex."""
+        with self._lock:
+            found, rows = [], []
+            for event_id in event_ids:
+                segment, row = self._pos.get(event_id, (None, None))
+                if segment is None:
+                    continue
+                found.append(event_id)
+                if segment.exact is not None:
+                    rows.append(np.asarray(segment.exact[row], dtype=np.float32))
+                else:
+                    rows.append(quantization.dequantize(segment.codes[row:row + 1], segment.scales[row:row + 1])[0])
+            matrix = np.stack(rows) if rows else np.empty((0, self.dim or 0), dtype=np.float32)
+            return found, matrix
+
+    def attach_engine(self, engine):
+        """Fa servir un motor aproximat (o cap, amb None) per a les cerques."""
+        with self._lock:
+            self.engine = engine
+
+    def upsert(self, event_id: int, embedding, scheduled_date=None, category: str | None = None,
+               status: str | None = None) -> bool:
+        """
+        Afegeix o actualitza l'embedding i els atributs d'un esdeveniment.
+        Si l'embedding no és vàlid, l'esdeveniment s'elimina de l'índex.
+        Retorna True si l'esdeveniment queda indexat.
+        """
+        with self._lock:
+            if self.dim is None and embedding is not None and len(embedding):
+                self.dim = len(embedding)
+            v = _valid_vector(embedding, self.dim)
+            if v is None:
+                self.remove(event_id)
+                return False
+
+            if self.engine is not None:
+                self.engine.add(event_id, v)
+            date = scheduled_date.timestamp() if scheduled_date else np.nan
+            attributes = (date, self._code('category', category), self._code('status', status))
+            segment, row = self._pos.get(event_id, (None, None))
+            if segment is not None and segment.growable:
+                # Les files del delta es poden sobreescriure directament
+                segment.put(row, v, *attributes)
+                return True
+            if segment is not None:
+                # Les files del segment base són de només lectura
+                segment.kill(row)
+
+            if self._delta is None:
+                self._delta = _Segment.empty(self.dim, self.dtype, self._capacity)
+            row = self._delta.append(event_id, v, *attributes)
+            self._pos[event_id] = (self._delta, row)
+            return True
+
+    def update_attributes(self, event_id: int, scheduled_date=None, category: str | None = None,
+                          status: str | None = None) -> bool:
+        """
+        Actualitza la data, la categoria i l'estat d'un esdeveniment indexat
+        sense tocar-ne el vector. Retorna False si l'esdeveniment no hi és.
+        """
+        with self._lock:
+            segment, row = self._pos.get(event_id, (None, None))
+            if segment is None:
+                return False
+            date = scheduled_date.timestamp() if scheduled_date else np.nan
+            segment.set_attributes(row, date, self._code('category', category), self._code('status', status))
+            return True
+
+    def remove(self, event_id: int) -> bool:
+        """Elimina un esdeveniment de l'índex marcant la seva fila com a morta."""
+        with self._lock:
+            segment, row = self._pos.pop(event_id, (None, None))
+            if segment is None:
+                return False
+            if self.engine is not None:
+                self.engine.remove(event_id)
+            segment.kill(row)
+            # Compactem el delta quan la meitat de les files són mortes
+            if segment is self._delta and segment.dead * 2 > segment.size:
+                self._delta = segment.compacted()
+                for new_row, moved_id in enumerate(self._delta.ids[:self._delta.size]):
+                    self._pos[int(moved_id)] = (self._delta, new_row)
+            return True
+
+    def search(self, query_vec, k: int = 20, after=None, threshold: float | None = None,
+               category=None, status=None, exact: bool = False,
+               nprobe: int | None = None) -> list[tuple[int, float]]:
+        """
+        Retorna els k esdeveniments més similars a la query.
+
+        Args:
+            query_vec: Vector de la cerca de l'usuari
+            k: Nombre màxim de resultats
+            after: Si s'indica, només es consideren esdeveniments programats després d'aquesta data
+            threshold: Si s'indica, només es retornen resultats amb score > threshold
+            category: Categoria o llista de categories acceptades (None = totes)
+            status: Estat o llista d'estats acceptats (None = tots)
+            exact: Si és True, ignora el motor aproximat i puntua totes les files
+            nprobe: Cel·les que visita el motor aproximat (per defecte, la del motor)
+
+        Returns:
+            Llista de tuples (event_id, score) ordenada per score descendent
+        """
+        return self.search_many([query_vec], k, after, threshold, category, status, exact, nprobe)[0]
+
+    def search_many(self, query_vecs, k: int = 20, after=None, threshold: float | None = None,
+                    category=None, status=None, exact: bool = False,
+                    nprobe: int | None = None) -> list[list[tuple[int, float]]]:
+        """
+        Com search(), però per a diverses queries alhora (un sol producte de matrius
+        per segment). Retorna una llista de resultats per query.
+
+        Els filtres es resolen amb màscares sobre les columnes d'atributs abans
+        de puntuar: si queden poques files elegibles, només es puntuen aquestes,
+        de manera que una cerca filtrada sempre retorna un top-k complet.
+        """
+        if not len(query_vecs) or self.dim is None:
+            return [[] for _ in query_vecs]
+        queries = []
+        for vec in query_vecs:
+            # Les queries buides o de dimensió incorrecta no puntuen res
+            vec = _valid_vector(vec, self.dim)
+            queries.append(np.zeros(self.dim, dtype=np.float32) if vec is None else vec)
+        queries = np.stack(queries)
+
+        results = [[] for _ in query_vecs]
+        with self._lock:
+            filters = self._filters(after, category, status)
+            if self.engine is not None and not exact:
+                # Cada query té els seus candidats: es puntuen per separat
+                for query, result in zip(queries, results):
+                    for segment, rows in self._probe(query, k, filters, nprobe):
+                        result.extend(self._rank(segment, query[None], k, threshold, rows=rows)[0])
+            else:
+                for segment in self._segments():
+                    mask = self._eligible(segment, filters)
+                    if filters and mask.sum() < SUBSET_FRACTION * segment.size:
+                        ranked = self._rank(segment, queries, k, threshold, rows=np.flatnonzero(mask))
+                    else:
+                        ranked = self._rank(segment, queries, k, threshold, mask=mask)
+                    for result, found in zip(results, ranked):
+                        result.extend(found)
+
+        # Fusionem els resultats dels segments
+        return [heapq.nlargest(k, result, key=lambda item: item[1]) for result in results]
+
+    def _filters(self, after, category, status) -> list[tuple[str, object]]:
+        """Tradueix els filtres de la cerca a condicions sobre les columnes del segment."""
+        filters = []
+        if after is not None:
+            filters.append(('dates', after.timestamp()))
+        for attribute, values in (('category', category), ('status', status)):
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            # Els valors que l'índex no ha vist mai no tenen cap fila
+            codes = [self._vocab[attribute][v] for v in values if v in self._vocab[attribute]]
+            filters.append((ATTRIBUTES[attribute], np.array(codes, dtype=np.int16)))
+        return filters
+
+    def _eligible(self, segment: _Segment, filters, rows: np.ndarray | None = None) -> np.ndarray:
+        """Màscara de les files vives que compleixen els filtres (totes o les indicades)."""
+        select = slice(None, segment.size) if rows is None else rows
+        mask = segment.alive[select]
+        for column, value in filters:
+            if column == 'dates':
+                # Les dates desconegudes (NaN) queden excloses automàticament
+                mask = mask & (segment.dates[select] > value)
+            else:
+                mask = mask & np.isin(getattr(segment, column)[select], value)
+        return mask
+
+    def _probe(self, query: np.ndarray, k: int, filters, nprobe: int | None):
+        """
+        Files candidates del motor aproximat que compleixen els filtres. Si
+        n'hi ha menys de k, es dobla nprobe fins a tenir-ne prou o visitar
+        totes les cel·les.
+        """
+        nprobe = nprobe or self.engine.nprobe
+        while True:
+            groups = []
+            for segment, rows in self._candidate_rows(self.engine.probe(query, nprobe)):
+                rows = rows[self._eligible(segment, filters, rows)]
+                if len(rows):
+                    groups.append((segment, rows))
+            if not filters or nprobe >= self.engine.nlist or sum(len(r) for _, r in groups) >= k:
+                return groups
+            nprobe *= 2
+
+    def _candidate_rows(self, candidate_ids) -> list[tuple[_Segment, np.ndarray]]:
+        """Agrupa per segment les files dels ids candidats (descartant els ids eliminats)."""
+        grouped = {}
+        for event_id in candidate_ids.tolist():
+            segment, row = self._pos.get(event_id, (None, None))
+            if segment is not None:
+                grouped.setdefault(id(segment), (segment, []))[1].append(row)
+        return [(segment, np.array(sorted(rows))) for segment, rows in grouped.values()]
+
+    def _rank(self, segment: _Segment, queries: np.ndarray, k: int, threshold,
+              mask: np.ndarray | None = None, rows: np.ndarray | None = None) -> list[list[tuple[int, float]]]:
+        """
+        Top-k de les queries dins d'un segment: sobre totes les files (amb una
+        màscara d'elegibles) o només sobre les files indicades, que ja han de
+        ser elegibles. Retorna, per query, tuples (event_id, score).
+        """
+        n = segment.size
+        if rows is None:
+            codes, scales = segment.codes[:n], segment.scales[:n]
+        else:
+            codes, scales = segment.codes[rows], segment.scales[rows]
+        exact = segment.exact if segment.dtype != 'float32' and self.rescore_factor > 0 else None
+        candidates = k * self.rescore_factor if exact is not None else k
+        ranked = select_top_k(quantization.scores(codes, scales, queries), candidates,
+                              threshold=None if exact is not None else threshold, mask=mask)
+        results = []
+        for query, found in zip(queries, ranked):
+            found = [(int(r if rows is None else rows[r]), score) for r, score in found]
+            if exact is not None and found:
+                # Tornem a puntuar els candidats amb els vectors float32 originals
+                cand = np.array([row for row, _ in found])
+                rescored = np.asarray(exact[cand], dtype=np.float32) @ query
+                found = [(int(row), float(score)) for row, score in zip(cand, rescored)
+                         if threshold is None or score > threshold]
+            # Traduïm les files a ids abans que una escriptura les pugui moure
+            results.append([(int(segment.ids[row]), score) for row, score in found])
+        return results
+
+
+def build_index(engine: str | None = None) -> EventVectorIndex:
+    """
+    Construeix l'índex. Si hi ha un snapshot en disc del model actual, l'obre
+    amb memmap i només llegeix de la base de dades els esdeveniments
+    modificats després del snapshot; si no, llegeix tots els embeddings.
+    Només s'indexen vectors del model actiu, sigui quin sigui el slot on són.
+
+    Amb el motor 'ivf' (per defecte, el de SEMANTIC_SEARCH_ENGINE) s'hi
+    associa l'índex IVF desat amb build_ann_index, o se'n construeix un.
+    """
+    from django.conf import settings
+    from django.db.models import Q
+
+    from events.models import Event
+    from events.sync import IndexSync
+    from . import ann
+    from .embeddings import model_name
+    from .snapshot import load_snapshot
+
+    engine = engine or ann.engine_name()
+    name = model_name()
+    # Abans de llegir res: el que s'escrigui mentre es construeix arriba amb la primera sincronització
+    sync = IndexSync(SYNC_FIELDS)
+    dtype = quantization.storage_dtype()
+    rescore_factor = getattr(settings, "SEMANTIC_SEARCH_RESCORE_FACTOR", 4)
+    snapshot = load_snapshot()
+    if snapshot is not None and snapshot.model == name:
+        index = EventVectorIndex.from_arrays(
+            snapshot.matrix, snapshot.ids, snapshot.dates, dtype=dtype, rescore_factor=rescore_factor,
+            categories=snapshot.categories, statuses=snapshot.statuses,
+        )
+        # El motor s'associa abans de llegir el delta perquè hi reassigni els vectors modificats
+        if engine == 'ivf':
+            index.attach_engine(ann.load_engine(index, name))
+        # Els esdeveniments esborrats després del snapshot no surten al delta: es treuen comparant ids
+        existing = np.fromiter(Event.objects.values_list('id', flat=True).iterator(), dtype=np.int64)
+        for event_id in np.setdiff1d(snapshot.ids, existing, assume_unique=True).tolist():
+            index.remove(event_id)
+        rows = Event.objects.with_embeddings().filter(
+            Q(updated_at__gt=snapshot.created_at) | Q(embedding_updated_at__gt=snapshot.created_at)
+            | Q(alt_embedding_updated_at__gt=snapshot.created_at)
+        )
+    else:
+        index = EventVectorIndex(dtype=dtype, rescore_factor=rescore_factor)
+        rows = Event.objects.with_embeddings()
+    index.model = name
+    _apply_rows(index, rows)
+
+    if engine == 'ivf' and index.engine is None and index.dim is not None:
+        index.attach_engine(ann.load_engine(index, name))
+    index.sync = sync
+    return index
+
+
+def _apply_rows(index: EventVectorIndex, rows, since=None) -> int:
+    """
+    Indexa (o treu, si no tenen vector del model de l'índex) les files d'un
+    queryset. Amb since, de les ja indexades que no tenen cap vector escrit
+    després només s'actualitzen els atributs: un canvi d'estat (p.ex. de
+    update_event_status) no mou la fila del segment base al delta.
+    """
+    from .slots import SLOT_FIELDS, SLOTS, vector_for
+
+    count = 0
+    # values() evita hidratar objectes Event complets
+    for row in rows.with_embeddings().values('id', 'scheduled_date', 'category', 'status', *SLOT_FIELDS):
+        attributes = (row['scheduled_date'], row['category'], row['status'])
+        count += 1
+        if since is not None and row['id'] in index and not any(
+            row[fields['updated_at']] and row[fields['updated_at']] > since for fields in SLOTS.values()
+        ):
+            index.update_attributes(row['id'], *attributes)
+            continue
+        # Els vectors d'un altre model són d'un altre espai: no es poden comparar
+        vec = vector_for(row, index.model)
+        if vec is not None:
+            index.upsert(row['id'], vec, *attributes)
+        else:
+            index.remove(row['id'])
+    return count
+
+
+def sync_index(index: EventVectorIndex, force: bool = False) -> int:
+    """
+    Aplica a l'índex els embeddings i atributs (data, categoria i estat, dels
+    quals surten els filtres) escrits per altres processos (vegeu
+    events.sync.IndexSync) i, si n'hi havia, invalida els rànquings en
+    cache. Retorna el nombre d'esdeveniments modificats o esborrats.
+    """
+    from .result_cache import bump_index_version
+
+    if index.sync is None:
+        return 0
+    count = index.sync.run(
+        lambda rows, since: _apply_rows(index, rows, since), index.ids, index.remove, force=force
+    )
+    if count:
+        bump_index_version()
+    return count
+
+
+def get_index() -> EventVectorIndex:
+    """
+    Retorna l'índex global del procés, carregant-lo de forma lazy i thread-safe.
+    Si el model actiu ha canviat, es torna a construir amb els vectors del nou;
+    si no, cada EVENTS_INDEX_SYNC_INTERVAL segons es posa al dia amb les
+    escriptures d'altres processos.
+    """
+    from .embeddings import model_name
+
+    global _index
+    if _index is None or _index.model != model_name():
+        with _lock:
+            if _index is None or _index.model != model_name():
+                _index = build_index()
+    else:
+        sync_index(_index)
+    return _index
+
+
+def get_loaded_index() -> EventVectorIndex | None:
+    """Retorna l'índex global només si ja s'ha carregat (no força la càrrega)."""
+    return _index
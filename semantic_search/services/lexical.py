@@ -0,0 +1,214 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+from events.text import fold
+from .text import build_text
+
+# Lock per garantir que només un thread construeixi l'índex a la vegada
+_lock = threading.Lock()
+# Índex lèxic global del procés (es carrega una sola vegada)
+_index = None
+
+# Paraules massa freqüents en català i castellà per aportar res a la cerca
+STOPWORDS = frozenset("""
+a al als amb de del dels el els en es i la les per que un una uns unes o no hi ho
+ca se su sus lo los las y con por para como mas pero sin sobre entre
+the and of to in for on with
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Tokens d'un text (normalitzats amb fold) sense paraules buides ni lletres
+    soltes dels apòstrofs (l', d', s'...).
+    """
+    return [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+class LexicalIndex:
+    """
+    Índex invertit en memòria amb puntuació BM25 sobre el mateix text que
+    s'utilitza per generar els embeddings (build_text).
+
+    Per a cada terme es guarda un diccionari id → freqüència, i per a cada
+    esdeveniment la seva llargada i els atributs filtrables (data programada,
+    categoria i estat), de manera que una cerca no necessita la base de dades.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        # Termes, llargada i atributs de cada esdeveniment indexat
+        self._terms = {}
+        self._lengths = {}
+        self._attributes = {}
+        self._total_length = 0
+        # Sincronització amb les escriptures d'altres processos (la fixa build_lexical_index)
+        self.sync = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, event_id):
+        return event_id in self._lengths
+
+    def ids(self) -> list[int]:
+        """Ids dels esdeveniments indexats."""
+        with self._lock:
+            return list(self._lengths)
+
+    def upsert(self, event_id: int, text: str, scheduled_date=None, category: str | None = None,
+               status: str | None = None):
+        """Afegeix o substitueix el text i els atributs d'un esdeveniment."""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self.remove(event_id)
+            if not counts:
+                return
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[event_id] = tf
+            length = sum(counts.values())
+            self._terms[event_id] = list(counts)
+            self._lengths[event_id] = length
+            self._total_length += length
+            self._attributes[event_id] = (scheduled_date, category, status)
+
+    def update_attributes(self, event_id: int, scheduled_date=None, category: str | None = None,
+                          status: str | None = None) -> bool:
+        """Actualitza els atributs d'un esdeveniment sense tornar a tokenitzar-ne el text."""
+        with self._lock:
+            if event_id not in self._attributes:
+                return False
+            self._attributes[event_id] = (scheduled_date, category, status)
+            return True
+
+    def remove(self, event_id: int) -> bool:
+        """Elimina un esdeveniment de l'índex."""
+        with self._lock:
+            terms = self._terms.pop(event_id, None)
+            if terms is None:
+                return False
+            for term in terms:
+                posting = self._postings[term]
+                del posting[event_id]
+                if not posting:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(event_id)
+            del self._attributes[event_id]
+            return True
+
+    def search(self, query: str, k: int = 20, after=None, category=None,
+               status=None) -> list[tuple[int, float]]:
+        """
+        Retorna els k esdeveniments amb més puntuació BM25 per a la query.
+
+        Args:
+            query: Text de la cerca
+            k: Nombre màxim de resultats
+            after: Si s'indica, només es consideren esdeveniments programats després d'aquesta data
+            category: Categoria o llista de categories acceptades (None = totes)
+            status: Estat o llista d'estats acceptats (None = tots)
+
+        Returns:
+            Llista de tuples (event_id, score) ordenada per score descendent
+        """
+        terms = set(tokenize(query))
+        if isinstance(category, str):
+            category = [category]
+        if isinstance(status, str):
+            status = [status]
+        with self._lock:
+            n = len(self._lengths)
+            if not terms or not n:
+                return []
+            avg_length = self._total_length / n
+            scores = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for event_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[event_id] / avg_length)
+                    scores[event_id] = scores.get(event_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if after is not None or category is not None or status is not None:
+                attributes = self._attributes
+                scores = {
+                    event_id: score for event_id, score in scores.items()
+                    if self._accepts(attributes[event_id], after, category, status)
+                }
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    @staticmethod
+    def _accepts(attributes, after, category, status) -> bool:
+        scheduled_date, event_category, event_status = attributes
+        if after is not None and (scheduled_date is None or scheduled_date <= after):
+            return False
+        if category is not None and event_category not in category:
+            return False
+        if status is not None and event_status not in status:
+            return False
+        return True
+
+
+def build_lexical_index() -> LexicalIndex:
+    """Construeix l'índex lèxic amb el text de tots els esdeveniments."""
+    from events.models import Event
+    from events.sync import IndexSync
+
+    index = LexicalIndex()
+    # Abans de llegir res: el que s'escrigui mentre es construeix arriba amb la primera sincronització
+    sync = IndexSync()
+    _apply_rows(index, Event.objects.all())
+    index.sync = sync
+    return index
+
+
+def _apply_rows(index: LexicalIndex, rows) -> int:
+    """Indexa el text i els atributs de les files d'un queryset."""
+    count = 0
+    # values_list evita hidratar objectes Event complets (i llegir els embeddings)
+    rows = rows.values_list('id', 'title', 'description', 'category', 'tags', 'scheduled_date', 'status')
+    for event_id, title, description, category, tags, scheduled_date, status in rows:
+        index.upsert(event_id, build_text(title, description, category, tags), scheduled_date, category, status)
+        count += 1
+    return count
+
+
+def sync_lexical_index(index: LexicalIndex, force: bool = False) -> int:
+    """
+    Aplica a l'índex els textos i atributs escrits per altres processos
+    (vegeu events.sync.IndexSync). Retorna el nombre d'esdeveniments
+    modificats o esborrats.
+    """
+    if index.sync is None:
+        return 0
+    return index.sync.run(lambda rows, since: _apply_rows(index, rows), index.ids, index.remove, force=force)
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Retorna l'índex lèxic global del procés, carregant-lo de forma lazy i
+    thread-safe, i el posa al dia cada EVENTS_INDEX_SYNC_INTERVAL segons.
+    """
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = build_lexical_index()
+    else:
+        sync_lexical_index(_index)
+    return _index
+
+
+def get_loaded_lexical_index() -> LexicalIndex | None:
+    """Retorna l'índex lèxic global només si ja s'ha carregat (no força la càrrega)."""
+    return _index
@@ -0,0 +1,61 @@
+from .embeddings import model_name, reset_model_name
+from .result_cache import bump_index_version
+from .slots import SLOTS, missing_query
+from .text import doc_text
+
+
+def model_coverage(collection) -> dict:
+    """
+    Esdeveniments amb vector de cada model (a qualsevol dels dos slots), amb
+    una sola agregació.
+
+    Returns:
+        Diccionari amb el total d'esdeveniments (total) i el recompte per model (models)
+    """
+    model_fields = [f"${fields['model']}" for fields in SLOTS.values()]
+    pipeline = [
+        {'$facet': {
+            'total': [{'$count': 'n'}],
+            'models': [
+                # $setUnion evita comptar dues vegades un model repetit als dos slots
+                {'$project': {'models': {'$setUnion': [model_fields]}}},
+                {'$unwind': '$models'},
+                {'$match': {'models': {'$ne': None}}},
+                {'$group': {'_id': '$models', 'count': {'$sum': 1}}},
+            ],
+        }},
+    ]
+    result = next(collection.aggregate(pipeline))
+    return {
+        'total': result['total'][0]['n'] if result['total'] else 0,
+        'models': {row['_id']: row['count'] for row in result['models']},
+    }
+
+
+def uncovered_ids(collection, model: str) -> list:
+    """
+    Ids dels esdeveniments que encara no tenen vector del model. Els que no
+    tenen text no en poden tenir i no es compten.
+    """
+    docs = collection.find(missing_query(model), ('id', 'title', 'description', 'category', 'tags'))
+    return [doc.get('id') for doc in docs if doc_text(doc)]
+
+
+def activate_model(name: str) -> str | None:
+    """
+    Fa actiu un model amb una sola escriptura. Les cerques passen als vectors
+    del model nou (en aquest procés de seguida i als altres en menys de
+    SEMANTIC_SEARCH_MODEL_CHECK_INTERVAL segons); fins llavors continuen
+    fent servir els del model anterior, que no s'esborren.
+
+    Returns:
+        Nom del model que era actiu
+    """
+    from ..models import EmbeddingModelState
+
+    previous = model_name()
+    EmbeddingModelState.objects.update_or_create(pk=1, defaults={'active': name, 'previous': previous})
+    reset_model_name()
+    # Els rànquings en cache són del model anterior
+    bump_index_version()
+    return previous
@@ -0,0 +1,155 @@
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+# Queries que es puntuen juntes (cada lot crea una matriu de scores lots x esdeveniments)
+BATCH_SIZE = 64
+# Esdeveniments que es calculen i es desen en cada bloc en recalcular-ho tot
+CHUNK = 1000
+
+
+def neighbour_count() -> int:
+    """Veïns que es guarden per esdeveniment (SEMANTIC_SEARCH_NEIGHBOURS)."""
+    return getattr(settings, "SEMANTIC_SEARCH_NEIGHBOURS", 6)
+
+
+def nearest_neighbours(index, event_ids, n: int | None = None, now=None) -> dict[int, list[int]]:
+    """
+    Calcula els n veïns més similars de cada esdeveniment, restringits als
+    esdeveniments en directe o programats a partir d'ara.
+
+    Els vectors es llegeixen de l'índex i es puntuen per lots amb
+    search_many: una passada per als esdeveniments en directe i una altra
+    per als programats futurs (els filtres s'apliquen dins de l'índex), i
+    es fusionen. Els esdeveniments que no són a l'índex no tenen entrada.
+
+    Returns:
+        Diccionari {event_id: [ids dels veïns ordenats per similitud]}
+    """
+    n = n or neighbour_count()
+    now = now or timezone.now()
+    found, matrix = index.vectors_for(list(event_ids))
+    lists = {}
+    for start in range(0, len(found), BATCH_SIZE):
+        batch, queries = found[start:start + BATCH_SIZE], matrix[start:start + BATCH_SIZE]
+        # n + 1 perquè l'esdeveniment mateix pot ser entre els candidats
+        live = index.search_many(queries, k=n + 1, status='live')
+        upcoming = index.search_many(queries, k=n + 1, status='scheduled', after=now)
+        for event_id, a, b in zip(batch, live, upcoming):
+            candidates = [item for item in a + b if item[0] != event_id]
+            lists[event_id] = [neighbour for neighbour, _ in heapq.nlargest(n, candidates, key=lambda item: item[1])]
+    return lists
+
+
+def store_neighbours(event_ids, lists: dict[int, list[int]]) -> int:
+    """
+    Substitueix les llistes de veïns dels esdeveniments indicats. Els que no
+    tenen llista (p.ex. sense embedding) queden sense entrada.
+    """
+    from ..models import EventNeighbours
+    from .embeddings import model_name
+
+    event_ids = list(event_ids)
+    rows = []
+    for event_id in event_ids:
+        if event_id in lists:
+            row = EventNeighbours(event_id=event_id, embedding_model=model_name())
+            row.ids = lists[event_id]
+            rows.append(row)
+    with transaction.atomic():
+        EventNeighbours.objects.filter(pk__in=event_ids).delete()
+        EventNeighbours.objects.bulk_create(rows)
+    return len(rows)
+
+
+def build_neighbours(index, n: int | None = None, report=None) -> tuple[int, int]:
+    """
+    Recalcula els veïns de tots els esdeveniments de l'índex, per blocs de
+    CHUNK, i elimina les llistes dels que ja no hi són (sense embedding).
+
+    Args:
+        index: Índex amb els vectors del model actiu
+        n: Veïns per esdeveniment (per defecte SEMANTIC_SEARCH_NEIGHBOURS)
+        report: Funció opcional que rep (fets, total) després de cada bloc
+
+    Returns:
+        Tupla (llistes desades, llistes eliminades)
+    """
+    from ..models import EventNeighbours
+
+    n = n or neighbour_count()
+    ids, _ = index.vectors()
+    ids = [int(event_id) for event_id in ids]
+    stored = 0
+    for offset in range(0, len(ids), CHUNK):
+        chunk = ids[offset:offset + CHUNK]
+        stored += store_neighbours(chunk, nearest_neighbours(index, chunk, n))
+        if report is not None:
+            report(min(offset + CHUNK, len(ids)), len(ids))
+
+    # Esdeveniments que ja no tenen embedding
+    indexed = set(ids)
+    orphans = [pk for pk in EventNeighbours.objects.values_list('pk', flat=True) if pk not in indexed]
+    if orphans:
+        EventNeighbours.objects.filter(pk__in=orphans).delete()
+    return stored, len(orphans)
+
+
+def refresh_neighbours(event_ids, index=None) -> int:
+    """
+    Actualitza els veïns després que canviïn els embeddings dels esdeveniments
+    indicats, sense recalcular-ho tot.
+
+    A més de les llistes dels esdeveniments canviats, es recalculen les dels
+    esdeveniments que els podrien tenir (o haver tingut) com a veïns: els
+    seus veïns antics i els més similars al vector nou, sense filtres. Com la
+    similitud és simètrica, són els únics les llistes dels quals poden variar
+    de manera apreciable; la resta es corregeix a la propera execució de
+    build_event_neighbours.
+
+    Sense índex, es fa servir el global del procés (get_index), que es
+    construeix si encara no s'havia carregat.
+
+    Returns:
+        Nombre de llistes recalculades
+    """
+    from ..models import EventNeighbours
+    from .index import get_index
+
+    index = index if index is not None else get_index()
+    n = neighbour_count()
+    event_ids = set(event_ids)
+    affected = set(event_ids)
+    for row in EventNeighbours.objects.filter(pk__in=list(event_ids)):
+        affected.update(row.ids)
+    found, matrix = index.vectors_for(list(event_ids))
+    if found:
+        for result in index.search_many(matrix, k=n + 1):
+            affected.update(neighbour for neighbour, _ in result)
+
+    affected = sorted(affected)
+    store_neighbours(affected, nearest_neighbours(index, affected, n))
+    return len(affected)
+
+
+def similar_events(event, limit: int | None = None) -> list:
+    """
+    Esdeveniments similars a un esdeveniment per a la pàgina de detall, a
+    partir de la llista precalculada (una consulta per la llista i una altra,
+    en bloc, pels esdeveniments). Es descarten els que ja no són en directe o
+    programats, per si la llista s'ha calculat abans que canviessin.
+    """
+    from events.models import Event
+    from ..models import EventNeighbours
+
+    row = EventNeighbours.objects.filter(pk=event.pk).first()
+    if row is None:
+        return []
+    ids = row.ids[:limit or neighbour_count()]
+    events = Event.objects.in_bulk(ids)
+    return [
+        events[event_id] for event_id in ids
+        if event_id in events and (events[event_id].status == 'live' or events[event_id].is_upcoming)
+    ]
@@ -0,0 +1,108 @@
+import struct
+
+import numpy as np
+from django.conf import settings
+
+# Tipus d'emmagatzematge suportats i el seu codi dins del blob binari
+DTYPES = {'float32': 0, 'float16': 1, 'int8': 2}
+_CODES = {code: name for name, code in DTYPES.items()}
+# Capçalera del blob: codi del tipus (1 byte) + escala float32 (4 bytes)
+_HEADER = struct.Struct('<Bf')
+# Files que es desquantitzen alhora en puntuar (limita la memòria temporal)
+CHUNK_ROWS = 65536
+
+
+def storage_dtype() -> str:
+    """Tipus amb què es guarden i s'indexen els embeddings (settings)."""
+    dtype = getattr(settings, "SEMANTIC_SEARCH_EMBEDDING_DTYPE", "float32")
+    if dtype not in DTYPES:
+        raise ValueError(f"SEMANTIC_SEARCH_EMBEDDING_DTYPE no vàlid: {dtype!r}")
+    return dtype
+
+
+def quantize(matrix, dtype: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantitza una matriu (n, d) o un vector (d,) float32.
+
+    float16 només redueix la precisió; int8 fa servir una escala per vector
+    (max |x| / 127), de manera que cada fila es recupera com codes * scale.
+    Les matrius grans (p.ex. un memmap) es processen per blocs.
+
+    Returns:
+        Tupla (codes, scales) amb scales de forma (n,) o escalar
+    """
+    x = np.asarray(matrix, dtype=np.float32)
+    if dtype == 'float32':
+        return x, np.ones(x.shape[:-1], dtype=np.float32)
+    if x.ndim == 2 and x.shape[0] > CHUNK_ROWS:
+        codes = np.empty(x.shape, dtype=np.float16 if dtype == 'float16' else np.int8)
+        scales = np.empty(x.shape[0], dtype=np.float32)
+        for start in range(0, x.shape[0], CHUNK_ROWS):
+            end = start + CHUNK_ROWS
+            codes[start:end], scales[start:end] = quantize(x[start:end], dtype)
+        return codes, scales
+    if dtype == 'float16':
+        return x.astype(np.float16), np.ones(x.shape[:-1], dtype=np.float32)
+    scales = np.abs(x).max(axis=-1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.rint(x / scales[..., None]).clip(-127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes, scales) -> np.ndarray:
+    """Recupera els vectors float32 a partir de (codes, scales)."""
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def scores(codes, scales, queries: np.ndarray) -> np.ndarray:
+    """
+    Puntua queries float32 (m, d) contra una matriu quantitzada (n, d).
+
+    La matriu es desquantitza per blocs de CHUNK_ROWS files, de manera que
+    mai existeix una còpia float32 sencera en memòria.
+
+    Returns:
+        Matriu de scores (m, n)
+    """
+    if codes.dtype == np.float32:
+        return queries @ codes.T
+    n = codes.shape[0]
+    out = np.empty((queries.shape[0], n), dtype=np.float32)
+    for start in range(0, n, CHUNK_ROWS):
+        block = codes[start:start + CHUNK_ROWS].astype(np.float32)
+        out[:, start:start + CHUNK_ROWS] = (queries @ block.T) * scales[start:start + CHUNK_ROWS]
+    return out
+
+
+def pack(vec, dtype: str) -> bytes:
+    """Serialitza un embedding en un blob binari compacte del tipus indicat."""
+    codes, scale = quantize(vec, dtype)
+    return _HEADER.pack(DTYPES[dtype], float(scale)) + codes.tobytes()
+
+
+def unpack(blob: bytes) -> np.ndarray:
+    """Recupera un embedding float32 a partir d'un blob creat amb pack()."""
+    code, scale = _HEADER.unpack_from(blob)
+    dtype = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}[_CODES[code]]
+    codes = np.frombuffer(blob, dtype=dtype, offset=_HEADER.size)
+    return codes.astype(np.float32) * scale
+
+
+def stored_vector(embedding, blob) -> np.ndarray | None:
+    """Embedding guardat d'un esdeveniment, sigui com a llista JSON o com a blob."""
+    if blob:
+        return unpack(bytes(blob))
+    if embedding and isinstance(embedding, list):
+        return np.asarray(embedding, dtype=np.float32)
+    return None
+
+
+def embedding_fields(vec) -> dict:
+    """
+    Valors dels camps d'embedding a desar segons el tipus d'emmagatzematge:
+    una llista JSON per a float32 o un blob binari per a float16/int8.
+    """
+    dtype = storage_dtype()
+    if dtype == 'float32':
+        return {'embedding': np.asarray(vec, dtype=np.float32).tolist(), 'embedding_blob': None}
+    return {'embedding': None, 'embedding_blob': pack(vec, dtype)}
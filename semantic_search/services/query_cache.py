@@ -0,0 +1,207 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .embeddings import amodel_name, embed_text, model_name
+
+# Lock per crear la cache global una sola vegada
+_lock = threading.Lock()
+# Cache global del procés
+_cache = None
+
+
+def normalize_query(text: str) -> str:
+    """
+    Clau de cache d'una query: espais col·lapsats. Les majúscules es
+    conserven perquè el tokenitzador del model les distingeix ("Jazz" i "jazz"
+    donen vectors diferents); el model sempre rep el text original.
+    """
+    return " ".join((text or "").split())
+
+
+class QueryEmbeddingCache:
+    """
+    Cache LRU acotada d'embeddings de queries, amb caducitat (TTL).
+
+    Les claus són (query normalitzada, nom del model), de manera que canviar
+    de model no retorna vectors d'un altre espai. Opcionalment es pot indicar
+    un backend compartit (una cache de Django, p.ex. Redis o Memcached) perquè
+    diversos processos reutilitzin els vectors calculats pels altres.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float | None = 3600, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def _shared_key(key: tuple[str, str]) -> str:
+        # Hash per respectar les restriccions de claus de Memcached
+        digest = hashlib.sha1("\x00".join(key).encode("utf-8")).hexdigest()
+        return f"semantic_search:qvec:{digest}"
+
+    def get(self, key: tuple[str, str]) -> np.ndarray | None:
+        """Retorna el vector guardat per a la clau o None si no hi és o ha caducat."""
+        vec = self._get_local(key)
+        if vec is None and self.backend is not None:
+            vec = self._shared_hit(key, self.backend.get(self._shared_key(key)))
+        if vec is None:
+            with self._lock:
+                self.misses += 1
+        return vec
+
+    async def aget(self, key: tuple[str, str]) -> np.ndarray | None:
+        """Versió asíncrona de get(): el backend compartit (xarxa) es consulta amb aget()."""
+        vec = self._get_local(key)
+        if vec is None and self.backend is not None:
+            vec = self._shared_hit(key, await self.backend.aget(self._shared_key(key)))
+        if vec is None:
+            with self._lock:
+                self.misses += 1
+        return vec
+
+    def _get_local(self, key: tuple[str, str]) -> np.ndarray | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, vec = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    # Marquem l'entrada com la més recent (LRU)
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return vec
+                del self._data[key]
+        return None
+
+    def _shared_hit(self, key: tuple[str, str], raw) -> np.ndarray | None:
+        """Desa a la cache local un vector llegit del backend compartit."""
+        if raw is None:
+            return None
+        vec = np.frombuffer(raw, dtype=np.float32)
+        self._store(key, vec)
+        with self._lock:
+            self.shared_hits += 1
+        return vec
+
+    def _store(self, key: tuple[str, str], vec: np.ndarray):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, vec)
+            self._data.move_to_end(key)
+            # Eliminem les entrades menys usades si superem la mida màxima
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key: tuple[str, str], vec) -> np.ndarray:
+        """Guarda un vector a la cache local i, si n'hi ha, a la compartida."""
+        vec = np.asarray(vec, dtype=np.float32)
+        vec.flags.writeable = False
+        self._store(key, vec)
+        if self.backend is not None:
+            self.backend.set(self._shared_key(key), vec.tobytes(), timeout=self.ttl)
+        return vec
+
+    async def aset(self, key: tuple[str, str], vec) -> np.ndarray:
+        """Versió asíncrona de set(): el backend compartit s'escriu amb aset()."""
+        vec = np.asarray(vec, dtype=np.float32)
+        vec.flags.writeable = False
+        self._store(key, vec)
+        if self.backend is not None:
+            await self.backend.aset(self._shared_key(key), vec.tobytes(), timeout=self.ttl)
+        return vec
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Comptadors d'encerts i errors de la cache."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Retorna la cache global del procés, configurada des dels settings."""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                backend = None
+                alias = getattr(settings, "SEMANTIC_SEARCH_QUERY_CACHE_BACKEND", None)
+                if alias:
+                    from django.core.cache import caches
+                    backend = caches[alias]
+                _cache = QueryEmbeddingCache(
+                    maxsize=getattr(settings, "SEMANTIC_SEARCH_QUERY_CACHE_SIZE", 2048),
+                    ttl=getattr(settings, "SEMANTIC_SEARCH_QUERY_CACHE_TTL", 3600),
+                    backend=backend,
+                )
+    return _cache
+
+
+def embed_query(text: str):
+    """
+    Converteix una query de cerca en vector, reutilitzant els vectors ja calculats.
+
+    Returns:
+        Vector float32 normalitzat (només lectura) o llista buida si la query és buida
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    cache = get_query_cache()
+    key = (normalize_query(text), model_name())
+    vec = cache.get(key)
+    if vec is None:
+        if _batching():
+            # Les queries concurrents es codifiquen juntes en una sola crida al model
+            from .batcher import get_batcher
+            vec = get_batcher().embed(text)
+        else:
+            vec = embed_text(text)
+        vec = cache.set(key, vec)
+    return vec
+
+
+async def aembed_query(text: str):
+    """Versió asíncrona de embed_query() (no bloqueja el bucle d'esdeveniments)."""
+    text = (text or "").strip()
+    if not text:
+        return []
+    cache = get_query_cache()
+    # model_name() pot llegir l'ORM, que no es pot cridar des del bucle
+    key = (normalize_query(text), await amodel_name())
+    # Amb un backend compartit, get() i set() farien E/S de xarxa des del bucle
+    vec = await cache.aget(key)
+    if vec is None:
+        if _batching():
+            from .batcher import get_batcher
+            vec = await get_batcher().aembed(text)
+        else:
+            from asgiref.sync import sync_to_async
+            vec = await sync_to_async(embed_text, thread_sensitive=False)(text)
+        vec = await cache.aset(key, vec)
+    return vec
+
+
+def _batching() -> bool:
+    """Si les queries s'agrupen en micro-lots (SEMANTIC_SEARCH_BATCH_WINDOW_MS > 0)."""
+    return getattr(settings, "SEMANTIC_SEARCH_BATCH_WINDOW_MS", 5) > 0
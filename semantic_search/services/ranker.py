@@ -1,46 +1,41 @@
 import numpy as np
 
-def cosine_top_k(query_vec: list[float], items: list[tuple[object, list[float]]], k: int = 20):
+# Score mínim per considerar un resultat rellevant (20% de similitud)
+MIN_SCORE = 0.2
+
+
+def select_top_k(scores: np.ndarray, k: int = 20, threshold: float | None = None,
+                 mask: np.ndarray | None = None) -> list[list[tuple[int, float]]]:
     """
-    Calcula la similitud cosinus entre el vector de la query i una llista d'ítems,
-    retornant els k elements més similars.
-    
-    Args:
-        query_vec: Vector de la cerca de l'usuari
-        items: Llista de tuples (objecte_esdeveniment, embedding)
-        k: Nombre màxim de resultats a retornar (per defecte 20)
-        
+    Selecciona les k columnes amb més score de cada fila d'una matriu de
+    scores (m, n) ja calculada, amb argpartition (sense ordenar-ho tot).
+    La matriu es modifica in situ.
+
     Returns:
-        Llista de tuples (objecte, score) ordenada per score descendent
+        Una llista de tuples (columna, score) per fila, ordenades per score descendent
     """
-    # Si no hi ha vector de query, no podem fer res
-    if not query_vec:
-        return []
-
-    # Convertim el vector de query a numpy array
-    q = np.array(query_vec, dtype=np.float32)
-    # Si el vector té norma 0 (vector buit), no podem calcular similitud
-    if np.linalg.norm(q) == 0:
-        return []
+    n = scores.shape[1]
+    if n == 0 or k <= 0:
+        return [[] for _ in range(scores.shape[0])]
+    if mask is not None:
+        scores[:, ~mask] = -np.inf
+    if threshold is not None:
+        scores[scores <= threshold] = -np.inf
 
-    # Llista per emmagatzemar els resultats amb els seus scores
-    scored = []
-    # Recorrem cada esdeveniment amb el seu embedding
-    for obj, emb in items:
-        # Si l'embedding està buit, el saltem
-        if not emb:
-            continue
-        # Convertim l'embedding a numpy array
-        v = np.array(emb, dtype=np.float32)
-        # Comprovem que els vectors tenen la mateixa dimensió i no són buits
-        if v.shape != q.shape or np.linalg.norm(v) == 0:
-            continue
-        # Calculem el producte escalar (com els vectors estan normalitzats, això és la similitud cosinus)
-        score = float(np.dot(q, v))
-        # Afegim l'esdeveniment i el seu score a la llista
-        scored.append((obj, score))
+    kk = min(k, n)
+    if kk < n:
+        # Selecció parcial: els kk millors de cada fila, sense ordenar
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    # Només ordenem els kk seleccionats
+    order = np.argsort(-part_scores, axis=1)
+    rows = np.take_along_axis(part, order, axis=1)
+    top = np.take_along_axis(part_scores, order, axis=1)
 
-    # Ordenem per score descendent (el més similar primer)
-    scored.sort(key=lambda x: x[1], reverse=True)
-    # Retornem només els k primers resultats
-    return scored[:k]
\ No newline at end of file
+    results = []
+    for r, s in zip(rows, top):
+        keep = np.isfinite(s)
+        results.append([(int(i), float(v)) for i, v in zip(r[keep], s[keep])])
+    return results
@@ -0,0 +1,189 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .embeddings import embed_texts, model_name
+from .result_cache import bump_index_version
+from .slots import SLOT_FIELDS, clear_fields, hash_for, slot_of, slot_to_write, write_fields
+from .text import build_text, text_hash
+
+logger = logging.getLogger(__name__)
+
+# Lock per crear la cua global una sola vegada
+_lock = threading.Lock()
+# Cua global del procés
+_queue = None
+
+
+def reembed_events(event_ids) -> int:
+    """
+    Torna a generar l'embedding (del model actiu) dels esdeveniments indicats
+    el text dels quals ha canviat. Els textos idèntics compartits per diversos
+    esdeveniments es codifiquen una sola vegada i s'escriuen amb un únic
+    update per slot.
+
+    Returns:
+        Nombre d'esdeveniments actualitzats
+    """
+    from events.models import Event
+    from .index import get_loaded_index
+
+    name = model_name()
+    rows = Event.objects.with_embeddings().filter(pk__in=list(event_ids)).values(
+        'id', 'title', 'description', 'category', 'tags', 'scheduled_date', 'status', *SLOT_FIELDS
+    )
+    # Agrupem els esdeveniments pel hash del seu text actual
+    groups = {}
+    # Esdeveniments sense text que encara tenen un vector del model actiu
+    emptied = []
+    for row in rows:
+        text = build_text(row['title'], row['description'], row['category'], row['tags'])
+        if not text:
+            slot = slot_of(row, name)
+            if slot is not None:
+                emptied.append((row['id'], slot))
+            continue
+        digest = text_hash(text)
+        if digest == hash_for(row, name):
+            continue
+        group = groups.setdefault(digest, {'text': text, 'events': []})
+        group['events'].append((row['id'], row['scheduled_date'], row['category'], row['status'],
+                                slot_to_write(row, name, name)))
+
+    if not groups and not emptied:
+        return 0
+
+    digests = list(groups)
+    vectors = embed_texts([groups[d]['text'] for d in digests], model=name) if digests else []
+    now = timezone.now()
+    index = get_loaded_index()
+    updated = 0
+    # El vector d'un text que ha quedat buit ja no el representa: es buida el slot i es treu de l'índex
+    for slot in {slot for _, slot in emptied}:
+        Event.objects.filter(pk__in=[event_id for event_id, s in emptied if s == slot]).update(
+            **clear_fields(slot, now)
+        )
+    if index is not None and index.model == name:
+        for event_id, _ in emptied:
+            index.remove(event_id)
+    updated += len(emptied)
+    for digest, vec in zip(digests, vectors):
+        events = groups[digest]['events']
+        for slot in {event[4] for event in events}:
+            Event.objects.filter(pk__in=[event[0] for event in events if event[4] == slot]).update(
+                **write_fields(slot, vec, name, digest, now)
+            )
+        # update() no dispara post_save: actualitzem l'índex directament
+        if index is not None and index.model == name:
+            for event_id, scheduled_date, category, status, _ in events:
+                index.upsert(event_id, vec, scheduled_date, category, status)
+        updated += len(events)
+    # update() no dispara post_save: invalidem explícitament els rànquings en cache
+    bump_index_version()
+    if getattr(settings, "SEMANTIC_SEARCH_NEIGHBOURS_ON_REEMBED", True):
+        from .neighbours import refresh_neighbours
+
+        # Sense l'índex del model actiu carregat, refresh_neighbours el construeix (get_index)
+        if index is not None and index.model != name:
+            index = None
+        try:
+            changed = [event[0] for group in groups.values() for event in group['events']]
+            refresh_neighbours(changed + [event_id for event_id, _ in emptied], index=index)
+        except Exception:
+            # Els embeddings ja estan desats: els veïns es recalcularan amb build_event_neighbours
+            logger.exception("Error actualitzant els veïns dels esdeveniments re-embeddats")
+    return updated
+
+
+class ReembedQueue:
+    """
+    Cua en segon pla que torna a generar embeddings després de desar esdeveniments.
+
+    Un únic thread recull els ids pendents i els processa en lots, de manera que
+    la petició que desa l'esdeveniment no espera el model. Els ids repetits
+    mentre esperen només es processen una vegada.
+
+    El thread és daemon: perquè els processos curts (seeds, shell, ordres de
+    manage.py) no perdin la feina encuada, en sortir s'espera que la cua es
+    buidi (join) fins a SEMANTIC_SEARCH_REEMBED_EXIT_TIMEOUT segons.
+    """
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = batch_size
+        self._pending = {}
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def enqueue(self, event_id: int):
+        with self._cond:
+            self._pending[event_id] = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="reembed-queue", daemon=True)
+                self._thread.start()
+            # notify_all: a la condició també hi pot esperar join()
+            self._cond.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Espera que la cua quedi buida i el lot en curs acabat. Retorna False si s'esgota el temps."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _take(self) -> list[int]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            ids = list(self._pending)[:self.batch_size]
+            for event_id in ids:
+                del self._pending[event_id]
+            self._busy = True
+            return ids
+
+    def _run(self):
+        while True:
+            ids = self._take()
+            try:
+                reembed_events(ids)
+            except Exception:
+                logger.exception("Error regenerant embeddings dels esdeveniments %s", ids)
+            finally:
+                close_old_connections()
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+def get_reembed_queue() -> ReembedQueue:
+    """Retorna la cua global del procés."""
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = ReembedQueue()
+                atexit.register(_drain_on_exit, _queue)
+    return _queue
+
+
+def _drain_on_exit(queue: ReembedQueue):
+    """Processa els ids pendents abans que el procés acabi i mati el thread daemon."""
+    timeout = getattr(settings, "SEMANTIC_SEARCH_REEMBED_EXIT_TIMEOUT", 60)
+    if not queue.join(timeout):
+        logger.warning(
+            "S'han perdut %d embeddings pendents en sortir; executa backfill_event_embeddings --changed-only",
+            len(queue),
+        )
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Lock per crear la cache global una sola vegada
+_lock = threading.Lock()
+# Cache global del procés
+_cache = None
+
+# Clau del comptador de versió de l'índex a la cache de Django
+VERSION_KEY = "semantic_search:index_version"
+
+
+def _version_backend():
+    """Cache de Django on es guarda el comptador (per defecte, la compartida de CACHES['default'])."""
+    from django.core.cache import caches
+
+    return caches[getattr(settings, "SEMANTIC_SEARCH_RESULT_CACHE_BACKEND", None) or "default"]
+
+
+def is_shared(backend) -> bool:
+    """
+    Si una cache de Django es comparteix entre processos. LocMem i Dummy són
+    locals; Redis, Memcached, la de base de dades i la de fitxers (entre els
+    processos d'una màquina) es comparteixen.
+    """
+    from django.core.cache.backends.dummy import DummyCache
+    from django.core.cache.backends.locmem import LocMemCache
+
+    return not isinstance(backend, (LocMemCache, DummyCache))
+
+
+def result_cache_enabled() -> bool:
+    """
+    Si es poden reutilitzar rànquings en cache. Cal que el comptador de versió
+    sigui en una cache compartida: amb una de local, bump_index_version() d'un
+    worker o d'una ordre no invalidaria els rànquings dels altres workers.
+    Amb un sol procés es pot forçar amb SEMANTIC_SEARCH_RESULT_CACHE_ALLOW_LOCAL.
+    """
+    return is_shared(_version_backend()) or getattr(settings, "SEMANTIC_SEARCH_RESULT_CACHE_ALLOW_LOCAL", False)
+
+
+def index_version() -> int:
+    """Versió actual de les dades indexades (esdeveniments, embeddings i atributs)."""
+    backend = _version_backend()
+    version = backend.get(VERSION_KEY)
+    if version is None:
+        # add() no sobreescriu el valor si un altre procés l'acaba de crear
+        backend.add(VERSION_KEY, 1, timeout=None)
+        version = backend.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_index_version() -> int:
+    """
+    Incrementa la versió de l'índex. Totes les entrades de la cache de
+    resultats queden invalidades de cop, sense haver-les d'esborrar una a una.
+    """
+    backend = _version_backend()
+    try:
+        return backend.incr(VERSION_KEY)
+    except ValueError:
+        # La clau encara no existia (o ha estat expulsada de la cache)
+        backend.add(VERSION_KEY, 2, timeout=None)
+        return backend.get(VERSION_KEY, 2)
+
+
+class SearchResultCache:
+    """
+    Cache LRU acotada de rànquings de cerca (llistes de (event_id, score)).
+
+    La clau inclou la versió de l'índex: quan canvia qualsevol esdeveniment
+    la versió s'incrementa i les entrades antigues deixen de coincidir (i
+    acaben sortint per LRU o TTL). Com la cache d'embeddings, pot fer servir
+    un backend compartit entre processos.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = 300, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        # Hash per respectar les restriccions de claus de Memcached
+        digest = hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+        return f"semantic_search:results:{digest}"
+
+    def get(self, key: str) -> list[tuple[int, float]] | None:
+        """Retorna el rànquing guardat per a la clau o None si no hi és o ha caducat."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, ranked = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return ranked
+                del self._data[key]
+
+        ranked = self.backend.get(key) if self.backend is not None else None
+        if ranked is not None:
+            self._store(key, ranked)
+        with self._lock:
+            if ranked is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return ranked
+
+    def _store(self, key: str, ranked):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, ranked)
+            self._data.move_to_end(key)
+            # Eliminem les entrades menys usades si superem la mida màxima
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set(self, key: str, ranked) -> list[tuple[int, float]]:
+        """Guarda un rànquing a la cache local i, si n'hi ha, a la compartida."""
+        ranked = [(int(event_id), float(score)) for event_id, score in ranked]
+        self._store(key, ranked)
+        if self.backend is not None:
+            self.backend.set(key, ranked, timeout=self.ttl)
+        return ranked
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Comptadors d'encerts i errors de la cache."""
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+def get_result_cache() -> SearchResultCache:
+    """Retorna la cache global del procés, configurada des dels settings."""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                # Amb una cache compartida, la pàgina següent d'un cursor troba el
+                # rànquing encara que la serveixi un altre worker
+                backend = _version_backend()
+                if not is_shared(backend):
+                    backend = None
+                _cache = SearchResultCache(
+                    maxsize=getattr(settings, "SEMANTIC_SEARCH_RESULT_CACHE_SIZE", 1024),
+                    ttl=getattr(settings, "SEMANTIC_SEARCH_RESULT_CACHE_TTL", 300),
+                    backend=backend,
+                )
+    return _cache
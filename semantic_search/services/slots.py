@@ -0,0 +1,106 @@
+import numpy as np
+
+from .quantization import embedding_fields, pack, stored_vector, storage_dtype
+
+# Camps de cada slot d'embedding d'un esdeveniment. Cada slot guarda un vector
+# i el model amb què s'ha generat; el model actiu pot ser a qualsevol dels
+# dos, de manera que canviar de model no mou cap vector.
+SLOTS = {
+    'primary': {
+        'embedding': 'embedding',
+        'blob': 'embedding_blob',
+        'model': 'embedding_model',
+        'updated_at': 'embedding_updated_at',
+        'hash': 'embedding_text_hash',
+    },
+    'secondary': {
+        'embedding': None,
+        'blob': 'alt_embedding_blob',
+        'model': 'alt_embedding_model',
+        'updated_at': 'alt_embedding_updated_at',
+        'hash': 'alt_embedding_text_hash',
+    },
+}
+# Camps que cal llegir per obtenir el vector i el hash de qualsevol model
+SLOT_FIELDS = tuple(field for slot in SLOTS.values() for field in slot.values() if field)
+
+
+def _get(doc, field):
+    """Valor d'un camp d'un document de Mongo, un diccionari de values() o un Event."""
+    if field is None:
+        return None
+    return doc.get(field) if isinstance(doc, dict) else getattr(doc, field, None)
+
+
+def slot_of(doc, model: str) -> str | None:
+    """Slot on hi ha el vector del model indicat (None si no n'hi ha)."""
+    for slot, fields in SLOTS.items():
+        if _get(doc, fields['model']) == model:
+            return slot
+    return None
+
+
+def vector_for(doc, model: str) -> np.ndarray | None:
+    """Vector guardat d'un esdeveniment per al model indicat, o None si no en té."""
+    slot = slot_of(doc, model)
+    if slot is None:
+        return None
+    fields = SLOTS[slot]
+    return stored_vector(_get(doc, fields['embedding']), _get(doc, fields['blob']))
+
+
+def hash_for(doc, model: str) -> str | None:
+    """Hash del text amb què es va generar el vector del model indicat."""
+    slot = slot_of(doc, model)
+    return _get(doc, SLOTS[slot]['hash']) if slot else None
+
+
+def slot_to_write(doc, model: str, active: str) -> str:
+    """
+    Slot on s'ha de desar un vector nou del model indicat: el que ja en té un
+    del mateix model, o si no un de buit o d'un model antic. Mai es
+    sobreescriu el vector del model actiu amb el d'un altre model.
+    """
+    slot = slot_of(doc, model)
+    if slot is not None:
+        return slot
+    for slot, fields in SLOTS.items():
+        if not _get(doc, fields['model']):
+            return slot
+    for slot, fields in SLOTS.items():
+        if _get(doc, fields['model']) != active:
+            return slot
+    return 'primary'
+
+
+def write_fields(slot: str, vec, model: str, digest: str, now) -> dict:
+    """Valors dels camps d'un slot per desar-hi un vector nou."""
+    fields = SLOTS[slot]
+    if fields['embedding']:
+        values = embedding_fields(vec)
+    else:
+        values = {fields['blob']: pack(vec, storage_dtype())}
+    values.update({fields['model']: model, fields['updated_at']: now, fields['hash']: digest})
+    return values
+
+
+def clear_fields(slot: str, now) -> dict:
+    """
+    Valors que buiden un slot (p.ex. quan el text de l'esdeveniment queda
+    buit). La data s'actualitza perquè els altres processos en treguin el
+    vector en la propera sincronització de l'índex.
+    """
+    fields = SLOTS[slot]
+    values = {fields[name]: None for name in ('embedding', 'blob', 'model', 'hash') if fields[name]}
+    values[fields['updated_at']] = now
+    return values
+
+
+def model_query(model: str) -> dict:
+    """Filtre de Mongo dels documents que tenen un vector del model indicat."""
+    return {'$or': [{fields['model']: model} for fields in SLOTS.values()]}
+
+
+def missing_query(model: str) -> dict:
+    """Filtre de Mongo dels documents sense cap vector del model indicat."""
+    return {'$and': [{fields['model']: {'$ne': model}} for fields in SLOTS.values()]}
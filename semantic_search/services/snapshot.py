@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# Versió del format dels fitxers del snapshot
+FORMAT_VERSION = 2
+# Fitxer que apunta a la versió activa del snapshot
+CURRENT_FILE = "CURRENT"
+
+
+@dataclass
+class Snapshot:
+    """Snapshot d'embeddings obert en mode memmap (només lectura)."""
+    version: int
+    model: str
+    created_at: datetime
+    matrix: np.ndarray
+    ids: np.ndarray
+    dates: np.ndarray
+    categories: np.ndarray
+    statuses: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def snapshot_dir() -> Path:
+    """Directori on es guarden els snapshots d'embeddings."""
+    path = getattr(settings, "SEMANTIC_SEARCH_SNAPSHOT_DIR", None)
+    return Path(path) if path else settings.BASE_DIR / "var" / "embeddings"
+
+
+def _versions(root: Path) -> list[int]:
+    return sorted(int(p.name[1:]) for p in root.glob("v*") if p.name[1:].isdigit())
+
+
+def _encode(values: list) -> tuple[np.ndarray, list[str]]:
+    """Codis int16 i vocabulari d'una llista de valors (-1 per a None)."""
+    vocab = sorted({v for v in values if v is not None})
+    lookup = {v: code for code, v in enumerate(vocab)}
+    return np.array([lookup.get(v, -1) for v in values], dtype=np.int16), vocab
+
+
+def _decode(codes: np.ndarray, vocab: list[str]) -> np.ndarray:
+    """Array d'objectes amb els valors originals (None per al codi -1)."""
+    values = np.array(list(vocab) + [None], dtype=object)
+    return values[codes]
+
+
+def write_snapshot(rows, count: int, dim: int, model: str, created_at: datetime, keep: int = 2) -> Path:
+    """
+    Escriu un snapshot nou a partir d'un iterable de (id, embedding, data
+    programada, categoria, estat).
+
+    Els fitxers s'escriuen en un directori de versió nou i només es publiquen
+    (actualitzant CURRENT de forma atòmica) quan estan complets, de manera que
+    els workers mai obren un snapshot a mitges.
+
+    Args:
+        rows: Iterable de tuples (event_id, embedding, scheduled_date, category, status)
+        count: Nombre màxim de files (per reservar la matriu)
+        dim: Dimensió dels embeddings
+        model: Nom del model amb què s'han generat
+        created_at: Moment a partir del qual cal llegir el delta de la base de dades
+        keep: Nombre de versions a conservar (inclosa la nova)
+
+    Returns:
+        Directori de la versió escrita
+    """
+    root = snapshot_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    versions = _versions(root)
+    version = (versions[-1] + 1) if versions else 1
+    target = root / f"v{version}"
+    tmp = root / f".v{version}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+
+    matrix = np.memmap(tmp / "matrix.f32", dtype=np.float32, mode="w+", shape=(max(count, 1), dim))
+    ids = np.empty(count, dtype=np.int64)
+    dates = np.empty(count, dtype=np.float64)
+    categories, statuses = [], []
+    n = 0
+    for event_id, embedding, scheduled_date, category, status in rows:
+        if n >= count:
+            break
+        v = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(v) if v.shape == (dim,) else 0
+        if norm == 0:
+            continue
+        matrix[n] = v / norm
+        ids[n] = event_id
+        dates[n] = scheduled_date.timestamp() if scheduled_date else np.nan
+        categories.append(category)
+        statuses.append(status)
+        n += 1
+    matrix.flush()
+    del matrix
+
+    ids[:n].tofile(tmp / "ids.i64")
+    dates[:n].tofile(tmp / "dates.f64")
+    category_codes, category_vocab = _encode(categories)
+    status_codes, status_vocab = _encode(statuses)
+    category_codes.tofile(tmp / "categories.i16")
+    status_codes.tofile(tmp / "statuses.i16")
+    meta = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "model": model,
+        "dim": dim,
+        "count": n,
+        "created_at": created_at.isoformat(),
+        "categories": category_vocab,
+        "statuses": status_vocab,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, target)
+
+    # Publiquem la versió nova de forma atòmica
+    pointer = root / f".{CURRENT_FILE}.tmp"
+    pointer.write_text(target.name)
+    os.replace(pointer, root / CURRENT_FILE)
+
+    # Els processos que encara tenen obertes versions antigues continuen
+    # funcionant: el sistema no allibera els fitxers fins que es tanquen
+    for old in _versions(root)[:-keep] if keep > 0 else []:
+        shutil.rmtree(root / f"v{old}", ignore_errors=True)
+    return target
+
+
+def load_snapshot() -> Snapshot | None:
+    """
+    Obre el snapshot actiu amb numpy.memmap. Tots els processos que l'obren
+    comparteixen la mateixa còpia a la page cache del sistema.
+    Retorna None si no n'hi ha cap.
+    """
+    root = snapshot_dir()
+    try:
+        target = root / (root / CURRENT_FILE).read_text().strip()
+        meta = json.loads((target / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get("format") != FORMAT_VERSION:
+        return None
+
+    count, dim = meta["count"], meta["dim"]
+    if count:
+        matrix = np.memmap(target / "matrix.f32", dtype=np.float32, mode="r", shape=(count, dim))
+    else:
+        matrix = np.empty((0, dim), dtype=np.float32)
+    return Snapshot(
+        version=meta["version"],
+        model=meta["model"],
+        created_at=datetime.fromisoformat(meta["created_at"]),
+        matrix=matrix,
+        ids=np.fromfile(target / "ids.i64", dtype=np.int64),
+        dates=np.fromfile(target / "dates.f64", dtype=np.float64),
+        categories=_decode(np.fromfile(target / "categories.i16", dtype=np.int16), meta["categories"]),
+        statuses=_decode(np.fromfile(target / "statuses.i16", dtype=np.int16), meta["statuses"]),
+    )
@@ -0,0 +1,54 @@
+import hashlib
+
+import numpy as np
+
+
+def synthetic_embeddings(n: int, dim: int = 384, seed: int = 0, cluster_size: int = 100) -> np.ndarray:
+    """
+    Genera n embeddings normalitzats deterministes per a mesures i benchmarks.
+
+    Els vectors s'agrupen al voltant de centres aleatoris (uns cluster_size
+    per centre), que s'assembla més a un catàleg real que no pas vectors
+    independents, on tots els scores són pràcticament iguals.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // cluster_size), dim), dtype=np.float32)
+    matrix = centers[rng.integers(0, len(centers), n)]
+    matrix += 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def synthetic_queries(matrix: np.ndarray, m: int, seed: int = 1, noise: float = 0.5) -> np.ndarray:
+    """Queries normalitzades a prop de files aleatòries de la matriu."""
+    rng = np.random.default_rng(seed)
+    queries = matrix[rng.integers(0, len(matrix), m)] + noise * rng.standard_normal(
+        (m, matrix.shape[1]), dtype=np.float32
+    ) / np.sqrt(matrix.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def recall(approx, exact) -> float:
+    """Fracció dels resultats exactes que també apareixen al resultat aproximat."""
+    hits = [len({i for i, _ in a} & {i for i, _ in e}) / max(len(e), 1) for a, e in zip(approx, exact)]
+    return float(np.mean(hits))
+
+
+class StubEmbedder:
+    """
+    Substitut determinista del SentenceTransformer per a benchmarks: cada text
+    es converteix en un vector normalitzat aleatori derivat del seu hash.
+    Té la mateixa interfície que model.encode i no descarrega cap model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size: int = 32, normalize_embeddings: bool = True) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            seed = int(hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()[:8], 16)
+            out[row] = np.random.default_rng(seed).standard_normal(self.dim, dtype=np.float32)
+        if normalize_embeddings:
+            out /= np.linalg.norm(out, axis=1, keepdims=True)
+        return out
@@ -0,0 +1,26 @@
+import hashlib
+
+
+def build_text(title, description, category, tags) -> str:
+    """
+    Concatena els camps rellevants d'un esdeveniment per generar un text
+    complet que el representa. Els camps buits s'ometen.
+    """
+    parts = [title or "", description or "", category or "", tags or ""]
+    # Els unim amb el separador | i eliminem camps buits
+    return " | ".join([p.strip() for p in parts if p and p.strip()])
+
+
+def event_text(e) -> str:
+    """Text d'un objecte Event."""
+    return build_text(e.title, e.description, e.category, e.tags)
+
+
+def doc_text(doc: dict) -> str:
+    """Text d'un document de la col·lecció events_event."""
+    return build_text(doc.get('title'), doc.get('description'), doc.get('category'), doc.get('tags'))
+
+
+def text_hash(text: str) -> str:
+    """Hash del text d'un esdeveniment, per detectar quan cal tornar a generar l'embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
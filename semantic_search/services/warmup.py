@@ -0,0 +1,123 @@
+import logging
+import os
+import resource
+import sys
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Text amb què es fa la primera codificació (inicialitza els kernels del model)
+WARMUP_TEXT = "concert de jazz a Barcelona"
+
+
+def rss_mb() -> float:
+    """Memòria resident actual del procés en MB (o el pic, si no es pot llegir /proc)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss és en bytes a macOS i en KB a Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def configure_threads():
+    """
+    Aplica els threads de PyTorch configurats (SEMANTIC_SEARCH_TORCH_THREADS).
+
+    Amb diversos workers al mateix servidor convé repartir els nuclis
+    (p.ex. nuclis / workers), perquè cada worker no intenti fer servir tota
+    la CPU en cada codificació. Sense valor, es manté el comportament per
+    defecte de PyTorch.
+    """
+    threads = getattr(settings, "SEMANTIC_SEARCH_TORCH_THREADS", None)
+    interop = getattr(settings, "SEMANTIC_SEARCH_TORCH_INTEROP_THREADS", None)
+    if not threads and not interop:
+        return
+    if threads:
+        # Les biblioteques d'OpenMP/MKL llegeixen aquestes variables en carregar-se
+        os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+        os.environ.setdefault("MKL_NUM_THREADS", str(threads))
+
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    if interop:
+        try:
+            torch.set_interop_threads(interop)
+        except RuntimeError:
+            # Només es pot canviar abans de la primera operació en paral·lel
+            logger.warning("No s'han pogut canviar els inter-op threads de PyTorch (ja s'han fet servir)")
+
+
+def warm_up(load_indexes: bool = False) -> dict:
+    """
+    Carrega el model i fa una codificació d'escalfament, de manera que el
+    primer usuari no esperi la càrrega. Opcionalment també construeix els
+    índexs vectorial i lèxic.
+
+    Si es crida abans que el servidor faci fork dels workers (p.ex. gunicorn
+    --preload), els pesos del model es comparteixen entre tots els workers
+    (copy-on-write) en lloc de tenir-ne una còpia per procés.
+
+    Returns:
+        Diccionari amb els temps (s) i la memòria resident (MB) de cada pas
+    """
+    from django.db import connections
+
+    from .embeddings import embed_text, get_model
+
+    report = {'rss_before_mb': rss_mb()}
+    configure_threads()
+    try:
+        start = time.perf_counter()
+        # get_model() llegeix el model actiu de la base de dades (obre una connexió)
+        get_model()
+        report['model_load_s'] = time.perf_counter() - start
+        report['rss_model_mb'] = rss_mb()
+
+        start = time.perf_counter()
+        embed_text(WARMUP_TEXT)
+        report['warmup_encode_s'] = time.perf_counter() - start
+
+        if load_indexes:
+            from .index import get_index
+            from .lexical import get_lexical_index
+
+            start = time.perf_counter()
+            report['index_events'] = len(get_index())
+            report['lexical_events'] = len(get_lexical_index())
+            report['index_load_s'] = time.perf_counter() - start
+    finally:
+        # Les connexions obertes abans del fork no es poden compartir entre workers
+        connections.close_all()
+
+    report['rss_after_mb'] = rss_mb()
+    logger.info(
+        "Cerca semàntica preparada: model en %.2fs, escalfament en %.2fs, RSS %.0f MB (+%.0f MB)",
+        report['model_load_s'], report['warmup_encode_s'], report['rss_after_mb'],
+        report['rss_after_mb'] - report['rss_before_mb'],
+    )
+    return report
+
+
+def preload_if_enabled():
+    """
+    Escalfa la cerca semàntica en arrencar el servidor si SEMANTIC_SEARCH_PRELOAD
+    està activat. Es crida des de config/wsgi.py i config/asgi.py, de manera
+    que les ordres de manage.py no carreguen mai el model.
+    """
+    if not getattr(settings, "SEMANTIC_SEARCH_PRELOAD", False):
+        return None
+    try:
+        return warm_up(load_indexes=getattr(settings, "SEMANTIC_SEARCH_PRELOAD_INDEXES", False))
+    except Exception:
+        # Si l'escalfament falla, el servidor arrenca igualment i el model es carregarà de forma lazy
+        logger.exception("Error escalfant la cerca semàntica")
+        return None
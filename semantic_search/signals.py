@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from events.models import EMBEDDING_FIELDS, Event
+from events.signals import events_bulk_updated
+from .services.result_cache import bump_index_version
+from .services.text import event_text, text_hash
+
+# Els serveis de cerca (numpy, índexs, cua) s'importen dins dels receptors: els
+# signals es registren a tots els processos, fins i tot als que mai cerquen
+
+
+@receiver(post_save, sender=Event)
+def update_event_vector(sender, instance, **kwargs):
+    """Actualitza l'índex vectorial quan es desa un esdeveniment."""
+    from .services.index import get_loaded_index
+    from .services.slots import vector_for
+
+    index = get_loaded_index()
+    # Si l'índex encara no s'ha carregat, ja llegirà les dades actualitzades
+    if index is None:
+        return
+    if set(EMBEDDING_FIELDS) & instance.get_deferred_fields():
+        # Els vectors no s'han llegit ni desat (només canvien amb update() des de
+        # reembed i el backfill): n'hi ha prou amb actualitzar els atributs
+        index.update_attributes(instance.pk, instance.scheduled_date, instance.category, instance.status)
+        return
+    # Sense vector del model de l'índex, l'esdeveniment en surt
+    vec = vector_for(instance, index.model)
+    index.upsert(instance.pk, vec, instance.scheduled_date, instance.category, instance.status)
+
+
+@receiver(post_save, sender=Event)
+def update_event_terms(sender, instance, **kwargs):
+    """Actualitza l'índex lèxic (BM25) quan es desa un esdeveniment."""
+    from .services.lexical import get_loaded_lexical_index
+
+    index = get_loaded_lexical_index()
+    if index is None:
+        return
+    index.upsert(instance.pk, event_text(instance), instance.scheduled_date, instance.category, instance.status)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_search_results(sender, **kwargs):
+    """
+    Invalida els rànquings en cache: qualsevol canvi d'un esdeveniment (text,
+    embedding, data, categoria o estat) pot canviar el resultat d'una cerca.
+    """
+    bump_index_version()
+
+
+@receiver(post_save, sender=Event)
+def queue_event_reembedding(sender, instance, raw=False, **kwargs):
+    """
+    Encua la regeneració de l'embedding només si el text de l'esdeveniment
+    ha canviat respecte del text amb què es va generar el vector del model actiu.
+    """
+    if raw or not getattr(settings, "SEMANTIC_SEARCH_REEMBED_ON_SAVE", True):
+        return
+    from .services.embeddings import model_name
+    from .services.slots import SLOTS, hash_for, slot_of
+
+    name = model_name()
+    stored = hash_for(instance, name)
+    if stored is None:
+        # Vector sense hash (esdeveniments anteriors al hash): no sabem amb quin text
+        # es va generar, així que el deixem per a backfill_event_embeddings --changed-only
+        # en lloc de carregar el model en el primer save que no toca el text
+        primary = SLOTS['primary']
+        legacy = not getattr(instance, primary['model']) and getattr(instance, primary['updated_at']) is not None
+        if slot_of(instance, name) is not None or legacy:
+            return
+    elif text_hash(event_text(instance)) == stored:
+        return
+
+    from .services.reembed import get_reembed_queue
+
+    get_reembed_queue().enqueue(instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def remove_event_vector(sender, instance, **kwargs):
+    """Elimina l'esdeveniment de l'índex vectorial quan s'esborra."""
+    from .services.index import get_loaded_index
+
+    index = get_loaded_index()
+    if index is None:
+        return
+    index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Event)
+def remove_event_terms(sender, instance, **kwargs):
+    """Elimina l'esdeveniment de l'índex lèxic quan s'esborra."""
+    from .services.lexical import get_loaded_lexical_index
+
+    index = get_loaded_lexical_index()
+    if index is None:
+        return
+    index.remove(instance.pk)
+
+
+@receiver(events_bulk_updated, sender=Event)
+def update_bulk_attributes(sender, event_ids, **kwargs):
+    """
+    Actualitza els atributs dels esdeveniments modificats amb update() (p.ex.
+    els canvis d'estat de update_event_status) als índexs carregats i invalida
+    els rànquings en cache. Els vectors i el text no canvien.
+    """
+    from .services.index import get_loaded_index
+    from .services.lexical import get_loaded_lexical_index
+
+    bump_index_version()
+    indexes = [index for index in (get_loaded_index(), get_loaded_lexical_index()) if index is not None]
+    if not indexes:
+        return
+    rows = Event.objects.filter(pk__in=list(event_ids)).values_list('id', 'scheduled_date', 'category', 'status')
+    for event_id, scheduled_date, category, status in rows:
+        for index in indexes:
+            index.update_attributes(event_id, scheduled_date, category, status)
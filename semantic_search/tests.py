@@ -1,3 +1,165 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import Event
+from events.scheduler import apply_transitions
+from .models import EventNeighbours
+from .services import hybrid, index as vector_index, result_cache
+from .services.embeddings import model_name
+from .services.index import build_index, sync_index
+from .services.lexical import build_lexical_index, sync_lexical_index
+from .services.reembed import reembed_events
+from .services.slots import write_fields
+
+
+def _unit(seed: int, dim: int = 8) -> np.ndarray:
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+@override_settings(
+    SEMANTIC_SEARCH_REEMBED_ON_SAVE=False,
+    SEMANTIC_SEARCH_ENGINE='exact',
+    SEMANTIC_SEARCH_EMBEDDING_DTYPE='float32',
+    SEMANTIC_SEARCH_SNAPSHOT_DIR=tempfile.gettempdir() + '/no-snapshot',
+)
+class IndexSyncTests(TestCase):
+    """
+    Els índexs carregats han de veure les escriptures que no envien cap signal
+    en aquest procés (un altre worker, un update() massiu, el bulk_write del backfill).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('creator', password='secret')
+
+    def _event(self, title: str, vec=None) -> Event:
+        event = Event.objects.create(
+            title=title, description=title, creator=self.user, category='music',
+            scheduled_date=timezone.now() + timedelta(days=1),
+        )
+        if vec is not None:
+            self._write_vector(event, vec)
+        return event
+
+    def _write_vector(self, event: Event, vec):
+        # update() no envia post_save: és el que veu el procés quan escriu un altre
+        fields = write_fields('primary', vec, model_name(), 'hash', timezone.now())
+        Event.objects.filter(pk=event.pk).update(**fields)
+
+    def test_vector_written_without_signal_is_synced(self):
+        self._event('indexat', _unit(1))
+        index = build_index()
+        event = self._event('nou')
+        self._write_vector(event, _unit(2))
+        self.assertNotIn(event.pk, index)
+
+        self.assertGreater(sync_index(index, force=True), 0)
+        self.assertIn(event.pk, index)
+        self.assertEqual(index.search(_unit(2), k=1)[0][0], event.pk)
+
+    def test_status_change_without_signal_refreshes_masks(self):
+        event = self._event('en directe', _unit(4))
+        index = build_index()
+        lexical = build_lexical_index()
+        # El cron corre en un altre procés: el seu events_bulk_updated no arriba aquí
+        apply_transitions(now=timezone.now() + timedelta(days=1, minutes=1))
+        self.assertEqual(index.search(_unit(4), k=1, status='live'), [])
+
+        sync_index(index, force=True)
+        sync_lexical_index(lexical, force=True)
+        self.assertEqual(index.search(_unit(4), k=1, status='live')[0][0], event.pk)
+        self.assertEqual([event_id for event_id, _ in lexical.search('directe', status='live')], [event.pk])
+
+    def test_deleted_event_is_removed(self):
+        event = self._event('esborrat', _unit(3))
+        index = build_index()
+        lexical = build_lexical_index()
+        Event.objects.filter(pk=event.pk).delete()
+
+        sync_index(index, force=True)
+        sync_lexical_index(lexical, force=True)
+        self.assertNotIn(event.pk, index)
+        self.assertNotIn(event.pk, lexical)
+
+    def test_text_written_without_signal_is_synced(self):
+        event = self._event('concert')
+        lexical = build_lexical_index()
+        Event.objects.filter(pk=event.pk).update(
+            title='xerrada', description='xerrada', updated_at=timezone.now()
+        )
+
+        sync_lexical_index(lexical, force=True)
+        self.assertEqual([event_id for event_id, _ in lexical.search('xerrada')], [event.pk])
+        self.assertEqual(lexical.search('concert'), [])
+
+
+@override_settings(
+    SEMANTIC_SEARCH_REEMBED_ON_SAVE=False,
+    SEMANTIC_SEARCH_NEIGHBOURS_ON_REEMBED=False,
+    SEMANTIC_SEARCH_ENGINE='exact',
+    SEMANTIC_SEARCH_EMBEDDING_DTYPE='float32',
+    SEMANTIC_SEARCH_SNAPSHOT_DIR=tempfile.gettempdir() + '/no-snapshot',
+)
+class ReembedTests(TestCase):
+    def tearDown(self):
+        vector_index._index = None
+
+    def test_emptied_text_clears_vector(self):
+        user = get_user_model().objects.create_user('creator', password='secret')
+        event = Event.objects.create(
+            title='concert', description='concert', creator=user, category='music',
+            scheduled_date=timezone.now() + timedelta(days=1),
+        )
+        fields = write_fields('primary', _unit(5), model_name(), 'hash', timezone.now())
+        Event.objects.filter(pk=event.pk).update(**fields)
+        vector_index._index = build_index()
+        Event.objects.filter(pk=event.pk).update(title='', description='', category='', tags=None)
+
+        self.assertEqual(reembed_events([event.pk]), 1)
+        self.assertNotIn(event.pk, vector_index._index)
+        self.assertIsNone(Event.objects.with_embeddings().get(pk=event.pk).embedding_model)
+
+
+class EventNeighboursTests(TestCase):
+    def test_ids_fit_big_auto_field(self):
+        # Els ids són BigAutoField: una llista d'int32 es desbordaria
+        row = EventNeighbours()
+        row.ids = [2 ** 40, 3]
+        self.assertEqual(row.ids, [2 ** 40, 3])
+
+
+@override_settings(
+    SEMANTIC_SEARCH_REEMBED_ON_SAVE=False,
+    SEMANTIC_SEARCH_PAGE_SIZE=1,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class CursorPaginationTests(TestCase):
+    """Totes les pàgines d'un cursor surten del mateix rànquing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user('creator', password='secret')
+        for title in ('concert de jazz', 'concert de rock'):
+            Event.objects.create(
+                title=title, description=title, creator=user, category='music',
+                scheduled_date=timezone.now() + timedelta(days=1),
+            )
+
+    def setUp(self):
+        result_cache._cache = None
+
+    def test_next_page_reuses_ranking_without_shared_cache(self):
+        self.assertFalse(result_cache.result_cache_enabled())
+        url = reverse('semantic_search:semantic')
+        with mock.patch.object(hybrid, '_search', wraps=hybrid._search) as search:
+            first = self.client.get(url, {'q': 'concert', 'mode': 'lexical'})
+            self.client.get(url + first.context['next_url'])
+        self.assertEqual(search.call_count, 1)
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import semantic_search
+from .views import semantic_search, semantic_search_stream
 
 app_name = "semantic_search"
 
 urlpatterns = [
     path("semantic/", semantic_search, name="semantic"),
-]
\ No newline at end of file
+    path("semantic/stream/", semantic_search_stream, name="semantic_stream"),
+]
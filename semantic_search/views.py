@@ -1,24 +1,94 @@
+import json
+import time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from django.utils import timezone
 
-from events.models import Event
-from .services.embeddings import embed_text, model_name
-from .services.ranker import cosine_top_k
+from events.models import CATEGORY_CHOICES, STATUS_CHOICES, Event
+from .services.cursor import decode_cursor, encode_cursor, fingerprint
+from .services.embeddings import model_name
+
+# Modes de cerca acceptats (vegeu services.hybrid.search_events)
+MODES = ('semantic', 'lexical', 'hybrid')
+# Esdeveniments que s'hidraten per consulta a la resposta NDJSON
+STREAM_CHUNK = 10
 
-def _event_text(e: Event) -> str:
+
+def _search_params(request) -> dict:
+    """Llegeix i valida els paràmetres de cerca comuns a la vista HTML i a la NDJSON."""
+    # Filtres de categoria i estat (els valors desconeguts s'ignoren)
+    category = request.GET.get("category") or None
+    if category not in dict(CATEGORY_CHOICES):
+        category = None
+    status = request.GET.get("status") or None
+    if status not in dict(STATUS_CHOICES):
+        status = None
+    # Mode de cerca: semàntica (vectors), lèxica (BM25) o híbrida
+    mode = request.GET.get("mode")
+    if mode not in MODES:
+        mode = "semantic"
+    return {
+        "q": (request.GET.get("q") or "").strip(),
+        # Comprovem si l'usuari vol filtrar només esdeveniments futurs
+        "only_future": request.GET.get("future") == "1",
+        "category": category,
+        "status": status,
+        "mode": mode,
+    }
+
+
+def _ranked_page(request, params: dict, page_size: int):
     """
-    Funció auxiliar que concatena els camps rellevants d'un esdeveniment
-    per generar un text complet que representa l'esdeveniment.
+    Rànquing complet de la cerca i posició de la pàgina demanada.
+
+    El rànquing (fins a SEMANTIC_SEARCH_MAX_RESULTS) es calcula una sola vegada
+    i queda a la cache de resultats amb la versió de l'índex a la clau. El
+    cursor guarda aquesta versió i el filtre de data de la primera pàgina, i
+    search_events desa sempre els rànquings demanats per versió: les pàgines
+    següents llegeixen la mateixa entrada en lloc de tornar a puntuar (des de
+    qualsevol worker si la cache és compartida; si no, des del mateix procés).
+    Si l'entrada ha caducat (SEMANTIC_SEARCH_RESULT_CACHE_TTL) es torna a
+    calcular. Un cursor invàlid o d'una altra cerca torna a la primera pàgina.
+
+    Returns:
+        Tupla (ranked, offset, next_cursor, prev_cursor)
     """
-    # Agafem els camps més importants de l'esdeveniment
-    parts = [
-        e.title or "",
-        e.description or "",
-        e.category or "",
-        e.tags or "",
-    ]
-    # Els unim amb el separador | i eliminem camps buits
-    return " | ".join([p.strip() for p in parts if p and p.strip()])
+    # Els índexs (numpy) només es carreguen quan algú cerca: resoldre les URLs
+    # del projecte no ha d'importar la pila de cerca
+    from .services.hybrid import search_events
+    from .services.result_cache import index_version
+
+    search = fingerprint(params["q"], params["mode"], params["category"], params["status"], params["only_future"])
+    cursor = decode_cursor(request.GET.get("cursor"), search)
+    if cursor is None:
+        # Només volem esdeveniments programats a partir d'ara (arrodonit al minut
+        # perquè les cerques repetides durant el mateix minut comparteixin cache)
+        after = timezone.now().replace(second=0, microsecond=0) if params["only_future"] else None
+        cursor = {'offset': 0, 'version': index_version(), 'after': after}
+
+    # Els filtres s'apliquen dins dels índexs abans de puntuar, de manera que no es perden resultats
+    ranked = search_events(
+        params["q"], mode=params["mode"], k=getattr(settings, "SEMANTIC_SEARCH_MAX_RESULTS", 200),
+        after=cursor['after'], category=params["category"], status=params["status"], version=cursor['version'],
+    )
+    offset = min(cursor['offset'], max(0, len(ranked) - 1))
+    next_cursor = prev_cursor = None
+    if offset + page_size < len(ranked):
+        next_cursor = encode_cursor(offset + page_size, cursor['version'], cursor['after'], search)
+    if offset > 0:
+        prev_cursor = encode_cursor(max(0, offset - page_size), cursor['version'], cursor['after'], search)
+    return ranked, offset, next_cursor, prev_cursor
+
+
+def _page_url(request, cursor: str | None) -> str | None:
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query["cursor"] = cursor
+    return f"?{query.urlencode()}"
+
 
 def semantic_search(request):
     """
@@ -26,55 +96,100 @@ def semantic_search(request):
     Processa la query de l'usuari, la converteix en vector,
     compara amb els esdeveniments i retorna els més similars.
     """
-    # Obtenim la query de l'usuari des del paràmetre GET
-    q = (request.GET.get("q") or "").strip()
-    # Comprovem si l'usuari vol filtrar només esdeveniments futurs
-    only_future = request.GET.get("future") == "1"
+    params = _search_params(request)
+    page_size = getattr(settings, "SEMANTIC_SEARCH_PAGE_SIZE", 20)
 
     # Inicialitzem variables per emmagatzemar resultats i temps de cerca
     results = []
     search_time = None
-    
+    total = offset = 0
+    next_url = prev_url = None
+
     # Si hi ha text de cerca, processem la petició
-    if q:
-        import time
+    if params["q"]:
         start_time = time.time()
-        
-        # Convertim la query de l'usuari en un vector d'embedding
-        q_vec = embed_text(q)
-
-        # Obtenim només els camps necessaris per millorar el rendiment
-        all_events = Event.objects.only('id', 'title', 'description', 'category', 'tags', 'scheduled_date', 'embedding')
-        
-        # Preparem la llista d'esdeveniments amb els seus embeddings
-        items = []
-        for e in all_events:
-            # Si volem només futurs, filtrem els que ja han passat
-            if only_future and e.scheduled_date < timezone.now():
-                continue
-            
-            # Obtenim l'embedding de l'esdeveniment
-            emb = getattr(e, "embedding", None)
-            # Validem que l'embedding sigui vàlid (llista amb contingut)
-            if emb and isinstance(emb, list) and len(emb) > 0:
-                items.append((e, emb))
-
-        # Calculem la similitud i obtenim els 20 més rellevants
-        ranked = cosine_top_k(q_vec, items, k=20)
-        
-        # Filtrem resultats amb score mínim de 0.2 (20% de similitud)
-        results = [(e, s) for e, s in ranked if s > 0.2]
-        
+
+        ranked, offset, next_cursor, prev_cursor = _ranked_page(request, params, page_size)
+        page = ranked[offset:offset + page_size]
+        total = len(ranked)
+        next_url, prev_url = _page_url(request, next_cursor), _page_url(request, prev_cursor)
+
+        # Només hidratem els esdeveniments de la pàgina, mantenint l'ordre del rànquing
+        events = Event.objects.in_bulk([event_id for event_id, _ in page])
+        results = [(events[event_id], s) for event_id, s in page if event_id in events]
+
         # Calculem el temps de cerca en mil·lisegons
         search_time = round((time.time() - start_time) * 1000, 2)
 
     # Preparem el context per al template
     context = {
-        "query": q,
-        "results": results, 
-        "only_future": only_future,
+        "query": params["q"],
+        "results": results,
+        "only_future": params["only_future"],
+        "category": params["category"],
+        "status": params["status"],
+        "mode": params["mode"],
+        "category_choices": CATEGORY_CHOICES,
+        "status_choices": STATUS_CHOICES,
         "embedding_model": model_name(),
         "search_time": search_time,
-        "total_results": len(results),
+        "total_results": total,
+        "first_result": offset + 1,
+        "last_result": offset + len(results),
+        "next_url": next_url,
+        "prev_url": prev_url,
     }
-    return render(request, "semantic_search/search.html", context)
\ No newline at end of file
+    return render(request, "semantic_search/search.html", context)
+
+
+def _event_json(event, score: float) -> dict:
+    return {
+        "id": event.pk,
+        "title": event.title,
+        "url": event.get_absolute_url(),
+        "score": round(float(score), 4),
+        "scheduled_date": event.scheduled_date.isoformat() if event.scheduled_date else None,
+        "category": event.category,
+        "status": event.status,
+    }
+
+
+def semantic_search_stream(request):
+    """
+    Variant NDJSON de la cerca: una línia de metadades (total i cursor de la
+    pàgina següent) i després un esdeveniment per línia. Els esdeveniments
+    s'hidraten en blocs de STREAM_CHUNK i s'envien a mesura que es llegeixen,
+    de manera que el client rep els primers resultats abans que s'hagin
+    carregat tots. Accepta els mateixos paràmetres que la vista HTML, més
+    limit (mida de la pàgina, fins a SEMANTIC_SEARCH_MAX_RESULTS).
+    """
+    params = _search_params(request)
+    max_results = getattr(settings, "SEMANTIC_SEARCH_MAX_RESULTS", 200)
+    try:
+        page_size = int(request.GET.get("limit") or getattr(settings, "SEMANTIC_SEARCH_PAGE_SIZE", 20))
+    except ValueError:
+        page_size = getattr(settings, "SEMANTIC_SEARCH_PAGE_SIZE", 20)
+    page_size = min(max(1, page_size), max_results)
+
+    ranked, offset, next_cursor = [], 0, None
+    if params["q"]:
+        ranked, offset, next_cursor, _ = _ranked_page(request, params, page_size)
+    page = ranked[offset:offset + page_size]
+
+    def lines():
+        yield json.dumps({
+            "query": params["q"],
+            "mode": params["mode"],
+            "total": len(ranked),
+            "offset": offset,
+            "next_cursor": next_cursor,
+            "embedding_model": model_name(),
+        }) + "\n"
+        for start in range(0, len(page), STREAM_CHUNK):
+            chunk = page[start:start + STREAM_CHUNK]
+            events = Event.objects.in_bulk([event_id for event_id, _ in chunk])
+            for event_id, score in chunk:
+                if event_id in events:
+                    yield json.dumps(_event_json(events[event_id], score)) + "\n"
+
+    return StreamingHttpResponse(lines(), content_type="application/x-ndjson")